@@ -0,0 +1,156 @@
+"""
+Lưu kết quả benchmark theo kiểu append-only.
+
+Mỗi kết quả được ghi thành một dòng JSON ngay khi xong (fsync theo lô),
+file Excel chỉ được tạo một lần ở cuối thay vì ghi lại toàn bộ trong lúc chạy.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional
+
+import pandas as pd
+
+DEFAULT_FSYNC_EVERY = 10
+
+def truncate_partial_line(path: str) -> None:
+    """
+    Cắt bỏ dòng cuối bị ghi dở (không có "\n") của file JSONL,
+    để bản ghi mới khi chạy tiếp không bị nối vào dòng hỏng
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        # Đọc ngược từng khối cho tới khi gặp ký tự xuống dòng cuối cùng
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            chunk = f.read(position - start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position != end:
+            f.truncate(position)
+
+class ResultSink:
+    """Ghi từng kết quả benchmark vào file JSONL (append-only)"""
+
+    def __init__(self, path: str, fsync_every: int = DEFAULT_FSYNC_EVERY):
+        """
+        Args:
+            path: Đường dẫn file JSONL
+            fsync_every: Số bản ghi giữa hai lần fsync xuống đĩa
+        """
+        self.path = path
+        self.fsync_every = fsync_every
+        self._pending = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        truncate_partial_line(path)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Ghi thêm một bản ghi vào cuối file"""
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self._pending += 1
+            if self._pending >= self.fsync_every:
+                os.fsync(self._file.fileno())
+                self._pending = 0
+
+    def close(self) -> None:
+        """Đẩy dữ liệu còn lại xuống đĩa và đóng file"""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def __enter__(self) -> "ResultSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+def read_records(path: str) -> List[Dict[str, Any]]:
+    """Đọc tất cả bản ghi từ file JSONL (bỏ qua dòng cuối bị ghi dở nếu có)"""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Dòng bị cắt ngang khi tiến trình dừng đột ngột
+                continue
+    return records
+
+def make_query_key(item: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> str:
+    """Tạo khóa checkpoint cho một câu hỏi: hash của câu hỏi + cấu hình chạy"""
+    content = json.dumps(
+        {"query": item["query"], "expected_answer": item.get("expected_answer"), "config": config or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def load_checkpoint(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Đọc các câu hỏi đã hoàn thành từ file JSONL của lần chạy trước
+
+    Returns:
+        Dict query_key -> bản ghi thành công gần nhất (bản ghi lỗi sẽ được chạy lại)
+    """
+    completed = {}
+    for record in read_records(path):
+        key = record.get("query_key")
+        if key and record.get("status", "ok") == "ok":
+            completed[key] = record
+    return completed
+
+def export_records(
+    jsonl_path: str,
+    output_file: str,
+    sort_by: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    dedupe_by: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Chuyển file JSONL sang Excel hoặc CSV (theo đuôi file) một lần duy nhất
+
+    Args:
+        jsonl_path: File JSONL nguồn
+        output_file: File đích (.xlsx hoặc .csv)
+        sort_by: Cột dùng để sắp xếp (ví dụ thứ tự câu hỏi)
+        columns: Các cột cần xuất (mặc định: tất cả)
+        dedupe_by: Các cột khóa, chỉ giữ bản ghi mới nhất cho mỗi khóa (khi chạy tiếp)
+    """
+    df = pd.DataFrame(read_records(jsonl_path))
+    if dedupe_by and all(c in df.columns for c in dedupe_by):
+        df = df.drop_duplicates(subset=dedupe_by, keep="last")
+    if sort_by and sort_by in df.columns:
+        df = df.sort_values(sort_by, kind="stable")
+    if columns:
+        df = df[[c for c in columns if c in df.columns]]
+
+    if output_file.endswith(".csv"):
+        df.to_csv(output_file, index=False)
+    else:
+        df.to_excel(output_file, index=False)
+    return df
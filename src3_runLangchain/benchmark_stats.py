@@ -0,0 +1,189 @@
+"""
+Thống kê độ trễ cho benchmark.
+
+- StageTimer: đo thời gian từng bước (retrieval, embedding, generation, evaluation)
+- TimedEmbeddings: bọc embedding model để đo riêng thời gian embedding
+- LatencyHistogram: histogram kiểu HDR, xuất file .hgrm để vẽ phân phối độ trễ
+- summarize_latencies: p50/p90/p95/p99, trung bình, min, max
+- write_summary: ghi báo cáo (thông lượng, percentile) ra file JSON cạnh file kết quả
+"""
+
+import json
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Iterator
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+# Thứ tự các bước trong báo cáo
+STAGES = ("retrieval", "embedding", "generation", "evaluation")
+
+# StageTimer của câu hỏi đang xử lý (ContextVar để thread con chạy bằng copy_context vẫn thấy)
+_current: ContextVar[Optional["StageTimer"]] = ContextVar("stage_timer", default=None)
+
+class StageTimer:
+    """Đo thời gian từng bước xử lý của một câu hỏi"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Đo thời gian một bước, cộng dồn nếu bước chạy nhiều lần
+
+        Ví dụ:
+            >>> timer = StageTimer()
+            >>> with timer.stage("retrieval"):
+            ...     docs = retriever.retrieve_documents(query)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        """Cộng thêm thời gian cho một bước"""
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    @contextmanager
+    def activate(self) -> Iterator["StageTimer"]:
+        """Gắn timer vào context hiện tại để TimedEmbeddings ghi thời gian vào đây"""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+def current_timer() -> Optional[StageTimer]:
+    """Lấy StageTimer đang chạy trong context hiện tại (nếu có)"""
+    return _current.get()
+
+class TimedEmbeddings(Embeddings):
+    """
+    Bọc một embedding model và ghi thời gian embedding vào StageTimer đang chạy.
+
+    Embedding câu hỏi xảy ra bên trong retrieval, nên thời gian "embedding"
+    là một phần của thời gian "retrieval".
+    """
+
+    def __init__(self, embeddings: Embeddings, stage: str = "embedding"):
+        self.embeddings = embeddings
+        self.stage = stage
+
+    def _timed(self, func, *args):
+        timer = current_timer()
+        if timer is None:
+            return func(*args)
+        with timer.stage(self.stage):
+            return func(*args)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._timed(self.embeddings.embed_documents, texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._timed(self.embeddings.embed_query, text)
+
+def summarize_latencies(
+    values: List[float],
+    percentiles=DEFAULT_PERCENTILES
+) -> Dict[str, float]:
+    """
+    Tính các chỉ số độ trễ (giây)
+
+    Returns:
+        Dict gồm count, mean, min, max và p50/p90/p95/p99
+    """
+    if not values:
+        return {"count": 0}
+    data = np.asarray(values, dtype=np.float64)
+    summary = {
+        "count": int(data.size),
+        "mean": float(data.mean()),
+        "min": float(data.min()),
+        "max": float(data.max())
+    }
+    for p, value in zip(percentiles, np.percentile(data, percentiles)):
+        summary[f"p{p}"] = float(value)
+    return summary
+
+def write_summary(summary: Dict[str, Any], path: str) -> None:
+    """Ghi báo cáo của lần chạy (thông lượng, percentile độ trễ, tên file) ra file JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+class LatencyHistogram:
+    """
+    Histogram độ trễ kiểu HDR: mỗi bucket giữ `significant_figures` chữ số có nghĩa,
+    nên sai số tương đối cố định ở mọi độ lớn (từ vài ms đến vài phút).
+    """
+
+    def __init__(self, significant_figures: int = 3):
+        self.significant_figures = significant_figures
+        self.counts: Dict[float, int] = {}
+        self.total_count = 0
+        self._sum = 0.0
+        self._sum_squares = 0.0
+        self._max = 0.0
+
+    def _bucket(self, value_ms: float) -> float:
+        """Làm tròn lên giá trị theo số chữ số có nghĩa"""
+        if value_ms <= 0:
+            return 0.0
+        magnitude = math.floor(math.log10(value_ms))
+        unit = 10.0 ** (magnitude - self.significant_figures + 1)
+        return round(math.ceil(value_ms / unit) * unit, 12)
+
+    def record(self, seconds: float) -> None:
+        """Ghi một giá trị độ trễ (giây)"""
+        value_ms = seconds * 1000.0
+        bucket = self._bucket(value_ms)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total_count += 1
+        self._sum += value_ms
+        self._sum_squares += value_ms * value_ms
+        self._max = max(self._max, value_ms)
+
+    def value_at_percentile(self, percentile: float) -> float:
+        """Giá trị (ms) tại một percentile"""
+        if not self.total_count:
+            return 0.0
+        target = max(1, math.ceil(percentile / 100.0 * self.total_count))
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if seen >= target:
+                return value
+        return self._max
+
+    def export(self, path: str) -> None:
+        """
+        Xuất phân phối percentile theo định dạng .hgrm của HdrHistogram
+        (đơn vị ms, mở được bằng HdrHistogram plotter)
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}\n\n")
+            seen = 0
+            for value in sorted(self.counts):
+                seen += self.counts[value]
+                fraction = seen / self.total_count
+                inverse = "inf" if fraction >= 1.0 else f"{1.0 / (1.0 - fraction):.2f}"
+                f.write(f"{value:12.3f} {fraction:14.12f} {seen:10d} {inverse:>14}\n")
+
+            mean = self._sum / self.total_count if self.total_count else 0.0
+            variance = self._sum_squares / self.total_count - mean * mean if self.total_count else 0.0
+            f.write(f"#[Mean    = {mean:12.3f}, StdDeviation   = {math.sqrt(max(variance, 0.0)):12.3f}]\n")
+            f.write(f"#[Max     = {self._max:12.3f}, Total count    = {self.total_count:12d}]\n")
+            f.write(f"#[Buckets = {len(self.counts):12d}, SignificantFigures = {self.significant_figures:6d}]\n")
+
+def build_histogram(values: List[float], significant_figures: int = 3) -> LatencyHistogram:
+    """Tạo histogram từ danh sách độ trễ (giây)"""
+    histogram = LatencyHistogram(significant_figures)
+    for value in values:
+        histogram.record(value)
+    return histogram
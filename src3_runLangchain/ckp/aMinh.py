@@ -1,7 +1,10 @@
 import json
 import os
+import sys
+from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
+from collections import OrderedDict
 import re
 from pydantic import Field, BaseModel
 from sklearn.metrics import accuracy_score, precision_recall_fscore_support
@@ -20,6 +23,12 @@ from langchain_community.document_loaders import JSONLoader
 from langchain_community.retrievers import BM25Retriever
 from langchain.retrievers import EnsembleRetriever
 
+# Cho phép import layers/ khi chạy file này trực tiếp
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from layers._04_retrieval.bm25_index import BM25IndexRetriever, corpus_version
+from layers._04_retrieval.fusion import fuse
+import numpy as np
+
 # Remove or replace the API key with environment variable
 os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 
@@ -164,9 +173,44 @@ def create_hybrid_qa_chain(retriever: BaseRetriever) -> RetrievalQA:
     
     return qa_chain
 
+# Cache BM25 index theo nội dung documents (corpus_version -> retriever),
+# chỉ giữ vài phiên bản gần nhất
+BM25_CACHE_SIZE = 4
+_bm25_cache: "OrderedDict[str, BM25IndexRetriever]" = OrderedDict()
+
+def get_bm25_retriever(documents: List[Document]) -> BM25IndexRetriever:
+    """
+    Lấy BM25 retriever cho danh sách documents, chỉ tạo index một lần
+
+    Cache dựa trên fingerprint của documents nên sửa documents tại chỗ (kể cả khi
+    số lượng không đổi) sẽ tạo index mới.
+    Nếu đặt BM25_INDEX_DIR, index được lưu ra đĩa và nạp lại (memory-map) ở lần chạy sau,
+    chỉ tạo lại khi documents thay đổi.
+    """
+    version = corpus_version(documents)
+    retriever = _bm25_cache.get(version)
+    if retriever is None:
+        # Sao chép danh sách để retriever không bị ảnh hưởng khi documents bị sửa sau đó
+        retriever = BM25IndexRetriever.from_documents(
+            list(documents),
+            persist_directory=os.getenv("BM25_INDEX_DIR")
+        )
+        _bm25_cache[version] = retriever
+        while len(_bm25_cache) > BM25_CACHE_SIZE:
+            _bm25_cache.popitem(last=False)
+    _bm25_cache.move_to_end(version)
+    return retriever
+
+def document_key(doc: Document) -> Tuple[str, str]:
+    """Khóa gộp kết quả: (id, type), dùng nội dung khi document không có id"""
+    doc_id = doc.metadata.get("id")
+    base = f"id:{doc_id}" if doc_id is not None else "content:" + doc.page_content
+    return base, doc.metadata.get("type", "")
+
 # 8. Tạo custom hybrid search function với re-ranking
 def custom_hybrid_search(query: str, vectordb: Chroma, documents: List[Document], 
-                       top_k: int = 5, vector_weight: float = 0.6) -> List[Document]:
+                       top_k: int = 5, vector_weight: float = 0.6,
+                       fusion_method: str = "minmax") -> List[Document]:
     """
     Tìm kiếm sử dụng kết hợp vector search và semantic matching, sau đó re-rank kết quả
     
@@ -176,88 +220,48 @@ def custom_hybrid_search(query: str, vectordb: Chroma, documents: List[Document]
         documents: Danh sách documents gốc
         top_k: Số lượng kết quả trả về
         vector_weight: Trọng số cho vector search (từ 0 đến 1)
+        fusion_method: Cách kết hợp điểm: "minmax", "zscore" (chuẩn hóa điểm thật) hoặc "rrf" (theo thứ hạng)
     
     Returns:
         List[Document]: Danh sách documents đã được sắp xếp theo độ liên quan
     """
-    # 1. Vector search
-    vector_results = vectordb.similarity_search_with_score(query, k=top_k*2)
-    
-    # Chuyển đổi thành SearchResult
-    vector_search_results = [
-        SearchResult(document=doc, score=score)
-        for doc, score in vector_results
-    ]
-    
-    # 2. Keyword search với BM25
-    bm25_retriever = BM25Retriever.from_documents(documents, k=top_k*2)
-    bm25_results = bm25_retriever.get_relevant_documents(query)
-    
-    # Tạo một dict để tra cứu nhanh document theo id và type
-    doc_lookup = {}
-    for doc in documents:
-        key = (doc.metadata.get("id"), doc.metadata.get("type", ""))
-        doc_lookup[key] = doc
-    
-    # Chuyển đổi thành SearchResult (giả định điểm từ 0.5 đến 1.0 cho BM25)
-    bm25_search_results = []
-    for i, doc in enumerate(bm25_results):
-        normalized_score = 1.0 - (i / len(bm25_results)) * 0.5  # Từ 1.0 đến 0.5
-        bm25_search_results.append(SearchResult(document=doc, score=normalized_score))
-    
-    # 3. Kết hợp và re-rank kết quả
-    all_results = {}
-    
-    # Thêm kết quả từ vector search
-    for result in vector_search_results:
-        doc_id = result.document.metadata.get("id")
-        doc_type = result.document.metadata.get("type", "")
-        key = (doc_id, doc_type)
-        
-        if key not in all_results:
-            all_results[key] = {
-                "document": result.document,
-                "vector_score": result.score,
-                "bm25_score": 0.0
-            }
-        else:
-            all_results[key]["vector_score"] = result.score
-    
-    # Thêm kết quả từ BM25 search
-    for result in bm25_search_results:
-        doc_id = result.document.metadata.get("id")
-        doc_type = result.document.metadata.get("type", "")
-        key = (doc_id, doc_type)
-        
-        if key not in all_results:
-            all_results[key] = {
-                "document": result.document,
-                "vector_score": 0.0,
-                "bm25_score": result.score
-            }
-        else:
-            all_results[key]["bm25_score"] = result.score
-    
-    # Tính điểm tổng hợp
-    for key, result in all_results.items():
-        result["final_score"] = (
-            result["vector_score"] * vector_weight +
-            result["bm25_score"] * (1 - vector_weight)
-        )
-    
-    # Sắp xếp theo điểm tổng hợp và lấy top_k kết quả
-    sorted_results = sorted(
-        all_results.values(),
-        key=lambda x: x["final_score"],
-        reverse=True
+    # 1. Vector search (relevance score: càng cao càng liên quan, khác với distance)
+    vector_results = vectordb.similarity_search_with_relevance_scores(query, k=top_k*2)
+    
+    # 2. Keyword search với BM25 (điểm BM25 thật)
+    bm25_results = get_bm25_retriever(documents).search_with_scores(query, k=top_k*2)
+    
+    # 3. Đánh số document theo (id, type) rồi kết hợp điểm bằng mảng NumPy
+    positions: Dict[Tuple[str, str], int] = {}
+    candidates: List[Document] = []
+    id_lists, score_lists = [], []
+    for results in (vector_results, bm25_results):
+        ids = []
+        for doc, _ in results:
+            key = document_key(doc)
+            if key not in positions:
+                positions[key] = len(candidates)
+                candidates.append(doc)
+            ids.append(positions[key])
+        id_lists.append(np.asarray(ids, dtype=np.int64))
+        score_lists.append(np.asarray([score for _, score in results], dtype=np.float64))
+    
+    fused_ids, fused_scores = fuse(
+        id_lists, score_lists,
+        weights=[vector_weight, 1 - vector_weight],
+        method=fusion_method
     )
+    sorted_results = [
+        {"document": candidates[i], "final_score": float(score)}
+        for i, score in zip(fused_ids, fused_scores)
+    ]
     
     # Lọc ra các document duy nhất theo ID (ưu tiên document có điểm cao hơn)
     unique_doc_ids = set()
     final_results = []
     
     for result in sorted_results:
-        doc_id = result["document"].metadata.get("id")
+        doc_id = document_key(result["document"])[0]
         if doc_id not in unique_doc_ids:
             unique_doc_ids.add(doc_id)
             
@@ -5,18 +5,22 @@ Based on Qdrant Pipeline
 """
 
 import os
+import json
+import time
 import asyncio
 import uvicorn
 from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from dotenv import load_dotenv
-from langchain_community.embeddings import HuggingFaceInferenceAPIEmbeddings
-from qdrant_client import QdrantClient, models
-from openai import OpenAI
+from qdrant_client import AsyncQdrantClient, models
+from openai import AsyncOpenAI
+import httpx
 import logging
+import re
+import unicodedata
 
 # Configure logging
 logging.basicConfig(
@@ -39,7 +43,87 @@ class Config:
     QDRANT_COLLECTION = os.getenv("COLLECTION_NAME", "legal_rag")
     HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
     EMBEDDINGS_MODEL_NAME = os.getenv("EMBEDDINGS_MODEL_NAME", "sentence-transformers/paraphrase-multilingual-mpnet-base-v2")
+    EMBEDDINGS_API_URL = os.getenv(
+        "EMBEDDINGS_API_URL",
+        f"https://api-inference.huggingface.co/pipeline/feature-extraction/{EMBEDDINGS_MODEL_NAME}"
+    )
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    EXACT_INDEX_REFRESH_SECONDS = int(os.getenv("EXACT_INDEX_REFRESH_SECONDS", "600"))  # 0 disables refresh
+    DISCONNECT_CHECK_SECONDS = float(os.getenv("DISCONNECT_CHECK_SECONDS", "1.0"))  # How often streaming checks the client
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCTUATION_RE = re.compile(r"^[\W_]+|[\W_]+$")
+# Old-style tone placement ("hoá", "thuý") -> new style ("hóa", "thúy"), matched on NFD text.
+# The "u" of "qu" is part of the consonant, so "quá" / "quý" are left alone
+_OLD_TONE_RE = re.compile(r"(?<![qQ])([oOuU])([aAeEyY])([\u0300\u0301\u0303\u0309\u0323])(?![^\W\d_])")
+
+def normalize_question(text: str) -> str:
+    """Normalize a Vietnamese question for exact matching (diacritics, casing, whitespace)"""
+    text = unicodedata.normalize("NFD", text)
+    text = _OLD_TONE_RE.sub(r"\1\3\2", text)
+    text = unicodedata.normalize("NFC", text).casefold()
+    text = _WHITESPACE_RE.sub(" ", text)
+    return _EDGE_PUNCTUATION_RE.sub("", text)
+
+class ExactMatchIndex:
+    """In-memory normalized question -> point hash map, loaded by scrolling the collection"""
+    
+    def __init__(self):
+        self.points: Dict[str, Any] = {}
+        self.loaded = False
+    
+    async def refresh(self, client: AsyncQdrantClient, collection_name: str, page_size: int = 1000):
+        """Scroll the whole collection once and swap in a fresh map"""
+        points = {}
+        offset = None
+        while True:
+            records, offset = await client.scroll(
+                collection_name=collection_name,
+                limit=page_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False
+            )
+            for record in records:
+                self.add(record, points)
+            if offset is None:
+                break
+        
+        self.points = points
+        self.loaded = True
+        logger.info(f"Exact-match index loaded with {len(points)} questions")
+    
+    def add(self, record, points: Optional[Dict[str, Any]] = None):
+        """Index one point by its normalized question (first point wins)"""
+        points = self.points if points is None else points
+        question = (record.payload or {}).get("metadata", {}).get("question")
+        if question:
+            points.setdefault(normalize_question(question), record)
+    
+    def lookup(self, query: str):
+        return self.points.get(normalize_question(query))
+
+class AsyncHFEmbeddings:
+    """Query embeddings from the HuggingFace Inference API over a pooled async HTTP client"""
+    
+    def __init__(self, api_key: str, api_url: str, timeout: float = 10.0):
+        self.client = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout
+        )
+        self.api_url = api_url
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a single query without blocking the event loop"""
+        response = await self.client.post(
+            self.api_url,
+            json={"inputs": text, "options": {"wait_for_model": True}}
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    async def aclose(self):
+        await self.client.aclose()
 
 # API Models
 class Message(BaseModel):
@@ -80,24 +164,35 @@ app.add_middleware(
 embeddings = None
 qdrant_client = None
 openai_client = None
+exact_index = ExactMatchIndex()
+exact_index_task = None
+
+async def refresh_exact_index_periodically():
+    """Reload the exact-match index on a timer so new questions are picked up"""
+    while True:
+        await asyncio.sleep(Config.EXACT_INDEX_REFRESH_SECONDS)
+        try:
+            await exact_index.refresh(qdrant_client, Config.QDRANT_COLLECTION)
+        except Exception as e:
+            logger.error(f"Exact-match index refresh error: {str(e)}")
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize connections on startup"""
-    global embeddings, qdrant_client, openai_client
+    global embeddings, qdrant_client, openai_client, exact_index_task
     
     try:
         logger.info("Initializing RAG Backend...")
         
         # Initialize embeddings
-        embeddings = HuggingFaceInferenceAPIEmbeddings(
+        embeddings = AsyncHFEmbeddings(
             api_key=Config.HUGGINGFACE_API_KEY,
-            model_name=Config.EMBEDDINGS_MODEL_NAME
+            api_url=Config.EMBEDDINGS_API_URL
         )
         logger.info("Embeddings model initialized")
 
         # Initialize Qdrant
-        qdrant_client = QdrantClient(
+        qdrant_client = AsyncQdrantClient(
             url=Config.QDRANT_URL,
             api_key=Config.QDRANT_API_KEY,
             timeout=10
@@ -105,18 +200,18 @@ async def startup_event():
         logger.info("Qdrant client initialized")
 
         # Verify collection
-        collection_info = qdrant_client.get_collection(
+        collection_info = await qdrant_client.get_collection(
             collection_name=Config.QDRANT_COLLECTION
         )
         logger.info(f"Connected to collection: {Config.QDRANT_COLLECTION}")
         logger.info(f"Vector size: {collection_info.config.params.vectors.size}")
 
         # Initialize OpenAI
-        openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        openai_client = AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
         logger.info("OpenAI client initialized")
 
         # Check sample point
-        points = qdrant_client.scroll(
+        points = await qdrant_client.scroll(
             collection_name=Config.QDRANT_COLLECTION,
             limit=1,
             with_payload=True
@@ -126,6 +221,14 @@ async def startup_event():
             logger.info("Sample point structure:")
             logger.info(f"Point ID: {first_point.id}")
             logger.info(f"Payload: {first_point.payload}")
+        
+        # Build the exact-match index (falls back to Qdrant filters if this fails)
+        try:
+            await exact_index.refresh(qdrant_client, Config.QDRANT_COLLECTION)
+            if Config.EXACT_INDEX_REFRESH_SECONDS > 0:
+                exact_index_task = asyncio.create_task(refresh_exact_index_periodically())
+        except Exception as e:
+            logger.error(f"Exact-match index load error: {str(e)}")
             
     except Exception as e:
         logger.error(f"Startup error: {str(e)}")
@@ -134,36 +237,50 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
-    global qdrant_client
+    global embeddings, qdrant_client, openai_client, exact_index_task
+    if exact_index_task:
+        exact_index_task.cancel()
     if qdrant_client:
-        qdrant_client.close()
+        await qdrant_client.close()
+    if embeddings:
+        await embeddings.aclose()
+    if openai_client:
+        await openai_client.close()
 
-def search_semantic(query: str, top_k: int = 5):
+async def search_semantic(query: str, top_k: int = 5):
     """Search for semantically similar documents"""
     global embeddings, qdrant_client
     
     try:
         # Create embedding for query
-        query_vector = embeddings.embed_query(query)
+        query_vector = await embeddings.aembed_query(query)
         
         # Search in Qdrant
-        search_results = qdrant_client.search(
+        search_results = await qdrant_client.query_points(
             collection_name=Config.QDRANT_COLLECTION,
-            query_vector=query_vector,
+            query=query_vector,
             limit=top_k,
             with_payload=True,
             score_threshold=0.5
         )
         
-        return search_results
+        return search_results.points
     except Exception as e:
         logger.error(f"Semantic search error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
 
-def search_exact(query: str):
+async def search_exact(query: str):
     """Search for exact match in questions"""
     global qdrant_client
     
+    # Answer from the in-memory index without touching Qdrant
+    if exact_index.loaded:
+        point = exact_index.lookup(query)
+        if point is not None:
+            return point
+    
+    # Not in the index (or no index): ask Qdrant, the question may have been
+    # added after the last refresh
     try:
         # Create filter for exact match
         scroll_filter = models.Filter(
@@ -176,7 +293,7 @@ def search_exact(query: str):
         )
         
         # Search in Qdrant
-        scroll_results = qdrant_client.scroll(
+        scroll_results = await qdrant_client.scroll(
             collection_name=Config.QDRANT_COLLECTION,
             scroll_filter=scroll_filter,
             limit=1,
@@ -184,31 +301,114 @@ def search_exact(query: str):
         )
         
         if scroll_results and len(scroll_results[0]) > 0:
-            return scroll_results[0][0]
+            point = scroll_results[0][0]
+            if exact_index.loaded:
+                exact_index.add(point)
+            return point
         return None
     except Exception as e:
         logger.error(f"Exact search error: {str(e)}")
         # Don't raise exception, just return None
         return None
 
-async def get_openai_response(messages: List[Dict[str, str]], model: str = "gpt-3.5-turbo", temperature: float = 0.7):
-    """Get response from OpenAI"""
+def cancel_task(task: asyncio.Task):
+    """Cancel a background task we no longer need, without leaking its exception"""
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+async def get_openai_response(messages: List[Dict[str, str]], model: str = "gpt-3.5-turbo", temperature: float = 0.7, stream: bool = False):
+    """Get response from OpenAI (an async chunk stream when stream=True)"""
     global openai_client
     
     try:
-        response = openai_client.chat.completions.create(
+        response = await openai_client.chat.completions.create(
             model=model,
             messages=messages,
             temperature=temperature,
-            max_tokens=2048
+            max_tokens=2048,
+            stream=stream
         )
         return response
     except Exception as e:
         logger.error(f"OpenAI error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"OpenAI error: {str(e)}")
 
+def sse_chunk(completion_id: str, model: str, created: int, delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+    """Format one OpenAI-compatible chat.completion.chunk as a server-sent event"""
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+    return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+async def stream_text(content: str, model: str) -> AsyncIterator[str]:
+    """Stream an already known answer (exact match / high confidence) as SSE chunks"""
+    completion_id = f"chatcmpl-{os.urandom(12).hex()}"
+    created = int(time.time())
+    yield sse_chunk(completion_id, model, created, {"role": "assistant", "content": content})
+    yield sse_chunk(completion_id, model, created, {}, finish_reason="stop")
+    yield "data: [DONE]\n\n"
+
+def sse_error(message: str) -> str:
+    """Format an error as a separate SSE `error` event (sent instead of a finish_reason)"""
+    error = {"error": {"message": message, "type": "server_error"}}
+    return f"event: error\ndata: {json.dumps(error, ensure_ascii=False)}\n\n"
+
+async def stream_openai(openai_stream, model: str, http_request: Optional[Request] = None) -> AsyncIterator[str]:
+    """Forward OpenAI completion deltas to the client as they arrive"""
+    completion_id = f"chatcmpl-{os.urandom(12).hex()}"
+    created = int(time.time())
+    try:
+        yield sse_chunk(completion_id, model, created, {"role": "assistant", "content": ""})
+        next_disconnect_check = time.monotonic() + Config.DISCONNECT_CHECK_SECONDS
+        try:
+            async for chunk in openai_stream:
+                # Checking the client on every token is too costly, so only check now and then
+                if http_request is not None and time.monotonic() >= next_disconnect_check:
+                    next_disconnect_check = time.monotonic() + Config.DISCONNECT_CHECK_SECONDS
+                    if await http_request.is_disconnected():
+                        logger.info("Client disconnected, stopping OpenAI stream")
+                        return
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                delta = {"content": choice.delta.content} if choice.delta.content else {}
+                if delta or choice.finish_reason:
+                    yield sse_chunk(completion_id, chunk.model or model, created, delta, choice.finish_reason)
+        except Exception as e:
+            logger.error(f"OpenAI streaming error: {str(e)}")
+            # No "stop" chunk: clients would take the cut-off answer as complete
+            yield sse_error(str(e))
+        yield "data: [DONE]\n\n"
+    finally:
+        # Runs on normal end, on errors and when the client goes away (CancelledError),
+        # so OpenAI stops generating (and billing) for nobody
+        try:
+            await openai_stream.close()
+        except Exception as e:
+            logger.warning(f"Could not close OpenAI stream: {str(e)}")
+
+def direct_response(request: ChatRequest, content: str):
+    """Answer with a known text, either as one JSON response or as an SSE stream"""
+    if request.stream:
+        return StreamingResponse(stream_text(content, request.model), media_type="text/event-stream")
+    return ChatResponse(
+        model=request.model,
+        choices=[{
+            "index": 0,
+            "message": {
+                "role": "assistant",
+                "content": content
+            },
+            "finish_reason": "stop"
+        }]
+    )
+
 @app.post("/v1/chat/completions", response_model=ChatResponse)
-async def chat_completions(request: ChatRequest):
+async def chat_completions(request: ChatRequest, http_request: Request):
     """Chat completions endpoint compatible with OpenAI format"""
     global embeddings, qdrant_client, openai_client
     
@@ -220,11 +420,18 @@ async def chat_completions(request: ChatRequest):
         user_message = request.messages[-1].content
         logger.info(f"Processing query: {user_message}")
         
-        # Step 1: Try exact match
-        logger.info("Trying exact match...")
-        exact_match = search_exact(user_message)
+        # Step 1: Start exact match and semantic search concurrently
+        logger.info("Trying exact match and semantic search concurrently...")
+        semantic_task = asyncio.create_task(search_semantic(user_message))
+        try:
+            exact_match = await search_exact(user_message)
+        except BaseException:
+            cancel_task(semantic_task)
+            raise
+        
         if exact_match:
             logger.info("Found exact match")
+            cancel_task(semantic_task)
             content = exact_match.payload.get('page_content', '')
             metadata = exact_match.payload.get('metadata', {})
             
@@ -233,34 +440,17 @@ async def chat_completions(request: ChatRequest):
                 f"(Nguồn: {metadata.get('source', 'Không rõ')})"
             )
             
-            return ChatResponse(
-                model=request.model,
-                choices=[{
-                    "index": 0,
-                    "message": {
-                        "role": "assistant",
-                        "content": response_content
-                    },
-                    "finish_reason": "stop"
-                }]
-            )
+            return direct_response(request, response_content)
         
-        # Step 2: Semantic search
-        logger.info("Performing semantic search...")
-        search_results = search_semantic(user_message)
+        # Step 2: Use the semantic search results
+        logger.info("Waiting for semantic search...")
+        search_results = await semantic_task
         
         if not search_results:
             logger.info("No relevant documents found")
-            return ChatResponse(
-                model=request.model,
-                choices=[{
-                    "index": 0,
-                    "message": {
-                        "role": "assistant",
-                        "content": "Xin lỗi, tôi không tìm thấy thông tin liên quan đến câu hỏi của bạn."
-                    },
-                    "finish_reason": "stop"
-                }]
+            return direct_response(
+                request,
+                "Xin lỗi, tôi không tìm thấy thông tin liên quan đến câu hỏi của bạn."
             )
         
         # Extract context from search results
@@ -279,17 +469,7 @@ async def chat_completions(request: ChatRequest):
                     f"(Nguồn: {metadata.get('source', 'Không rõ')})"
                 )
                 
-                return ChatResponse(
-                    model=request.model,
-                    choices=[{
-                        "index": 0,
-                        "message": {
-                            "role": "assistant",
-                            "content": response_content
-                        },
-                        "finish_reason": "stop"
-                    }]
-                )
+                return direct_response(request, response_content)
             
             if score > 0.5:
                 context.append(content)
@@ -307,6 +487,18 @@ async def chat_completions(request: ChatRequest):
             {"role": "user", "content": user_message}
         ]
         
+        if request.stream:
+            openai_stream = await get_openai_response(
+                messages=messages,
+                model=request.model,
+                temperature=request.temperature,
+                stream=True
+            )
+            return StreamingResponse(
+                stream_openai(openai_stream, request.model, http_request),
+                media_type="text/event-stream"
+            )
+        
         openai_response = await get_openai_response(
             messages=messages,
             model=request.model,
@@ -0,0 +1,302 @@
+"""
+This module helps search many vectors quickly with approximate nearest neighbour
+(ANN) indexes that run inside the Python process. A flat index compares the
+question with every vector; HNSW and IVF-PQ only look at a small part of them,
+trading a little recall for much lower latency on large corpora.
+"""
+
+from typing import List, Optional, Dict, Any, Sequence
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+import numpy as np
+import faiss
+import time
+
+# Default configuration
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+DEFAULT_HNSW_M = 32              # Links per node; more links = better recall, more memory
+DEFAULT_EF_CONSTRUCTION = 200    # Search width while building the graph
+DEFAULT_EF_SEARCH = 64           # Search width per question; raise it for better recall
+DEFAULT_PQ_BITS = 8              # Bits per sub-vector code
+DEFAULT_NPROBE = 16              # Clusters visited per question
+MIN_TRAINING_POINTS = 39         # FAISS wants about 39 training vectors per cluster
+
+# Build options that apply to each index type
+BUILD_PARAMS = {
+    "flat": (),
+    "hnsw": ("hnsw_m", "ef_construction"),
+    "ivfpq": ("nlist", "pq_m", "pq_bits", "refine_k_factor")
+}
+
+# Index types where LangChain's FAISS.delete() works. HNSW graphs cannot remove
+# nodes, and IVF keeps the old ids after a removal while LangChain renumbers them.
+DELETE_SUPPORTED = ("flat",)
+
+def _default_nlist(num_vectors: int) -> int:
+    """Number of IVF clusters: about 4 * sqrt(n), with enough vectors to train each one."""
+    return max(1, min(int(4 * np.sqrt(num_vectors)), num_vectors // MIN_TRAINING_POINTS))
+
+def _default_pq_m(dim: int) -> int:
+    """Number of PQ sub-vectors: 8 dimensions each (384 -> 48 bytes per vector)."""
+    for m in (dim // 8, dim // 4, dim // 2, dim):
+        if m and dim % m == 0:
+            return m
+    return 1
+
+def create_faiss_index(
+    dim: int,
+    index_type: str = "hnsw",
+    train_vectors: Optional[np.ndarray] = None,
+    hnsw_m: int = DEFAULT_HNSW_M,
+    ef_construction: int = DEFAULT_EF_CONSTRUCTION,
+    ef_search: int = DEFAULT_EF_SEARCH,
+    nlist: Optional[int] = None,
+    pq_m: Optional[int] = None,
+    pq_bits: int = DEFAULT_PQ_BITS,
+    nprobe: int = DEFAULT_NPROBE,
+    refine_k_factor: Optional[int] = None
+) -> "faiss.Index":
+    """
+    Create an empty FAISS index, trained if the index type needs it.
+
+    All index types use L2 distance, like FAISS.from_documents, so scores
+    stay comparable with the default flat index.
+
+    Args:
+        dim: Vector dimension (384 for MiniLM, 768 for mpnet)
+        index_type: 'flat' (exact), 'hnsw' or 'ivfpq'
+        train_vectors: Vectors to train IVF-PQ on (usually all vectors)
+        hnsw_m: HNSW links per node
+        ef_construction: HNSW search width while building
+        ef_search: HNSW search width per question
+        nlist: IVF clusters (default: about 4 * sqrt(n))
+        pq_m: PQ sub-vectors, must divide dim (default: dim / 8)
+        pq_bits: Bits per PQ code
+        nprobe: IVF clusters visited per question
+        refine_k_factor: Re-score k * refine_k_factor IVF-PQ candidates with the
+            exact vectors (better recall, but keeps full vectors in memory)
+
+    Returns:
+        A FAISS index ready for add()
+
+    Example:
+        >>> index = create_faiss_index(384, "hnsw", hnsw_m=32, ef_search=128)
+        >>> index.add(vectors)
+    """
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+        return index
+
+    if index_type == "ivfpq":
+        if train_vectors is None:
+            raise ValueError("IVF-PQ needs train_vectors")
+        train_vectors = np.ascontiguousarray(train_vectors, dtype=np.float32)
+        num_vectors = len(train_vectors)
+        if num_vectors < 2 ** pq_bits:
+            raise ValueError(
+                f"IVF-PQ needs at least {2 ** pq_bits} vectors to train, got {num_vectors}. "
+                "Use 'flat' or 'hnsw' for small corpora."
+            )
+        nlist = nlist or _default_nlist(num_vectors)
+        pq_m = pq_m or _default_pq_m(dim)
+        if dim % pq_m != 0:
+            raise ValueError(f"pq_m ({pq_m}) must divide the vector dimension ({dim})")
+
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_bits)
+        index.train(train_vectors)
+        index.nprobe = min(nprobe, nlist)
+        if refine_k_factor:
+            index = faiss.IndexRefineFlat(index)
+            index.k_factor = refine_k_factor
+        return index
+
+    raise ValueError(f"Unknown index type: {index_type}. Use one of {INDEX_TYPES}")
+
+def set_search_params(
+    index: "faiss.Index",
+    ef_search: Optional[int] = None,
+    nprobe: Optional[int] = None
+) -> None:
+    """
+    Change how widely an index searches, without rebuilding it.
+
+    Args:
+        index: A FAISS index (e.g. vector_store.index)
+        ef_search: New HNSW search width (ignored for other types)
+        nprobe: New number of IVF clusters to visit (ignored for other types)
+    """
+    if hasattr(index, "base_index"):
+        # Refined IVF-PQ: the search options live on the wrapped index
+        index = faiss.downcast_index(index.base_index)
+    if ef_search is not None and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+    if nprobe is not None and hasattr(index, "nprobe"):
+        index.nprobe = nprobe
+
+def create_ann_vector_store(
+    documents: List[Document],
+    embeddings: Embeddings,
+    index_type: str = "hnsw",
+    ids: Optional[List[str]] = None,
+    **index_params: Any
+) -> FAISS:
+    """
+    Embed documents and store them in a LangChain FAISS store backed by an ANN index.
+
+    Args:
+        documents: Documents to store
+        embeddings: Embedding model
+        index_type: 'flat', 'hnsw' or 'ivfpq'
+        ids: Vector ids for the documents (optional)
+        **index_params: Options for create_faiss_index (hnsw_m, ef_search, nlist, ...)
+
+    Returns:
+        A FAISS vector store (save_local / load_local work as usual)
+
+    Example:
+        >>> store = create_ann_vector_store(documents, embeddings, "hnsw", ef_search=128)
+        >>> docs = store.similarity_search("What is RAG?", k=4)
+    """
+    texts = [doc.page_content for doc in documents]
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+    index = create_faiss_index(vectors.shape[1], index_type, train_vectors=vectors, **index_params)
+    store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={}
+    )
+    store.add_embeddings(
+        list(zip(texts, vectors.tolist())),
+        metadatas=[doc.metadata for doc in documents],
+        ids=ids
+    )
+    return store
+
+def index_size_bytes(index: "faiss.Index") -> int:
+    """Size of an index when saved, a good estimate of its memory use."""
+    return int(faiss.serialize_index(index).nbytes)
+
+def _recall(found: np.ndarray, exact: np.ndarray) -> float:
+    """Average share of the exact top-k that the index also found."""
+    k = exact.shape[1]
+    hits = sum(len(set(row[row >= 0]) & set(true_row)) for row, true_row in zip(found, exact))
+    return hits / (len(exact) * k)
+
+def _time_queries(index: "faiss.Index", queries: np.ndarray, k: int) -> tuple:
+    """Search one question at a time (like interactive use) and time each search."""
+    latencies = np.empty(len(queries))
+    results = np.empty((len(queries), k), dtype=np.int64)
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, found = index.search(queries[i:i + 1], k)
+        latencies[i] = time.perf_counter() - start
+        results[i] = found[0]
+    return results, latencies
+
+def benchmark_indexes(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    ef_search_values: Sequence[int] = (16, 32, 64, 128, 256),
+    nprobe_values: Sequence[int] = (1, 4, 16, 64),
+    **index_params: Any
+) -> List[Dict[str, Any]]:
+    """
+    Measure recall@k and latency of HNSW and IVF-PQ against exact flat search.
+
+    Each index is built once; the search width (efSearch / nprobe) is then
+    swept to show the recall-vs-latency trade-off.
+
+    Args:
+        vectors: Corpus vectors, shape (n, dim)
+        queries: Question vectors, shape (q, dim)
+        k: Number of neighbours per question
+        ef_search_values: HNSW efSearch values to try
+        nprobe_values: IVF-PQ nprobe values to try
+        **index_params: Build options for create_faiss_index (hnsw_m, nlist, pq_m, ...)
+
+    Returns:
+        One row per setting with index, param, recall, p50_ms, p95_ms, build_s and size_mb
+
+    Example:
+        >>> rows = benchmark_indexes(corpus_vectors, query_vectors, k=10)
+        >>> print_benchmark(rows)
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    dim = vectors.shape[1]
+    rows = []
+
+    def add_row(name, param, index, build_s, exact):
+        found, latencies = _time_queries(index, queries, k)
+        rows.append({
+            "index": name,
+            "param": param,
+            "recall": 1.0 if exact is None else _recall(found, exact),
+            "p50_ms": float(np.percentile(latencies, 50) * 1000),
+            "p95_ms": float(np.percentile(latencies, 95) * 1000),
+            "build_s": build_s,
+            "size_mb": index_size_bytes(index) / 2 ** 20
+        })
+        return found
+
+    sweeps = {"hnsw": ("efSearch", ef_search_values), "ivfpq": ("nprobe", nprobe_values)}
+    exact = None
+    for index_type in INDEX_TYPES:
+        params = {key: value for key, value in index_params.items() if key in BUILD_PARAMS[index_type]}
+        start = time.perf_counter()
+        index = create_faiss_index(dim, index_type, train_vectors=vectors, **params)
+        index.add(vectors)
+        build_s = time.perf_counter() - start
+
+        if index_type == "flat":
+            exact = add_row("flat", "-", index, build_s, None)
+            continue
+        param_name, values = sweeps[index_type]
+        for value in values:
+            if index_type == "hnsw":
+                set_search_params(index, ef_search=value)
+            else:
+                set_search_params(index, nprobe=value)
+            add_row(index_type, f"{param_name}={value}", index, build_s, exact)
+    return rows
+
+def print_benchmark(rows: List[Dict[str, Any]]) -> None:
+    """Print benchmark rows as a table."""
+    print(f"{'Index':<7} {'Param':<14} {'Recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'Build s':>8} {'Size MB':>8}")
+    for row in rows:
+        print(
+            f"{row['index']:<7} {row['param']:<14} {row['recall']:>7.3f} {row['p50_ms']:>8.3f} "
+            f"{row['p95_ms']:>8.3f} {row['build_s']:>8.2f} {row['size_mb']:>8.1f}"
+        )
+
+if __name__ == "__main__":
+    """
+    This part runs when you run this file directly.
+    It compares HNSW and IVF-PQ with exact search on random clustered vectors.
+    Pass a .npy file of real embeddings to benchmark those instead.
+    """
+    import sys
+
+    rng = np.random.default_rng(0)
+    if len(sys.argv) > 1:
+        corpus = np.load(sys.argv[1]).astype(np.float32)
+    else:
+        # 100k MiniLM-sized vectors around 1000 topics
+        centers = rng.standard_normal((1000, 384)).astype(np.float32)
+        corpus = centers[rng.integers(0, 1000, 100_000)] + 0.5 * rng.standard_normal((100_000, 384)).astype(np.float32)
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = corpus[rng.choice(len(corpus), 200, replace=False)] + 0.05 * rng.standard_normal((200, corpus.shape[1])).astype(np.float32)
+
+    print(f"Benchmarking {len(corpus)} vectors of dimension {corpus.shape[1]} (k=10)\n")
+    print_benchmark(benchmark_indexes(corpus, queries, k=10))
@@ -15,10 +15,29 @@ from dotenv import load_dotenv
 import os
 import sys
 from langchain_openai import OpenAIEmbeddings
+from layers._03_embedding.embedding_cache import CachedEmbeddings
+from layers._03_embedding.ann_index import create_ann_vector_store, DELETE_SUPPORTED
+from layers._03_embedding.mmap_store import MmapVectorStore
+from layers._03_embedding.index_sync import (
+    IndexManifest,
+    SyncPlan,
+    MANIFEST_FILE_NAME,
+    get_document_keys,
+    make_vector_id,
+    apply_sync_plan
+)
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Where each store type is saved when no folder is given
+DEFAULT_PERSIST_DIRECTORIES = {
+    "faiss": "./faiss_data",
+    "qdrant": "./qdrant_data",
+    "chroma": "./chroma_data",
+    "mmap": "./mmap_data"
+}
+
 def check_dependencies():
     """Check if required dependencies are installed."""
     try:
@@ -59,28 +78,42 @@ class DocumentEmbedder:
     - Find similar texts quickly
     
     It supports different ways to store vectors:
-    - FAISS (fast search)
+    - FAISS (fast search, exact or approximate with HNSW / IVF-PQ)
     - Qdrant (powerful vector database)
     - Milvus (scalable vector database)
     - Chroma (simple and fast)
+    - Mmap (float16 / int8 vectors in a memory-mapped file, low RAM)
     """
     
     def __init__(
         self,
         embeddings_model: Optional[HuggingFaceEmbeddings] = None,
-        vector_store_type: str = "faiss"
+        vector_store_type: str = "faiss",
+        cache_dir: Optional[str] = None,
+        cache_max_entries: int = 100_000,
+        index_type: str = "flat",
+        index_params: Optional[Dict[str, Any]] = None
     ):
         """
         Start the DocumentEmbedder with optional AI model and storage type.
         
         Args:
             embeddings_model: Optional AI model for converting text to numbers
-            vector_store_type: How to store vectors ('faiss', 'qdrant', 'milvus', 'chroma')
+            vector_store_type: How to store vectors ('faiss', 'qdrant', 'milvus', 'chroma', 'mmap')
+            cache_dir: Folder for the on-disk embedding cache (optional, no cache if not given)
+            cache_max_entries: Maximum number of vectors kept in the embedding cache
+            index_type: FAISS index to use: 'flat' (exact), 'hnsw' or 'ivfpq' (approximate)
+            index_params: Options for the FAISS index (e.g. {"hnsw_m": 32, "ef_search": 128})
+                or the mmap store (e.g. {"dtype": "int8", "rescore": True})
             
         Example:
             >>> from langchain_community.embeddings import HuggingFaceEmbeddings
             >>> embeddings = HuggingFaceEmbeddings()
             >>> embedder = DocumentEmbedder(embeddings_model=embeddings)
+            >>> # Reuse vectors of unchanged texts between rebuilds
+            >>> embedder = DocumentEmbedder(cache_dir="./embedding_cache")
+            >>> # Approximate search for large corpora
+            >>> embedder = DocumentEmbedder(index_type="hnsw", index_params={"ef_search": 128})
         """
         # Check dependencies
         check_dependencies()
@@ -95,13 +128,24 @@ class DocumentEmbedder:
         else:
             self.embeddings_model = embeddings_model
             
+        # Wrap the model so rebuilds only embed new or changed texts
+        if cache_dir is not None:
+            self.embeddings_model = CachedEmbeddings(
+                self.embeddings_model,
+                cache_dir=cache_dir,
+                max_entries=cache_max_entries
+            )
+            
         self.vector_store_type = vector_store_type
+        self.index_type = index_type
+        self.index_params = index_params or {}
         self.vector_store = None
 
     def create_vector_store(
         self,
         documents: List[Document],
-        persist_directory: Optional[str] = None
+        persist_directory: Optional[str] = None,
+        ids: Optional[List[str]] = None
     ) -> VectorStore:
         """
         Convert documents into vectors and store them.
@@ -109,6 +153,7 @@ class DocumentEmbedder:
         Args:
             documents: List of documents to convert
             persist_directory: Where to save the vectors (optional)
+            ids: Vector ids for the documents (optional, not used for Milvus)
             
         Returns:
             A store containing the document vectors
@@ -118,10 +163,22 @@ class DocumentEmbedder:
             >>> print(f"Created store with {len(documents)} documents")
         """
         try:
-            if self.vector_store_type == "faiss":
+            if self.vector_store_type == "faiss" and self.index_type != "flat":
+                self.vector_store = create_ann_vector_store(
+                    documents,
+                    self.embeddings_model,
+                    self.index_type,
+                    ids=ids,
+                    **self.index_params
+                )
+                if persist_directory:
+                    self.vector_store.save_local(persist_directory)
+                    
+            elif self.vector_store_type == "faiss":
                 self.vector_store = FAISS.from_documents(
                     documents=documents,
-                    embedding=self.embeddings_model
+                    embedding=self.embeddings_model,
+                    ids=ids
                 )
                 if persist_directory:
                     self.vector_store.save_local(persist_directory)
@@ -138,7 +195,8 @@ class DocumentEmbedder:
                     documents=documents,
                     embedding=self.embeddings_model,
                     client=client,
-                    collection_name="documents"
+                    collection_name="documents",
+                    ids=ids
                 )
                 
             elif self.vector_store_type == "milvus":
@@ -184,7 +242,17 @@ class DocumentEmbedder:
                 self.vector_store = Chroma.from_documents(
                     documents=documents,
                     embedding=self.embeddings_model,
-                    persist_directory=persist_directory
+                    persist_directory=persist_directory,
+                    ids=ids
+                )
+                
+            elif self.vector_store_type == "mmap":
+                self.vector_store = MmapVectorStore.from_documents(
+                    documents=documents,
+                    embedding=self.embeddings_model,
+                    ids=ids,
+                    persist_directory=persist_directory or DEFAULT_PERSIST_DIRECTORIES["mmap"],
+                    **self.index_params
                 )
                 
             else:
@@ -214,6 +282,92 @@ class DocumentEmbedder:
             
         self.vector_store.add_documents(documents)
 
+    def sync_documents(
+        self,
+        documents: List[Document],
+        persist_directory: Optional[str] = None
+    ) -> SyncPlan:
+        """
+        Bring the stored vectors up to date with the given documents.
+        
+        The first call builds the store and writes a manifest with a fingerprint
+        of every document. Later calls compare the documents with the manifest and
+        only add new documents, re-embed changed ones and delete removed ones.
+        
+        Args:
+            documents: The full, current list of documents
+            persist_directory: Where the store and manifest are saved (optional)
+            
+        Returns:
+            The SyncPlan that was applied
+            
+        Example:
+            >>> plan = embedder.sync_documents(documents, "./faiss_data")
+            >>> print(plan.summary())  # {'added': 1, 'updated': 2, 'deleted': 0, ...}
+        """
+        if self.vector_store_type not in DEFAULT_PERSIST_DIRECTORIES:
+            raise ValueError(f"Incremental sync is not supported for: {self.vector_store_type}")
+        persist_directory = persist_directory or DEFAULT_PERSIST_DIRECTORIES[self.vector_store_type]
+        
+        manifest = IndexManifest.load(
+            os.path.join(persist_directory, MANIFEST_FILE_NAME),
+            store_type=self.vector_store_type
+        )
+        
+        plan = manifest.diff(documents) if manifest.exists() else None
+        # HNSW / IVF-PQ indexes cannot delete vectors, so changed documents mean a rebuild
+        needs_rebuild = (
+            plan is not None
+            and self.vector_store_type == "faiss"
+            and self.index_type not in DELETE_SUPPORTED
+            and (plan.to_update or plan.to_delete)
+        )
+        
+        if plan is None or manifest.store_type != self.vector_store_type or needs_rebuild:
+            # No usable manifest (or an index that cannot delete): build the whole store
+            manifest = IndexManifest(manifest.path, store_type=self.vector_store_type)
+            plan = manifest.diff(documents)
+            ids = [make_vector_id(key) for key in get_document_keys(documents)]
+            self._clear_vector_store(persist_directory)
+            self.create_vector_store(documents, persist_directory, ids=ids)
+        else:
+            if self.vector_store is None:
+                self.load_vector_store(persist_directory)
+            apply_sync_plan(self.vector_store, plan)
+            if plan.has_changes and self.vector_store_type == "faiss":
+                self.vector_store.save_local(persist_directory)
+        
+        manifest.apply(plan)
+        manifest.save()
+        return plan
+
+    def _clear_vector_store(self, persist_directory: str) -> None:
+        """
+        Remove the stored vectors before a full rebuild.
+        
+        Qdrant and Chroma add to an existing collection, so without this the vectors
+        of documents deleted since the last build would stay in the store.
+        FAISS and mmap stores replace their files when they are written.
+        
+        Args:
+            persist_directory: Where the store is saved
+        """
+        if self.vector_store_type == "qdrant":
+            if self.vector_store is not None:
+                # The local Qdrant folder can only be opened by one client at a time
+                self.vector_store.client.close()
+            if os.path.isdir(persist_directory):
+                client = QdrantClient(path=persist_directory)
+                if client.collection_exists("documents"):
+                    client.delete_collection("documents")
+                client.close()
+        elif self.vector_store_type == "chroma" and os.path.isdir(persist_directory):
+            Chroma(
+                persist_directory=persist_directory,
+                embedding_function=self.embeddings_model
+            ).delete_collection()
+        self.vector_store = None
+
     def similarity_search(
         self,
         query: str,
@@ -287,6 +441,9 @@ class DocumentEmbedder:
             pass
         elif self.vector_store_type == "chroma":
             self.vector_store.persist()
+        elif self.vector_store_type == "mmap":
+            # The mmap store writes its files on every change
+            pass
 
     def load_vector_store(
         self,
@@ -310,9 +467,11 @@ class DocumentEmbedder:
         store_type = vector_store_type or self.vector_store_type
         
         if store_type == "faiss":
+            # The docstore pickle is our own artifact, written by save_local()
             self.vector_store = FAISS.load_local(
                 persist_directory,
-                self.embeddings_model
+                self.embeddings_model,
+                allow_dangerous_deserialization=True
             )
         elif store_type == "qdrant":
             client = QdrantClient(path=persist_directory)
@@ -332,34 +491,73 @@ class DocumentEmbedder:
                 persist_directory=persist_directory,
                 embedding_function=self.embeddings_model
             )
+        elif store_type == "mmap":
+            self.vector_store = MmapVectorStore(
+                persist_directory,
+                self.embeddings_model
+            )
         else:
             raise ValueError(f"Unknown vector store type: {store_type}")
             
         return self.vector_store
 
-def create_vectordb(documents: List[Document], persist_directory: str = "data/chroma") -> Chroma:
+def create_vectordb(
+    documents: List[Document],
+    persist_directory: str = "data/chroma",
+    cache_dir: Optional[str] = None,
+    incremental: bool = False
+) -> Chroma:
     """
     Create a vector database from documents using OpenAI embeddings
     
     Args:
         documents: List of documents to embed
         persist_directory: Directory to store the vector database
+        cache_dir: Folder for the on-disk embedding cache (optional)
+        incremental: Only apply changed documents to an existing database
         
     Returns:
         Chroma vector database instance
     """
     # Initialize embeddings
     embeddings = OpenAIEmbeddings()
+    if cache_dir is not None:
+        embeddings = CachedEmbeddings(embeddings, cache_dir=cache_dir)
     
-    # Create vector database
-    vectordb = Chroma.from_documents(
-        documents=documents,
-        embedding=embeddings,
-        persist_directory=persist_directory
+    manifest = IndexManifest.load(
+        os.path.join(persist_directory, MANIFEST_FILE_NAME),
+        store_type="chroma"
     )
     
+    if incremental and manifest.exists():
+        # Apply only the add/update/delete diff to the existing database
+        vectordb = Chroma(
+            persist_directory=persist_directory,
+            embedding_function=embeddings
+        )
+        plan = manifest.diff(documents)
+        apply_sync_plan(vectordb, plan)
+        print(f"Incremental sync: {plan.summary()}")
+    else:
+        # Create vector database from scratch, dropping vectors of an earlier build
+        manifest = IndexManifest(manifest.path, store_type="chroma")
+        plan = manifest.diff(documents)
+        if os.path.isdir(persist_directory):
+            Chroma(
+                persist_directory=persist_directory,
+                embedding_function=embeddings
+            ).delete_collection()
+        vectordb = Chroma.from_documents(
+            documents=documents,
+            embedding=embeddings,
+            persist_directory=persist_directory,
+            ids=[make_vector_id(key) for key in get_document_keys(documents)]
+        )
+    
     # Persist the database
     vectordb.persist()
+    manifest.apply(plan)
+    manifest.save()
     
     return vectordb
 
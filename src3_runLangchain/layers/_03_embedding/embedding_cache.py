@@ -0,0 +1,261 @@
+"""
+This module helps remember text vectors on disk so we don't compute them twice.
+Each vector is saved under a hash of the model name and the cleaned-up text,
+so rebuilding a store only pays for new or changed texts.
+"""
+
+from typing import List, Optional, Dict, Any
+from langchain_core.embeddings import Embeddings
+import numpy as np
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+import re
+import os
+
+# Default configuration
+DEFAULT_CACHE_DIR = "./embedding_cache"
+DEFAULT_MAX_ENTRIES = 100_000
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """
+    Clean up text so that tiny differences don't create new cache entries.
+
+    Args:
+        text: Text to clean up
+
+    Returns:
+        Text in Unicode NFC form with whitespace collapsed
+    """
+    text = unicodedata.normalize("NFC", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+def get_model_name(embeddings_model: Embeddings) -> str:
+    """
+    Find a name for the embeddings model to use in cache keys.
+
+    Args:
+        embeddings_model: The embeddings model
+
+    Returns:
+        The model name (HuggingFace `model_name` or OpenAI `model`)
+    """
+    for attr in ("model_name", "model"):
+        name = getattr(embeddings_model, attr, None)
+        if isinstance(name, str) and name:
+            return name
+    return type(embeddings_model).__name__
+
+class CachedEmbeddings(Embeddings):
+    """
+    A wrapper that saves vectors on disk and reuses them.
+
+    This class can:
+    - Look up vectors by a hash of model name + text
+    - Only send new texts to the real embeddings model
+    - Keep the cache small by removing the least recently used vectors
+    - Count cache hits and misses
+    """
+
+    def __init__(
+        self,
+        embeddings_model: Embeddings,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        model_name: Optional[str] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        """
+        Start the cache around an embeddings model.
+
+        Args:
+            embeddings_model: The real model used for texts not in the cache
+            cache_dir: Folder where the cache database is stored
+            model_name: Name used in cache keys (detected from the model if not given)
+            max_entries: Maximum number of vectors to keep on disk
+
+        Example:
+            >>> from langchain_community.embeddings import HuggingFaceEmbeddings
+            >>> embeddings = CachedEmbeddings(HuggingFaceEmbeddings())
+            >>> vectors = embeddings.embed_documents(["What is RAG?"])
+        """
+        self.embeddings_model = embeddings_model
+        self.model_name = model_name or get_model_name(embeddings_model)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_path = os.path.join(cache_dir, "embeddings.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+
+    def _make_key(self, text: str) -> str:
+        """Create the cache key for a text."""
+        content = f"{self.model_name}\x00{normalize_text(text)}"
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Get cached vectors for the given keys and mark them as recently used."""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # SQLite limits the number of query parameters, so look up in batches
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, items: Dict[str, List[float]]) -> None:
+        """Save new vectors and remove the oldest ones if the cache is too big."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                [
+                    (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                    for key, vector in items.items()
+                ]
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Convert texts into vectors, using the cache when possible.
+
+        Args:
+            texts: List of texts to convert
+
+        Returns:
+            One vector for each text, in the same order
+
+        Example:
+            >>> vectors = embeddings.embed_documents(["first text", "second text"])
+            >>> print(embeddings.stats())
+        """
+        keys = [self._make_key(text) for text in texts]
+        cached = self._lookup(keys)
+
+        # Only embed texts that are not in the cache (and only once each)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            new_vectors = self.embeddings_model.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_vectors))
+            self._store(computed)
+            cached.update(computed)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Convert a question into a vector, using the cache when possible.
+
+        Args:
+            text: The question to convert
+
+        Returns:
+            The question vector
+        """
+        key = self._make_key(f"query:{text}")
+        cached = self._lookup([key])
+        if key in cached:
+            self.hits += 1
+            return cached[key]
+
+        self.misses += 1
+        vector = self.embeddings_model.embed_query(text)
+        self._store({key: vector})
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit and miss counts.
+
+        Returns:
+            Dictionary with hits, misses, hit rate and number of stored vectors
+        """
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": size
+        }
+
+    def clear(self) -> None:
+        """Remove all vectors from the cache."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        """Close the cache database."""
+        with self._lock:
+            self._conn.close()
+
+if __name__ == "__main__":
+    """
+    This part runs when you run this file directly.
+    It shows examples of how to use the CachedEmbeddings class.
+    """
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    embeddings = CachedEmbeddings(
+        HuggingFaceEmbeddings(
+            model_name="sentence-transformers/all-MiniLM-L6-v2",
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'normalize_embeddings': True}
+        )
+    )
+
+    texts = ["RAG stands for Retrieval-Augmented Generation.", "Vector databases store embeddings."]
+
+    print("First pass (cold cache)...")
+    embeddings.embed_documents(texts)
+    print(embeddings.stats())
+
+    print("\nSecond pass (warm cache)...")
+    embeddings.embed_documents(texts + ["A brand new text."])
+    print(embeddings.stats())
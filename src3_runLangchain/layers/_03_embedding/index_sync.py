@@ -0,0 +1,223 @@
+"""
+This module helps keep a vector store in sync with a changing set of documents.
+It remembers a fingerprint for every document in a small manifest file,
+so a re-index only adds, updates or deletes the documents that changed.
+"""
+
+from typing import List, Optional, Dict, Any, Tuple
+from dataclasses import dataclass, field
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+import hashlib
+import json
+import uuid
+import os
+
+MANIFEST_FILE_NAME = "index_manifest.json"
+
+# Namespace for turning document keys into stable vector ids.
+# UUIDs work as ids for FAISS, Chroma and Qdrant.
+_VECTOR_ID_NAMESPACE = uuid.UUID("6f1c2b8e-3a4d-5e6f-8a9b-0c1d2e3f4a5b")
+
+def fingerprint_document(document: Document) -> str:
+    """
+    Create a fingerprint that changes whenever the document content or metadata changes.
+
+    Args:
+        document: The document to fingerprint
+
+    Returns:
+        A sha256 hex digest
+    """
+    content = json.dumps(
+        {"page_content": document.page_content, "metadata": document.metadata},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def get_document_keys(documents: List[Document]) -> List[str]:
+    """
+    Give every document a stable key based on its `id` metadata.
+
+    Documents without an `id` use a hash of their content instead.
+    When several chunks share the same `id`, a chunk number is added.
+
+    Args:
+        documents: List of documents
+
+    Returns:
+        One key for each document, in the same order
+    """
+    keys = []
+    seen: Dict[str, int] = {}
+    for doc in documents:
+        base = doc.metadata.get("id")
+        if base is None:
+            base = "sha256:" + hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+        base = str(base)
+        count = seen.get(base, 0)
+        seen[base] = count + 1
+        keys.append(base if count == 0 else f"{base}#{count}")
+    return keys
+
+def make_vector_id(key: str) -> str:
+    """Turn a document key into a stable vector id."""
+    return str(uuid.uuid5(_VECTOR_ID_NAMESPACE, key))
+
+@dataclass
+class SyncPlan:
+    """The changes needed to bring a vector store up to date."""
+    to_add: List[Tuple[str, Document]] = field(default_factory=list)
+    to_update: List[Tuple[str, Document]] = field(default_factory=list)
+    to_delete: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    fingerprints: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def has_changes(self) -> bool:
+        """Whether anything needs to be written to the vector store."""
+        return bool(self.to_add or self.to_update or self.to_delete)
+
+    def summary(self) -> Dict[str, int]:
+        """Count the changes in this plan."""
+        return {
+            "added": len(self.to_add),
+            "updated": len(self.to_update),
+            "deleted": len(self.to_delete),
+            "unchanged": self.unchanged
+        }
+
+class IndexManifest:
+    """
+    A file that remembers which documents are in a vector store.
+
+    For every document key it stores the fingerprint of the indexed version.
+    Keys that disappear from the documents become tombstones and are deleted
+    from the store on the next sync.
+    """
+
+    def __init__(self, path: str, store_type: Optional[str] = None):
+        """
+        Start a manifest stored at the given path.
+
+        Args:
+            path: Location of the manifest JSON file
+            store_type: Type of vector store the manifest belongs to
+        """
+        self.path = path
+        self.store_type = store_type
+        self.fingerprints: Dict[str, str] = {}
+
+    @classmethod
+    def load(cls, path: str, store_type: Optional[str] = None) -> "IndexManifest":
+        """
+        Read a manifest from disk, or start an empty one if it doesn't exist.
+
+        Args:
+            path: Location of the manifest JSON file
+            store_type: Type of vector store expected
+
+        Returns:
+            The loaded manifest
+        """
+        manifest = cls(path, store_type)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            manifest.store_type = data.get("store_type", store_type)
+            manifest.fingerprints = data.get("documents", {})
+        return manifest
+
+    def exists(self) -> bool:
+        """Whether the manifest file is on disk."""
+        return os.path.exists(self.path)
+
+    def save(self) -> None:
+        """Write the manifest to disk (atomically)."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"store_type": self.store_type, "documents": self.fingerprints},
+                f,
+                ensure_ascii=False,
+                indent=2
+            )
+        os.replace(tmp_path, self.path)
+
+    def diff(self, documents: List[Document]) -> SyncPlan:
+        """
+        Compare documents against the manifest.
+
+        Args:
+            documents: The current full list of documents
+
+        Returns:
+            A SyncPlan with the documents to add, update and delete
+        """
+        plan = SyncPlan()
+        for key, doc in zip(get_document_keys(documents), documents):
+            fingerprint = fingerprint_document(doc)
+            plan.fingerprints[key] = fingerprint
+            old_fingerprint = self.fingerprints.get(key)
+            if old_fingerprint is None:
+                plan.to_add.append((key, doc))
+            elif old_fingerprint != fingerprint:
+                plan.to_update.append((key, doc))
+            else:
+                plan.unchanged += 1
+
+        plan.to_delete = [key for key in self.fingerprints if key not in plan.fingerprints]
+        return plan
+
+    def apply(self, plan: SyncPlan) -> None:
+        """Record a finished sync in the manifest."""
+        self.fingerprints = dict(plan.fingerprints)
+
+def apply_sync_plan(vector_store: VectorStore, plan: SyncPlan) -> None:
+    """
+    Write the changes from a SyncPlan into a vector store.
+
+    Updated documents are deleted and added again under the same id.
+
+    Args:
+        vector_store: The vector store to change
+        plan: The changes to apply
+    """
+    stale_keys = plan.to_delete + [key for key, _ in plan.to_update]
+    if stale_keys:
+        vector_store.delete(ids=[make_vector_id(key) for key in stale_keys])
+
+    new_items = plan.to_add + plan.to_update
+    if new_items:
+        vector_store.add_documents(
+            [doc for _, doc in new_items],
+            ids=[make_vector_id(key) for key, _ in new_items]
+        )
+
+if __name__ == "__main__":
+    """
+    This part runs when you run this file directly.
+    It shows how a manifest finds changed documents.
+    """
+    import tempfile
+
+    manifest = IndexManifest(os.path.join(tempfile.mkdtemp(), MANIFEST_FILE_NAME))
+    docs = [
+        Document(page_content="First answer", metadata={"id": 1}),
+        Document(page_content="Second answer", metadata={"id": 2})
+    ]
+    plan = manifest.diff(docs)
+    print(f"First sync: {plan.summary()}")
+    manifest.apply(plan)
+
+    docs = [
+        Document(page_content="First answer (edited)", metadata={"id": 1}),
+        Document(page_content="Third answer", metadata={"id": 3})
+    ]
+    plan = manifest.diff(docs)
+    print(f"Second sync: {plan.summary()}")
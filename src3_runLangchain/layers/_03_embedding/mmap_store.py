@@ -0,0 +1,659 @@
+"""
+This module helps store text vectors in a small memory-mapped file instead of RAM.
+Vectors are saved as float16 or int8, so they take 2-4 times less space, and
+several processes (e.g. uvicorn workers) can share one copy through the OS page cache.
+"""
+
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Tuple, Callable
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+import numpy as np
+import itertools
+import json
+import uuid
+import os
+
+# Default configuration
+DEFAULT_PERSIST_DIRECTORY = "./mmap_data"
+VECTOR_DTYPES = ("float16", "int8")
+DEFAULT_BLOCK_SIZE = 4096        # Rows scored per matrix multiplication (4096 x 384 float32 = 6 MB)
+DEFAULT_RESCORE_FACTOR = 4       # With re-scoring, k * factor candidates are checked with float32 vectors
+DEFAULT_COMPACT_RATIO = 0.25     # Rewrite the files when this share of rows is deleted
+EMBED_BATCH_SIZE = 1024          # Texts embedded at a time while building
+STORE_FORMAT_VERSION = 2
+
+VECTORS_FILE_NAME = "vectors.bin"
+SCALES_FILE_NAME = "scales.bin"
+FULL_VECTORS_FILE_NAME = "vectors_f32.bin"
+PAYLOAD_FILE_NAME = "payload.jsonl"
+OFFSETS_FILE_NAME = "payload_offsets.bin"
+TOMBSTONES_FILE_NAME = "tombstones.bin"
+META_FILE_NAME = "meta.json"
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Turn float vectors into int8 codes with one scale per vector.
+
+    Args:
+        vectors: Float vectors, shape (n, dim)
+
+    Returns:
+        (codes, scales) where vectors ~= codes * scales[:, None]
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def _load_array(path: str, shape: Tuple[int, ...], dtype: str) -> np.ndarray:
+    """Memory-map a raw array file (empty arrays cannot be memory-mapped)."""
+    if shape[0] == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+class MmapVectorStore(VectorStore):
+    """
+    A vector store that keeps compact vectors in memory-mapped files.
+
+    This class can:
+    - Save vectors as float16 or int8 (with one scale per vector)
+    - Search with NumPy matrix multiplication, one block of rows at a time
+    - Re-score the best candidates with float32 vectors (optional)
+    - Add documents by appending to the files and delete them with tombstones,
+      rewriting the files only when many rows are deleted
+    - Work as a LangChain vector store (as_retriever, relevance scores)
+
+    Files in the folder (raw arrays, one row per vector):
+    - vectors.bin (+ scales.bin for int8): compact vectors
+    - vectors_f32.bin: full vectors, only when re-scoring is on
+    - payload.jsonl + payload_offsets.bin: id, text and metadata of each vector
+    - tombstones.bin: 1 for deleted rows
+    - meta.json: format, dtype, sizes, generation (written last, so rows past its count are ignored)
+
+    Vectors are scored with the dot product, so use normalized embeddings.
+
+    Example:
+        >>> store = MmapVectorStore.from_documents(documents, embeddings, persist_directory="./mmap_data")
+        >>> docs = store.similarity_search("What is RAG?", k=4)
+    """
+
+    def __init__(
+        self,
+        persist_directory: str,
+        embedding: Embeddings,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        rescore_factor: int = DEFAULT_RESCORE_FACTOR,
+        compact_ratio: float = DEFAULT_COMPACT_RATIO
+    ):
+        """
+        Open a store saved in a folder (an empty store if the folder has none).
+
+        Args:
+            persist_directory: Folder of the store
+            embedding: Embedding model for questions and new texts
+            block_size: Rows scored per matrix multiplication
+            rescore_factor: How many more candidates to re-score than requested
+            compact_ratio: Share of deleted rows that triggers a rewrite of the files
+
+        Example:
+            >>> store = MmapVectorStore("./mmap_data", embeddings)
+        """
+        self.persist_directory = persist_directory
+        self.embedding = embedding
+        self.block_size = block_size
+        self.rescore_factor = rescore_factor
+        self.compact_ratio = compact_ratio
+        self._id_rows: Optional[Dict[str, int]] = None
+        self._mapped: Optional[Tuple[Optional[str], int]] = None
+        self._open()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.persist_directory, file_name)
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        """Read meta.json (None if the folder has no store yet)."""
+        meta_path = self._path(META_FILE_NAME)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        if meta.get("format_version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported mmap store format: {meta.get('format_version')}")
+        return meta
+
+    def _open(self) -> None:
+        """Read meta.json and memory-map the saved files."""
+        meta = self._read_meta()
+        if meta is None:
+            self.meta = {"dtype": "float16", "dim": 0, "count": 0, "deleted": 0, "payload_bytes": 0, "rescore": False}
+            self._vectors = self._scales = self._full = None
+            self._offsets = np.empty(0, dtype=np.int64)
+            self._tombstones = np.empty(0, dtype=np.uint8)
+            self._mapped = (None, 0)
+            return
+        self.meta = meta
+        self._map()
+
+    def _refresh(self) -> None:
+        """
+        Read meta.json again to see rows added or deleted by another process (or worker).
+
+        Tombstones set by others are visible through the shared mapping, but the
+        deleted count, the row count and the ids are only known from meta.json.
+        """
+        meta = self._read_meta()
+        if meta is not None and meta != self.meta:
+            self.meta = meta
+            self._id_rows = None
+
+    def _ensure_mapped(self) -> None:
+        """Map the files again only if rows were appended or the files were rewritten."""
+        if self._mapped != (self.meta.get("generation"), self.meta["count"]):
+            self._map()
+
+    def _map(self) -> None:
+        """Memory-map the row files for the current meta.json."""
+        count, dim = self.meta["count"], self.meta["dim"]
+        self._vectors = _load_array(self._path(VECTORS_FILE_NAME), (count, dim), self.meta["dtype"])
+        self._scales = None
+        if self.meta["dtype"] == "int8":
+            self._scales = _load_array(self._path(SCALES_FILE_NAME), (count,), "float32")
+        self._full = None
+        if self.meta["rescore"]:
+            self._full = _load_array(self._path(FULL_VECTORS_FILE_NAME), (count, dim), "float32")
+        self._offsets = _load_array(self._path(OFFSETS_FILE_NAME), (count,), "int64")
+        self._tombstones = _load_array(self._path(TOMBSTONES_FILE_NAME), (count,), "uint8")
+        self._mapped = (self.meta.get("generation"), count)
+
+    def __len__(self) -> int:
+        return self.meta["count"] - self.meta["deleted"]
+
+    def _file_names(self, dtype: str, rescore: bool) -> List[str]:
+        """Files that hold one row per vector."""
+        files = [VECTORS_FILE_NAME, OFFSETS_FILE_NAME, TOMBSTONES_FILE_NAME]
+        if dtype == "int8":
+            files.append(SCALES_FILE_NAME)
+        if rescore:
+            files.append(FULL_VECTORS_FILE_NAME)
+        return files
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        meta_path = self._path(META_FILE_NAME)
+        meta = {**meta, "format_version": STORE_FORMAT_VERSION}
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(meta_path + ".tmp", meta_path)
+        self.meta = meta
+
+    def _write_rows(
+        self,
+        files: Dict[str, Any],
+        blocks: Iterable[Tuple[np.ndarray, List[Dict[str, Any]]]],
+        dtype: str,
+        payload_start: int
+    ) -> Tuple[int, int]:
+        """
+        Write blocks of (float32 vectors, payload records) at the end of open files.
+
+        Returns:
+            (rows written, payload bytes written)
+        """
+        rows = 0
+        payload_bytes = 0
+        for block, records in blocks:
+            if not records:
+                continue
+            block = np.asarray(block, dtype=np.float32)
+            if dtype == "int8":
+                codes, scales = quantize_int8(block)
+                files[VECTORS_FILE_NAME].write(codes.tobytes())
+                files[SCALES_FILE_NAME].write(scales.tobytes())
+            else:
+                files[VECTORS_FILE_NAME].write(block.astype(np.float16).tobytes())
+            if FULL_VECTORS_FILE_NAME in files:
+                files[FULL_VECTORS_FILE_NAME].write(block.tobytes())
+
+            lines = [json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in records]
+            lengths = np.fromiter((len(line) for line in lines), dtype=np.int64, count=len(lines))
+            offsets = payload_start + payload_bytes + np.concatenate([[0], np.cumsum(lengths)[:-1]])
+            files[OFFSETS_FILE_NAME].write(offsets.astype(np.int64).tobytes())
+            files[PAYLOAD_FILE_NAME].write(b"".join(lines))
+            files[TOMBSTONES_FILE_NAME].write(bytes(len(records)))
+            payload_bytes += int(lengths.sum())
+            rows += len(records)
+        for f in files.values():
+            f.flush()
+            os.fsync(f.fileno())
+        return rows, payload_bytes
+
+    def _write(
+        self,
+        blocks: Iterable[Tuple[np.ndarray, List[Dict[str, Any]]]],
+        dim: int,
+        dtype: str,
+        rescore: bool
+    ) -> None:
+        """
+        Write all files again from blocks of (float32 vectors, payload records).
+
+        Files are written under temporary names and renamed, so processes that
+        memory-mapped the old files keep reading them safely.
+        """
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector dtype: {dtype}. Use one of {VECTOR_DTYPES}")
+        os.makedirs(self.persist_directory, exist_ok=True)
+
+        # Remove the old meta first and write it last, so a half-written folder is never loaded
+        meta_path = self._path(META_FILE_NAME)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+
+        names = self._file_names(dtype, rescore) + [PAYLOAD_FILE_NAME]
+        files = {name: open(self._path(name) + ".tmp", "wb") for name in names}
+        try:
+            count, payload_bytes = self._write_rows(files, blocks, dtype, 0)
+        finally:
+            for f in files.values():
+                f.close()
+
+        for name in names:
+            os.replace(self._path(name) + ".tmp", self._path(name))
+        for name in (SCALES_FILE_NAME, FULL_VECTORS_FILE_NAME):
+            if name not in names and os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+
+        # A new generation tells other processes that every file was replaced
+        self._write_meta({
+            "dtype": dtype,
+            "dim": dim,
+            "count": count,
+            "deleted": 0,
+            "payload_bytes": payload_bytes,
+            "rescore": rescore,
+            "generation": uuid.uuid4().hex
+        })
+        self._id_rows = None
+        self._map()
+
+    def _append(self, blocks: Iterable[Tuple[np.ndarray, List[Dict[str, Any]]]]) -> None:
+        """
+        Append rows to the end of the files, then write the new count to meta.json.
+
+        Leftovers of an append that crashed before meta.json was written are cut off first.
+        The files are mapped again lazily, on the next read.
+        """
+        meta = dict(self.meta)
+        dtype, dim, count = meta["dtype"], meta["dim"], meta["count"]
+        row_bytes = {
+            VECTORS_FILE_NAME: dim * np.dtype(dtype).itemsize,
+            SCALES_FILE_NAME: 4,
+            FULL_VECTORS_FILE_NAME: dim * 4,
+            OFFSETS_FILE_NAME: 8,
+            TOMBSTONES_FILE_NAME: 1
+        }
+        names = self._file_names(dtype, meta["rescore"])
+        sizes = {name: count * row_bytes[name] for name in names}
+        sizes[PAYLOAD_FILE_NAME] = meta["payload_bytes"]
+
+        files = {}
+        try:
+            for name, size in sizes.items():
+                f = open(self._path(name), "r+b")
+                f.truncate(size)
+                f.seek(size)
+                files[name] = f
+            rows, payload_bytes = self._write_rows(files, blocks, dtype, meta["payload_bytes"])
+        finally:
+            for f in files.values():
+                f.close()
+
+        meta["count"] = count + rows
+        meta["payload_bytes"] += payload_bytes
+        self._write_meta(meta)
+
+    def _mark_deleted(self, rows: List[int]) -> None:
+        """
+        Set tombstones for some rows and count them in meta.json.
+
+        The read-only mappings share the file's pages, so they see the new tombstones without a remap.
+        """
+        if not rows:
+            return
+        tombstones = np.memmap(self._path(TOMBSTONES_FILE_NAME), dtype=np.uint8, mode="r+", shape=(self.meta["count"],))
+        tombstones[rows] = 1
+        tombstones.flush()
+        del tombstones
+        self._write_meta({**self.meta, "deleted": self.meta["deleted"] + len(rows)})
+
+    def _rows_by_id(self) -> Dict[str, int]:
+        """Map each live id to its row (read from the payload once, then kept up to date)."""
+        if self._id_rows is None:
+            self._ensure_mapped()
+            self._id_rows = {}
+            count = self.meta["count"]
+            if count:
+                with open(self._path(PAYLOAD_FILE_NAME), "rb") as f:
+                    for row in range(count):
+                        record_id = json.loads(f.readline())["id"]
+                        if not self._tombstones[row]:
+                            self._id_rows[record_id] = row
+        return self._id_rows
+
+    def compact(self) -> None:
+        """Rewrite the files without deleted rows."""
+        self._refresh()
+        self._write(
+            self._iter_existing(),
+            dim=self.meta["dim"],
+            dtype=self.meta["dtype"],
+            rescore=self.meta["rescore"]
+        )
+
+    def _read_records(self, rows: Iterable[int]) -> List[Dict[str, Any]]:
+        """Read the payload of some rows."""
+        self._ensure_mapped()
+        records = []
+        with open(self._path(PAYLOAD_FILE_NAME), "rb") as f:
+            for row in rows:
+                f.seek(int(self._offsets[row]))
+                records.append(json.loads(f.readline()))
+        return records
+
+    def _iter_existing(self) -> Iterator[Tuple[np.ndarray, List[Dict[str, Any]]]]:
+        """Yield the live vectors (as float32) and records, one block at a time."""
+        count = self.meta["count"]
+        if count == 0:
+            return
+        self._ensure_mapped()
+        with open(self._path(PAYLOAD_FILE_NAME), "rb") as payload:
+            for start in range(0, count, self.block_size):
+                stop = min(start + self.block_size, count)
+                records = [json.loads(payload.readline()) for _ in range(start, stop)]
+                if self._full is not None:
+                    block = np.asarray(self._full[start:stop], dtype=np.float32)
+                else:
+                    block = np.asarray(self._vectors[start:stop], dtype=np.float32)
+                    if self._scales is not None:
+                        block *= self._scales[start:stop, None]
+                live = np.asarray(self._tombstones[start:stop]) == 0
+                if not live.all():
+                    block = block[live]
+                    records = [record for record, kept in zip(records, live) if kept]
+                yield block, records
+
+    def _embed_blocks(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[Dict[str, Any]]],
+        ids: List[str]
+    ) -> Iterator[Tuple[np.ndarray, List[Dict[str, Any]]]]:
+        """Embed new texts in batches and yield (vectors, records) blocks."""
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            batch = texts[start:start + EMBED_BATCH_SIZE]
+            vectors = np.asarray(self.embedding.embed_documents(batch), dtype=np.float32)
+            records = [
+                {
+                    "id": ids[i],
+                    "text": texts[i],
+                    "metadata": metadatas[i] if metadatas else {}
+                }
+                for i in range(start, start + len(batch))
+            ]
+            yield vectors, records
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        dtype: Optional[str] = None,
+        rescore: Optional[bool] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        """
+        Embed texts and append them to the store.
+
+        A text with an id that is already stored replaces the old one.
+        Changing dtype or rescore rewrites all files.
+
+        Args:
+            texts: Texts to add
+            metadatas: One metadata dict per text (optional)
+            ids: One id per text (optional, random ids if not given)
+            dtype: 'float16' or 'int8' (default: keep the store's dtype)
+            rescore: Also keep float32 vectors for re-scoring (default: keep the store's setting)
+
+        Returns:
+            The ids of the added texts
+        """
+        texts = list(texts)
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        if not texts:
+            return []
+        self._refresh()
+
+        new_blocks = self._embed_blocks(texts, metadatas, ids)
+        first_vectors, first_records = next(new_blocks)
+        dim = first_vectors.shape[1]
+        if self.meta["count"] and dim != self.meta["dim"]:
+            raise ValueError(f"Vector dimension {dim} does not match the store ({self.meta['dim']})")
+
+        def blocks():
+            yield first_vectors, first_records
+            yield from new_blocks
+
+        dtype = dtype or self.meta["dtype"]
+        rescore = self.meta["rescore"] if rescore is None else rescore
+        if not self.meta["dim"] or (dtype, rescore) != (self.meta["dtype"], self.meta["rescore"]):
+            # New (or empty) store or new format: write everything once
+            self.delete(ids, compact=False)
+            self._write(itertools.chain(self._iter_existing(), blocks()), dim=dim, dtype=dtype, rescore=rescore)
+            return ids
+
+        self.delete(ids, compact=False)
+        first_row = self.meta["count"]
+        self._append(blocks())
+        id_rows = self._rows_by_id()
+        for row, record_id in enumerate(ids, first_row):
+            id_rows[record_id] = row
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, compact: bool = True, **kwargs: Any) -> Optional[bool]:
+        """
+        Delete vectors by id by marking their rows as deleted.
+
+        The files are only rewritten when more than compact_ratio of the rows are deleted.
+
+        Args:
+            ids: Ids to delete
+            compact: Allow a rewrite of the files if many rows are deleted
+
+        Returns:
+            True if something was deleted
+        """
+        if not ids:
+            return False
+        self._refresh()
+        if not len(self):
+            return False
+        id_rows = self._rows_by_id()
+        rows = [id_rows.pop(record_id) for record_id in set(ids) if record_id in id_rows]
+        if not rows:
+            return False
+        self._mark_deleted(rows)
+        if compact and self.meta["deleted"] > self.compact_ratio * self.meta["count"]:
+            self.compact()
+        return True
+
+    def search_vector(self, query_vector: List[float], k: int = 4) -> List[Tuple[int, float]]:
+        """
+        Find the rows with the highest dot product with a question vector.
+
+        Rows are scored one block at a time, keeping only the best candidates,
+        so memory use does not grow with the store size. With re-scoring on,
+        k * rescore_factor candidates are scored again with float32 vectors.
+
+        Args:
+            query_vector: The embedded question
+            k: Number of rows to return
+
+        Returns:
+            (row, score) pairs, best first
+        """
+        # Read meta.json first: rows may have been deleted by another process
+        self._refresh()
+        count = self.meta["count"]
+        if len(self) == 0 or k <= 0:
+            return []
+        self._ensure_mapped()
+        query = np.asarray(query_vector, dtype=np.float32)
+        num_candidates = min(len(self), k * self.rescore_factor if self._full is not None else k)
+
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, count, self.block_size):
+            stop = min(start + self.block_size, count)
+            scores = np.asarray(self._vectors[start:stop], dtype=np.float32) @ query
+            if self._scales is not None:
+                scores *= self._scales[start:stop]
+            if self.meta["deleted"]:
+                scores[np.asarray(self._tombstones[start:stop]) != 0] = -np.inf
+            rows = np.concatenate([best_rows, np.arange(start, stop)])
+            scores = np.concatenate([best_scores, scores])
+            if len(scores) > num_candidates:
+                top = np.argpartition(-scores, num_candidates - 1)[:num_candidates]
+                rows, scores = rows[top], scores[top]
+            best_rows, best_scores = rows, scores
+
+        if self._full is not None:
+            # Sorted rows read the float32 file in order
+            order = np.argsort(best_rows)
+            best_rows = best_rows[order]
+            best_scores = np.asarray(self._full[best_rows], dtype=np.float32) @ query
+
+        top = np.argsort(-best_scores, kind="stable")[:k]
+        return [(int(best_rows[i]), float(best_scores[i])) for i in top]
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """Find documents for a question vector, with dot-product scores (higher is better)."""
+        results = self.search_vector(embedding, k)
+        records = self._read_records(row for row, _ in results)
+        return [
+            (Document(page_content=record["text"], metadata=record["metadata"], id=record["id"]), score)
+            for record, (_, score) in zip(records, results)
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Cosine similarity of normalized vectors is in [-1, 1]; map it to [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        persist_directory: str = DEFAULT_PERSIST_DIRECTORY,
+        dtype: str = "float16",
+        rescore: bool = False,
+        **kwargs: Any
+    ) -> "MmapVectorStore":
+        """
+        Build a new store from texts, replacing any store in the folder.
+
+        With no texts, an empty store is written; its dimension is set by the first add_texts.
+
+        Args:
+            texts: Texts to store
+            embedding: Embedding model
+            metadatas: One metadata dict per text (optional)
+            ids: One id per text (optional)
+            persist_directory: Folder to write the store to
+            dtype: 'float16' (2 bytes per value) or 'int8' (1 byte per value)
+            rescore: Also keep float32 vectors to re-score the best candidates
+            **kwargs: Options for MmapVectorStore (block_size, rescore_factor, compact_ratio)
+
+        Returns:
+            The new store
+
+        Example:
+            >>> store = MmapVectorStore.from_texts(texts, embeddings, dtype="int8", rescore=True)
+        """
+        store = cls(persist_directory, embedding, **kwargs)
+        texts = list(texts)
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        blocks = store._embed_blocks(texts, metadatas, ids)
+        first = next(blocks, None)
+        dim = first[0].shape[1] if first is not None else 0
+
+        def all_blocks():
+            if first is not None:
+                yield first
+                yield from blocks
+
+        store._write(all_blocks(), dim=dim, dtype=dtype, rescore=rescore)
+        return store
+
+if __name__ == "__main__":
+    """
+    This part runs when you run this file directly.
+    It compares float16 and int8 stores with exact float32 search on random vectors.
+    """
+    import tempfile
+    import time
+
+    class RandomEmbeddings(Embeddings):
+        """Fake model: one fixed random unit vector per text."""
+
+        def _vector(self, text: str) -> List[float]:
+            rng = np.random.default_rng(abs(hash(text)) % 2 ** 32)
+            vector = rng.standard_normal(384)
+            return (vector / np.linalg.norm(vector)).tolist()
+
+        def embed_documents(self, texts: List[str]) -> List[List[float]]:
+            return [self._vector(text) for text in texts]
+
+        def embed_query(self, text: str) -> List[float]:
+            return self._vector(text)
+
+    embeddings = RandomEmbeddings()
+    texts = [f"Document {i} about RAG" for i in range(20000)]
+    exact = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    queries = [texts[i] + " ?" for i in range(0, 20000, 200)]
+    query_vectors = np.asarray(embeddings.embed_documents(queries), dtype=np.float32)
+    # Make each question close to one document
+    query_vectors = 0.6 * query_vectors + 0.4 * exact[::200]
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    true_top = np.argsort(-(query_vectors @ exact.T), axis=1)[:, :10]
+
+    for dtype, rescore in (("float16", False), ("int8", False), ("int8", True)):
+        directory = tempfile.mkdtemp()
+        store = MmapVectorStore.from_texts(texts, embeddings, persist_directory=directory, dtype=dtype, rescore=rescore)
+        start = time.perf_counter()
+        found = [[row for row, _ in store.search_vector(q, k=10)] for q in query_vectors]
+        elapsed = (time.perf_counter() - start) / len(query_vectors) * 1000
+        recall = np.mean([len(set(f) & set(t)) / 10 for f, t in zip(found, true_top)])
+        size = os.path.getsize(os.path.join(directory, VECTORS_FILE_NAME)) / 2 ** 20
+        print(f"{dtype:<8} rescore={str(rescore):<5} recall@10={recall:.3f}  {elapsed:.2f} ms/query  vectors={size:.1f} MB")
@@ -0,0 +1,124 @@
+"""
+Tests for incremental re-indexing.
+Each test builds a FAISS store, reloads it from disk like a new process would,
+syncs added, changed and removed documents and checks what is stored.
+
+Run from src3_runLangchain: python -m pytest layers/_03_embedding
+"""
+
+import hashlib
+import os
+from typing import Dict, List
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+pytest.importorskip("faiss")
+FAISS = pytest.importorskip("langchain_community.vectorstores").FAISS
+
+from layers._03_embedding.index_sync import (
+    IndexManifest,
+    MANIFEST_FILE_NAME,
+    apply_sync_plan,
+    get_document_keys,
+    make_vector_id
+)
+
+class HashEmbeddings(Embeddings):
+    """Fake model: one fixed unit vector per text, no download needed."""
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).standard_normal(16)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+FIRST_DOCS = [
+    Document(page_content="First answer", metadata={"id": 1}),
+    Document(page_content="Second answer", metadata={"id": 2})
+]
+SECOND_DOCS = [
+    Document(page_content="First answer (edited)", metadata={"id": 1}),
+    Document(page_content="Third answer", metadata={"id": 3})
+]
+
+def stored_contents(store) -> Dict[str, str]:
+    """Map vector id -> page content for everything in a FAISS store."""
+    return {
+        vector_id: store.docstore.search(vector_id).page_content
+        for vector_id in store.index_to_docstore_id.values()
+    }
+
+def expected_contents(documents: List[Document]) -> Dict[str, str]:
+    return {
+        make_vector_id(key): doc.page_content
+        for key, doc in zip(get_document_keys(documents), documents)
+    }
+
+def test_sync_plan_on_reloaded_faiss_store(tmp_path):
+    embeddings = HashEmbeddings()
+    directory = str(tmp_path)
+    manifest_path = os.path.join(directory, MANIFEST_FILE_NAME)
+
+    manifest = IndexManifest(manifest_path, store_type="faiss")
+    plan = manifest.diff(FIRST_DOCS)
+    assert plan.summary() == {"added": 2, "updated": 0, "deleted": 0, "unchanged": 0}
+    ids = [make_vector_id(key) for key in get_document_keys(FIRST_DOCS)]
+    FAISS.from_documents(FIRST_DOCS, embeddings, ids=ids).save_local(directory)
+    manifest.apply(plan)
+    manifest.save()
+
+    store = FAISS.load_local(directory, embeddings, allow_dangerous_deserialization=True)
+    manifest = IndexManifest.load(manifest_path, store_type="faiss")
+    plan = manifest.diff(SECOND_DOCS)
+    assert [key for key, _ in plan.to_add] == ["3"]
+    assert [key for key, _ in plan.to_update] == ["1"]
+    assert plan.to_delete == ["2"]
+    apply_sync_plan(store, plan)
+    store.save_local(directory)
+    manifest.apply(plan)
+    manifest.save()
+
+    reloaded = FAISS.load_local(directory, embeddings, allow_dangerous_deserialization=True)
+    assert stored_contents(reloaded) == expected_contents(SECOND_DOCS)
+    assert reloaded.index.ntotal == 2
+    assert reloaded.similarity_search("Third answer", k=1)[0].page_content == "Third answer"
+
+    plan = IndexManifest.load(manifest_path).diff(SECOND_DOCS)
+    assert not plan.has_changes
+    assert plan.unchanged == 2
+
+def test_document_embedder_sync_across_processes(tmp_path):
+    embedder_module = pytest.importorskip("layers._03_embedding.embedder", exc_type=ImportError)
+    directory = str(tmp_path)
+
+    def new_embedder():
+        # A fresh embedder has nothing in memory and must load the saved store
+        return embedder_module.DocumentEmbedder(
+            embeddings_model=HashEmbeddings(),
+            vector_store_type="faiss"
+        )
+
+    plan = new_embedder().sync_documents(FIRST_DOCS, directory)
+    assert plan.summary() == {"added": 2, "updated": 0, "deleted": 0, "unchanged": 0}
+
+    plan = new_embedder().sync_documents(SECOND_DOCS, directory)
+    assert plan.summary() == {"added": 1, "updated": 1, "deleted": 1, "unchanged": 0}
+
+    store = new_embedder().load_vector_store(directory)
+    assert stored_contents(store) == expected_contents(SECOND_DOCS)
+    assert store.index.ntotal == 2
+
+    # Without a manifest the store is rebuilt and keeps only the current documents
+    os.remove(os.path.join(directory, MANIFEST_FILE_NAME))
+    plan = new_embedder().sync_documents(SECOND_DOCS[:1], directory)
+    assert plan.summary() == {"added": 1, "updated": 0, "deleted": 0, "unchanged": 0}
+    store = new_embedder().load_vector_store(directory)
+    assert stored_contents(store) == expected_contents(SECOND_DOCS[:1])
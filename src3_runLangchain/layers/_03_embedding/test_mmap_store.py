@@ -0,0 +1,157 @@
+"""
+Tests for the memory-mapped vector store.
+Two store objects on one folder stand in for two processes (e.g. uvicorn workers).
+
+Run from src3_runLangchain: python -m pytest layers/_03_embedding
+"""
+
+import hashlib
+import os
+from typing import List
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from layers._03_embedding.mmap_store import META_FILE_NAME, SCALES_FILE_NAME, MmapVectorStore
+
+class HashEmbeddings(Embeddings):
+    """Fake model: one fixed unit vector per text, no download needed."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).standard_normal(32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        return self._vector(text)
+
+TEXTS = [f"Answer number {i}" for i in range(10)]
+IDS = [f"doc-{i}" for i in range(10)]
+
+@pytest.fixture
+def embeddings() -> HashEmbeddings:
+    return HashEmbeddings()
+
+@pytest.fixture
+def store(tmp_path, embeddings) -> MmapVectorStore:
+    return MmapVectorStore.from_texts(
+        TEXTS,
+        embeddings,
+        metadatas=[{"row": i} for i in range(10)],
+        ids=IDS,
+        persist_directory=str(tmp_path),
+        compact_ratio=0.5
+    )
+
+def top_id(store: MmapVectorStore, text: str) -> str:
+    return store.similarity_search(text, k=1)[0].id
+
+def live_ids(store: MmapVectorStore) -> List[str]:
+    return sorted(doc.id for doc in store.similarity_search("anything", k=100))
+
+def test_search_finds_each_text(store):
+    for text, doc_id in zip(TEXTS, IDS):
+        assert top_id(store, text) == doc_id
+    doc = store.similarity_search(TEXTS[3], k=1)[0]
+    assert doc.page_content == TEXTS[3]
+    assert doc.metadata == {"row": 3}
+
+def test_delete_marks_rows_without_rewrite(store):
+    assert store.delete(["doc-1", "doc-2", "missing"])
+    assert not store.delete(["doc-1"])
+    assert len(store) == 8
+    assert store.meta["count"] == 10 and store.meta["deleted"] == 2
+    assert "doc-1" not in live_ids(store) and "doc-2" not in live_ids(store)
+    assert top_id(store, TEXTS[1]) != "doc-1"
+
+def test_delete_compacts_past_ratio(store):
+    generation = store.meta["generation"]
+    store.delete(IDS[:6])
+    assert store.meta["count"] == 4 and store.meta["deleted"] == 0
+    assert store.meta["generation"] != generation
+    assert live_ids(store) == IDS[6:]
+    assert top_id(store, TEXTS[7]) == "doc-7"
+
+def test_add_with_existing_id_replaces_it(store):
+    store.add_texts(["A brand new answer"], metadatas=[{"row": "new"}], ids=["doc-4"])
+    assert len(store) == 10
+    doc = store.similarity_search("A brand new answer", k=1)[0]
+    assert (doc.id, doc.page_content, doc.metadata) == ("doc-4", "A brand new answer", {"row": "new"})
+    assert top_id(store, TEXTS[4]) != "doc-4"
+
+def test_appends_do_not_remap_until_read(store, monkeypatch):
+    remaps = []
+    original = store._map
+    monkeypatch.setattr(store, "_map", lambda: remaps.append(1) or original())
+
+    store.add_texts(["Extra answer 1"], ids=["extra-1"])
+    store.add_texts(["Extra answer 2"], ids=["extra-2"])
+    store.delete(["doc-0"])
+    assert remaps == []
+
+    assert top_id(store, "Extra answer 2") == "extra-2"
+    assert top_id(store, "Extra answer 1") == "extra-1"
+    assert remaps == [1]
+
+def test_dtype_switch_rewrites_files(store, tmp_path):
+    store.delete(["doc-0"], compact=False)
+    store.add_texts(["Quantized answer"], ids=["int8-doc"], dtype="int8", rescore=True)
+    assert (store.meta["dtype"], store.meta["rescore"]) == ("int8", True)
+    assert store.meta["count"] == 10 and store.meta["deleted"] == 0
+    assert os.path.exists(tmp_path / SCALES_FILE_NAME)
+    assert top_id(store, "Quantized answer") == "int8-doc"
+    assert top_id(store, TEXTS[5]) == "doc-5"
+    assert "doc-0" not in live_ids(store)
+
+    store.add_texts(["Back to float16"], ids=["f16-doc"], dtype="float16", rescore=False)
+    assert store.meta["dtype"] == "float16"
+    assert not os.path.exists(tmp_path / SCALES_FILE_NAME)
+    assert top_id(store, TEXTS[5]) == "doc-5"
+
+def test_reopen_keeps_rows_and_tombstones(store, tmp_path, embeddings):
+    store.add_texts(["Added later"], ids=["later"])
+    store.delete(["doc-3"])
+
+    reopened = MmapVectorStore(str(tmp_path), embeddings)
+    assert len(reopened) == 10
+    assert live_ids(reopened) == live_ids(store)
+    assert top_id(reopened, "Added later") == "later"
+    assert "doc-3" not in live_ids(reopened)
+
+def test_changes_from_another_process_are_seen(store, tmp_path, embeddings):
+    other = MmapVectorStore(str(tmp_path), embeddings)
+    assert top_id(other, TEXTS[2]) == "doc-2"
+
+    # Only meta.json tells the other store that tombstones must be applied
+    store.delete(["doc-2"])
+    assert top_id(other, TEXTS[2]) != "doc-2"
+    assert len(other) == 9
+
+    store.add_texts(["Written by the first store"], ids=["first"])
+    assert top_id(other, "Written by the first store") == "first"
+
+    # The other store must not reuse its cached rows after a rewrite
+    store.delete(IDS[3:8])
+    assert store.meta["deleted"] == 0
+    other.delete(["doc-9"])
+    assert live_ids(store) == ["doc-0", "doc-1", "doc-8", "first"]
+
+def test_from_texts_empty_does_not_embed(tmp_path, embeddings):
+    store = MmapVectorStore.from_texts([], embeddings, persist_directory=str(tmp_path), dtype="int8")
+    assert embeddings.calls == 0
+    assert os.path.exists(tmp_path / META_FILE_NAME)
+    assert len(store) == 0
+    assert store.similarity_search_by_vector([0.0] * 32, k=3) == []
+
+    store.add_texts(TEXTS[:3], ids=IDS[:3])
+    assert (store.meta["dim"], store.meta["dtype"], store.meta["count"]) == (32, "int8", 3)
+    assert top_id(MmapVectorStore(str(tmp_path), embeddings), TEXTS[1]) == "doc-1"
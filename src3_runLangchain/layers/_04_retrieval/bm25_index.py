@@ -0,0 +1,433 @@
+"""
+This module helps search documents by keywords (BM25) quickly.
+All BM25 weights are computed once and kept in a sparse matrix,
+so answering a question is a single sparse matrix product.
+The index can be saved to disk and memory-mapped back on startup.
+"""
+
+from typing import List, Dict, Optional, Callable, Tuple
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from layers._03_embedding.index_sync import fingerprint_document
+from layers._04_retrieval.text_analyzer import DEFAULT_ANALYZER
+from scipy import sparse
+import numpy as np
+import hashlib
+import json
+import os
+
+# Default configuration (same defaults as rank_bm25's BM25Okapi)
+DEFAULT_K1 = 1.5
+DEFAULT_B = 0.75
+
+# Files written by BM25Index.save()
+INDEX_FORMAT_VERSION = 1
+META_FILE_NAME = "bm25_meta.json"
+VOCAB_FILE_NAME = "bm25_vocab.json"
+ARRAY_FILE_NAMES = {
+    "data": "bm25_data.npy",
+    "indices": "bm25_indices.npy",
+    "indptr": "bm25_indptr.npy",
+    "idf": "bm25_idf.npy"
+}
+
+def get_preprocess_signature(preprocess_func: Callable[[str], List[str]]) -> str:
+    """
+    Name the text preprocessing used by an index.
+
+    A saved index can only be searched with the same preprocessing it was built with.
+
+    Args:
+        preprocess_func: A TextAnalyzer or any function text -> terms
+
+    Returns:
+        The analyzer signature, or the function's qualified name
+    """
+    signature = getattr(preprocess_func, "signature", None)
+    if signature:
+        return signature
+    return f"{getattr(preprocess_func, '__module__', '')}.{getattr(preprocess_func, '__qualname__', repr(preprocess_func))}"
+
+def corpus_version(documents: List[Document]) -> str:
+    """
+    Create a version string for a list of documents.
+
+    It uses the same document fingerprints as the index manifest, so it
+    changes whenever a document is added, removed, edited or reordered.
+
+    Args:
+        documents: The documents in index order
+
+    Returns:
+        A sha256 hex digest
+    """
+    digest = hashlib.sha256()
+    for doc in documents:
+        digest.update(fingerprint_document(doc).encode("ascii"))
+    return digest.hexdigest()
+
+class BM25Index:
+    """
+    A BM25 keyword index stored as a sparse term x document matrix.
+
+    This class can:
+    - Precompute the BM25 weight of every (term, document) pair
+    - Score all documents for a question with one sparse product
+    - Return the best k documents without sorting everything
+    """
+
+    def __init__(
+        self,
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B,
+        preprocess_func: Callable[[str], List[str]] = DEFAULT_ANALYZER
+    ):
+        """
+        Start an empty index. Use fit() or from_texts() to add documents.
+
+        Args:
+            k1: How fast repeated words stop adding to the score
+            b: How much long documents are penalized (0 = not at all, 1 = fully)
+            preprocess_func: Function that turns text into a list of terms
+                (default: the shared Vietnamese TextAnalyzer)
+        """
+        self.k1 = k1
+        self.b = b
+        self.preprocess_func = preprocess_func
+        self.vocabulary: Dict[str, int] = {}
+        self.idf: Optional[np.ndarray] = None
+        self.matrix: Optional[sparse.csr_matrix] = None  # Shape: (terms, documents)
+        self.version: Optional[str] = None
+
+    @property
+    def num_documents(self) -> int:
+        """Number of documents in the index."""
+        return 0 if self.matrix is None else self.matrix.shape[1]
+
+    def fit(self, texts: List[str]) -> "BM25Index":
+        """
+        Build the index from a list of texts.
+
+        Args:
+            texts: The document texts, in document order
+
+        Returns:
+            The index itself
+
+        Example:
+            >>> index = BM25Index().fit(["first document", "second document"])
+        """
+        rows, cols, counts = [], [], []
+        doc_lengths = np.zeros(len(texts), dtype=np.float32)
+        self.vocabulary = {}
+
+        for doc_id, text in enumerate(texts):
+            terms = self.preprocess_func(text)
+            doc_lengths[doc_id] = len(terms)
+            term_counts: Dict[int, int] = {}
+            for term in terms:
+                term_id = self.vocabulary.setdefault(term, len(self.vocabulary))
+                term_counts[term_id] = term_counts.get(term_id, 0) + 1
+            rows.extend(term_counts.keys())
+            cols.extend([doc_id] * len(term_counts))
+            counts.extend(term_counts.values())
+
+        tf = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float32), (rows, cols)),
+            shape=(len(self.vocabulary), len(texts))
+        )
+
+        # Lucene-style idf, always positive
+        num_docs = len(texts)
+        doc_freq = np.diff(tf.indptr).astype(np.float32)
+        self.idf = np.log1p((num_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+        # BM25 weight: idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+        avg_length = doc_lengths.mean() if num_docs and doc_lengths.mean() > 0 else 1.0
+        length_norm = self.k1 * (1 - self.b + self.b * doc_lengths / avg_length)
+        term_ids = np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr))
+        data = tf.data
+        tf.data = self.idf[term_ids] * data * (self.k1 + 1) / (data + length_norm[tf.indices])
+        self.matrix = tf
+        return self
+
+    @classmethod
+    def from_texts(cls, texts: List[str], **kwargs) -> "BM25Index":
+        """
+        Create an index from a list of texts.
+
+        Args:
+            texts: The document texts
+            **kwargs: Settings passed to BM25Index (k1, b, preprocess_func)
+
+        Returns:
+            A ready-to-search index
+        """
+        return cls(**kwargs).fit(texts)
+
+    def save(self, directory: str, version: Optional[str] = None) -> None:
+        """
+        Save the index to a folder.
+
+        The matrix arrays are saved as .npy files so load() can memory-map them.
+
+        Args:
+            directory: Folder to save into
+            version: Version of the documents (see corpus_version())
+
+        Example:
+            >>> index.save("data/bm25", version=corpus_version(documents))
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.version = version or self.version
+
+        # Remove the old meta first and write it last, so a half-written folder is never loaded
+        meta_path = os.path.join(directory, META_FILE_NAME)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+
+        # Write to temporary files and rename, so processes that memory-mapped
+        # the old files keep reading them safely
+        arrays = {"data": self.matrix.data, "indices": self.matrix.indices,
+                  "indptr": self.matrix.indptr, "idf": self.idf}
+        for name, file_name in ARRAY_FILE_NAMES.items():
+            path = os.path.join(directory, file_name)
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(arrays[name]))
+            os.replace(path + ".tmp", path)
+        vocab_path = os.path.join(directory, VOCAB_FILE_NAME)
+        with open(vocab_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.vocabulary, f, ensure_ascii=False)
+        os.replace(vocab_path + ".tmp", vocab_path)
+
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                "format_version": INDEX_FORMAT_VERSION,
+                "version": self.version,
+                "k1": self.k1,
+                "b": self.b,
+                "preprocess": get_preprocess_signature(self.preprocess_func),
+                "shape": list(self.matrix.shape)
+            }, f, indent=2)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    @classmethod
+    def load(
+        cls,
+        directory: str,
+        expected_version: Optional[str] = None,
+        mmap: bool = True,
+        preprocess_func: Callable[[str], List[str]] = DEFAULT_ANALYZER
+    ) -> "BM25Index":
+        """
+        Load an index saved with save().
+
+        Args:
+            directory: Folder the index was saved to
+            expected_version: Raise an error if the saved version is different
+            mmap: Memory-map the arrays instead of reading them into memory
+            preprocess_func: Must be the same function used when the index was built
+
+        Returns:
+            The loaded index
+
+        Raises:
+            FileNotFoundError: If there is no saved index in the folder
+            ValueError: If the saved index is an old format or another version
+        """
+        with open(os.path.join(directory, META_FILE_NAME), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index format: {meta.get('format_version')}")
+        if expected_version is not None and meta.get("version") != expected_version:
+            raise ValueError("BM25 index is out of date with the documents")
+        if meta.get("preprocess") != get_preprocess_signature(preprocess_func):
+            raise ValueError("BM25 index was built with different text preprocessing")
+
+        index = cls(k1=meta["k1"], b=meta["b"], preprocess_func=preprocess_func)
+        arrays = {
+            name: np.load(os.path.join(directory, file_name), mmap_mode="r" if mmap else None)
+            for name, file_name in ARRAY_FILE_NAMES.items()
+        }
+        with open(os.path.join(directory, VOCAB_FILE_NAME), "r", encoding="utf-8") as f:
+            index.vocabulary = json.load(f)
+        index.idf = arrays["idf"]
+        index.matrix = sparse.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=tuple(meta["shape"]),
+            copy=False
+        )
+        index.version = meta.get("version")
+        return index
+
+    @classmethod
+    def load_or_build(
+        cls,
+        directory: str,
+        documents: List[Document],
+        **kwargs
+    ) -> "BM25Index":
+        """
+        Load a saved index if it matches the documents, otherwise build and save a new one.
+
+        Args:
+            directory: Folder for the saved index
+            documents: The documents to index
+            **kwargs: Settings passed to BM25Index (k1, b, preprocess_func)
+
+        Returns:
+            An index for the documents
+        """
+        version = corpus_version(documents)
+        try:
+            index = cls.load(directory, expected_version=version,
+                             preprocess_func=kwargs.get("preprocess_func", DEFAULT_ANALYZER))
+            if ((index.k1, index.b) == (kwargs.get("k1", DEFAULT_K1), kwargs.get("b", DEFAULT_B))
+                    and index.num_documents == len(documents)):
+                return index
+        except (FileNotFoundError, ValueError):
+            pass
+        index = cls.from_texts([doc.page_content for doc in documents], **kwargs)
+        index.save(directory, version=version)
+        return index
+
+    def get_scores(self, query: str) -> np.ndarray:
+        """
+        Score every document for a question.
+
+        Args:
+            query: The question to score
+
+        Returns:
+            One BM25 score per document
+        """
+        term_counts: Dict[int, int] = {}
+        for term in self.preprocess_func(query):
+            term_id = self.vocabulary.get(term)
+            if term_id is not None:
+                term_counts[term_id] = term_counts.get(term_id, 0) + 1
+        if not term_counts:
+            return np.zeros(self.num_documents, dtype=np.float32)
+
+        # Repeated query words count as many times as they appear (like rank_bm25)
+        term_ids = np.fromiter(term_counts.keys(), dtype=np.int64)
+        weights = np.fromiter(term_counts.values(), dtype=np.float32)
+        return np.asarray(self.matrix[term_ids].T @ weights).ravel()
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k best documents for a question.
+
+        Like LangChain's BM25Retriever, it always returns k documents (or all of
+        them if there are fewer), so documents that share no words with the
+        question can be filled in with a score of 0. Equal scores keep
+        document order.
+
+        Args:
+            query: The question to search for
+            k: Number of documents to return
+
+        Returns:
+            (document positions, scores), best first
+
+        Example:
+            >>> ids, scores = index.search("vector database", k=3)
+        """
+        scores = self.get_scores(query)
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.array([], dtype=np.int64), scores[:0]
+        if k < len(scores):
+            # Everything above the k-th best score, then ties with it in document order
+            threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+            candidates = np.concatenate([
+                np.flatnonzero(scores > threshold),
+                np.flatnonzero(scores == threshold)
+            ])[:k]
+        else:
+            candidates = np.arange(len(scores))
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return order, scores[order]
+
+class BM25IndexRetriever(BaseRetriever):
+    """
+    A LangChain retriever that searches documents with a BM25Index.
+
+    It can be used anywhere a LangChain BM25Retriever is used.
+    """
+
+    index: BM25Index
+    documents: List[Document]
+    k: int = 4
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @classmethod
+    def from_documents(
+        cls,
+        documents: List[Document],
+        k: int = 4,
+        persist_directory: Optional[str] = None,
+        **kwargs
+    ) -> "BM25IndexRetriever":
+        """
+        Build a retriever from documents.
+
+        Args:
+            documents: Documents to search
+            k: Number of documents to return
+            persist_directory: Folder to load the index from (or save it to),
+                so it is only rebuilt when the documents change
+            **kwargs: Settings passed to BM25Index (k1, b, preprocess_func)
+
+        Returns:
+            A ready-to-use retriever
+
+        Example:
+            >>> retriever = BM25IndexRetriever.from_documents(documents, k=4, persist_directory="data/bm25")
+            >>> docs = retriever.invoke("What is RAG?")
+        """
+        if persist_directory:
+            index = BM25Index.load_or_build(persist_directory, documents, **kwargs)
+        else:
+            index = BM25Index.from_texts([doc.page_content for doc in documents], **kwargs)
+        return cls(index=index, documents=documents, k=k)
+
+    def search_with_scores(self, query: str, k: Optional[int] = None) -> List[Tuple[Document, float]]:
+        """
+        Find documents and their BM25 scores.
+
+        Args:
+            query: The question to search for
+            k: Number of documents to return (default: self.k)
+
+        Returns:
+            List of (document, score), best first
+        """
+        ids, scores = self.index.search(query, k or self.k)
+        return [(self.documents[i], float(score)) for i, score in zip(ids, scores)]
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        k: Optional[int] = None
+    ) -> List[Document]:
+        return [doc for doc, _ in self.search_with_scores(query, k)]
+
+if __name__ == "__main__":
+    """
+    This part runs when you run this file directly.
+    It shows how to build and search a BM25 index.
+    """
+    sample_docs = [
+        Document(page_content="This is a sample document about RAG architecture.", metadata={"source": "test1"}),
+        Document(page_content="Another document explaining vector databases.", metadata={"source": "test2"}),
+        Document(page_content="BM25 is a keyword search method used with vector search.", metadata={"source": "test3"})
+    ]
+
+    retriever = BM25IndexRetriever.from_documents(sample_docs, k=2)
+    for doc, score in retriever.search_with_scores("vector search"):
+        print(f"{score:.3f}  {doc.page_content}")
@@ -30,6 +30,12 @@ DEFAULT_HYBRID_WEIGHTS = [0.7, 0.3]  # [vector_weight, keyword_weight]
 DEFAULT_VECTOR_STORE_TYPE = "qdrant"
 DEFAULT_COLLECTION_NAME = "documents"
 
+# Batched indexing configuration
+DEFAULT_EMBED_BATCH_SIZE = 32    # Texts embedded and upserted together
+DEFAULT_EMBED_MAX_WORKERS = 4    # Batches processed at the same time
+DEFAULT_MAX_RETRIES = 3          # Attempts per embedding call and per upsert
+DEFAULT_RETRY_BACKOFF = 1.0      # Base delay in seconds (doubled after each attempt)
+
 # Embeddings configuration
 EMBEDDINGS_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
 try:
@@ -6,15 +6,14 @@ import os
 import sys
 from typing import List, Optional
 from langchain_core.documents import Document
-from langchain_community.retrievers import BM25Retriever as LangchainBM25Retriever
-from rank_bm25 import BM25Okapi
+from layers._04_retrieval.bm25_index import BM25Index
 
 # Add the retrievers directory to Python path
 sys.path.append(os.path.dirname(__file__))
 from base import BaseRetriever
 
 class BM25Retriever(BaseRetriever):
-    """BM25 retriever implementation."""
+    """BM25 retriever implementation (sparse matrix index, scored in one product per query)."""
     
     def __init__(
         self,
@@ -26,8 +25,7 @@ class BM25Retriever(BaseRetriever):
             
         self.documents = documents
         self.k = k
-        self.retriever = LangchainBM25Retriever.from_documents(documents)
-        self.retriever.k = k
+        self.index = BM25Index.from_texts([doc.page_content for doc in documents])
     
     def retrieve_documents(
         self,
@@ -35,6 +33,5 @@ class BM25Retriever(BaseRetriever):
         k: Optional[int] = None
     ) -> List[Document]:
         """Retrieve documents using BM25 search."""
-        if k is not None:
-            self.retriever.k = k
-        return self.retriever.invoke(query) 
\ No newline at end of file
+        ids, _ = self.index.search(query, k or self.k)
+        return [self.documents[i] for i in ids]
@@ -7,17 +7,16 @@ import sys
 from typing import List, Optional
 from langchain_core.documents import Document
 from langchain_core.vectorstores import VectorStore
-from langchain.retrievers import EnsembleRetriever
-from langchain_core.runnables import RunnablePassthrough
-from base import BaseRetriever
-from vector_retriever import VectorRetriever
-from bm25_retriever import BM25Retriever
+from layers._04_retrieval.hybrid_retriever import weighted_reciprocal_rank, shared_executor
 
 # Add the retrievers directory to Python path
 sys.path.append(os.path.dirname(__file__))
+from base import BaseRetriever
+from vector_retriever import VectorRetriever
+from bm25_retriever import BM25Retriever
 
 class HybridRetriever(BaseRetriever):
-    """Hybrid retriever combining vector and BM25 search."""
+    """Hybrid retriever combining vector and BM25 search (both run in parallel)."""
     
     def __init__(
         self,
@@ -38,18 +37,17 @@ class HybridRetriever(BaseRetriever):
         super().__init__()
         
         # Create individual retrievers
-        vector_retriever = VectorRetriever(vector_store, k=k)
-        bm25_retriever = BM25Retriever(documents, k=k)
-        
-        # Create ensemble retriever with Runnable
-        self.retriever = EnsembleRetriever(
-            retrievers=[
-                RunnablePassthrough() | vector_retriever.retrieve_documents,
-                RunnablePassthrough() | bm25_retriever.retrieve_documents
-            ],
-            weights=weights or [0.7, 0.3]  # Default weights
-        )
+        self.vector_retriever = VectorRetriever(vector_store, k=k)
+        self.bm25_retriever = BM25Retriever(documents, k=k)
+        self.weights = weights or [0.7, 0.3]  # Default weights
+        self.k = k
     
-    def retrieve_documents(self, query: str) -> List[Document]:
-        """Retrieve documents using hybrid search."""
-        return self.retriever.invoke(query) 
\ No newline at end of file
+    def retrieve_documents(self, query: str, k: Optional[int] = None) -> List[Document]:
+        """Retrieve documents using hybrid search (fused with weighted reciprocal rank)."""
+        k = k or self.k
+        # The vector leg runs on the pool shared with ParallelHybridRetriever,
+        # the BM25 leg in the calling thread
+        vector_future = shared_executor.submit(self.vector_retriever.retrieve_documents, query, k)
+        bm25_docs = self.bm25_retriever.retrieve_documents(query, k)
+        fused = weighted_reciprocal_rank([vector_future.result(), bm25_docs], self.weights)
+        return fused[:k]
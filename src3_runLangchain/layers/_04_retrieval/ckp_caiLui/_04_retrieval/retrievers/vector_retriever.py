@@ -35,6 +35,6 @@ class VectorRetriever(BaseRetriever):
         self.vector_store = vector_store
         self.k = k
     
-    def retrieve_documents(self, query: str) -> List[Document]:
+    def retrieve_documents(self, query: str, k: Optional[int] = None) -> List[Document]:
         """Retrieve documents using similarity search."""
-        return self.vector_store.similarity_search(query, k=self.k) 
\ No newline at end of file
+        return self.vector_store.similarity_search(query, k=k or self.k) 
\ No newline at end of file
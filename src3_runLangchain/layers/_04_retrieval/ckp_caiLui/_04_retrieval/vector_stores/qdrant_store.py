@@ -4,7 +4,11 @@ Qdrant vector store implementation.
 
 from pathlib import Path
 import sys
-from typing import List, Optional, Dict
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Dict, Callable, Any
+import numpy as np
 from langchain_core.documents import Document
 from langchain_core.vectorstores import VectorStore
 from qdrant_client import QdrantClient
@@ -16,7 +20,11 @@ from config import (
     QDRANT_API_KEY, 
     DEFAULT_COLLECTION_NAME,
     HUGGINGFACE_API_KEY,
-    EMBEDDINGS_MODEL_NAME
+    EMBEDDINGS_MODEL_NAME,
+    DEFAULT_EMBED_BATCH_SIZE,
+    DEFAULT_EMBED_MAX_WORKERS,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_RETRY_BACKOFF
 )
 
 # Setup paths
@@ -62,8 +70,112 @@ class QdrantStore(BaseVectorStore):
             )
         return self._clients[client_key]
     
-    def create_store(self, documents: List[Document]) -> None:
-        """Create a Qdrant vector store from documents."""
+    def _with_retry(self, func: Callable[[], Any], max_retries: int) -> Any:
+        """Call func, retrying with exponential backoff and jitter on errors."""
+        for attempt in range(max_retries):
+            try:
+                return func()
+            except Exception:
+                if attempt == max_retries - 1:
+                    raise
+                delay = DEFAULT_RETRY_BACKOFF * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay / 2))
+    
+    def _embed_batch(self, texts: List[str], max_retries: int) -> List[Optional[List[float]]]:
+        """
+        Embed a batch of texts with one feature_extraction call.
+        
+        Falls back to one call per text, in this worker thread, if the batch
+        call fails or does not return one vector per text. All calls of a
+        batch share one budget of max_retries failed attempts.
+        """
+        failures = 0
+        
+        def embed(text: Any) -> Any:
+            nonlocal failures
+            while True:
+                try:
+                    return self.hf_client.feature_extraction(
+                        model=EMBEDDINGS_MODEL_NAME,
+                        text=text
+                    )
+                except Exception:
+                    failures += 1
+                    if failures >= max_retries:
+                        raise
+                    delay = DEFAULT_RETRY_BACKOFF * (2 ** (failures - 1))
+                    time.sleep(delay + random.uniform(0, delay / 2))
+        
+        try:
+            vectors = np.asarray(embed(texts))
+            if vectors.ndim == 2 and vectors.shape[0] == len(texts):
+                return vectors.tolist()
+            print(f"Warning: batch embedding returned shape {vectors.shape}, embedding texts one by one")
+        except Exception as e:
+            print(f"Error getting batch embedding, embedding texts one by one: {e}")
+        
+        embeddings = []
+        for text in texts:
+            try:
+                embedding = embed(text)
+            except Exception as e:
+                print(f"Error getting embedding: {e}")
+                embedding = None
+            embeddings.append(None if embedding is None else np.asarray(embedding).tolist())
+        return embeddings
+    
+    def _process_batch(
+        self,
+        start: int,
+        documents: List[Document],
+        max_retries: int
+    ) -> int:
+        """Embed one batch of documents and upsert it. Returns the number of points written."""
+        embeddings = self._embed_batch([doc.page_content for doc in documents], max_retries)
+        points = []
+        for offset, (doc, embedding) in enumerate(zip(documents, embeddings)):
+            if embedding is None:
+                print(f"Warning: Could not get embedding for text: {doc.page_content[:50]}...")
+                continue
+            points.append(
+                models.PointStruct(
+                    id=start + offset,
+                    vector=embedding,
+                    payload={"text": doc.page_content, "metadata": doc.metadata}
+                )
+            )
+        
+        if points:
+            self._with_retry(
+                lambda: self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=points
+                ),
+                max_retries
+            )
+        return len(points)
+    
+    def create_store(
+        self,
+        documents: List[Document],
+        batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
+        max_workers: int = DEFAULT_EMBED_MAX_WORKERS,
+        max_retries: int = DEFAULT_MAX_RETRIES
+    ) -> None:
+        """
+        Create a Qdrant vector store from documents.
+        
+        Documents are split into batches. Each batch is embedded with one
+        feature_extraction call; batches run on a bounded thread pool and
+        each batch is upserted as soon as it is ready, with retry and backoff
+        for failed embedding calls and upserts.
+        
+        Args:
+            documents: Documents to index
+            batch_size: Number of documents per batch
+            max_workers: Number of batches processed at the same time
+            max_retries: Attempts per upsert, and failed attempts shared by the embedding calls of a batch
+        """
         # Create collection if it doesn't exist
         try:
             self.client.get_collection(self.collection_name)
@@ -75,40 +187,25 @@ class QdrantStore(BaseVectorStore):
                     distance=models.Distance.COSINE
                 )
             )
-            
-        # Add documents
-        texts = [doc.page_content for doc in documents]
-        metadatas = [doc.metadata for doc in documents]
         
-        # Get embeddings using HuggingFace client
-        embeddings = []
-        for text in texts:
-            try:
-                embedding = self.hf_client.feature_extraction(
-                    model=EMBEDDINGS_MODEL_NAME,
-                    text=text
-                )
-                if embedding is not None:
-                    embeddings.append(embedding)
-                else:
-                    print(f"Warning: Could not get embedding for text: {text[:50]}...")
-            except Exception as e:
-                print(f"Error getting embedding: {e}")
-                continue
+        batches = [
+            (start, documents[start:start + batch_size])
+            for start in range(0, len(documents), batch_size)
+        ]
         
-        # Only proceed if we have valid embeddings
-        if embeddings:
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=[
-                    models.PointStruct(
-                        id=i,
-                        vector=embedding,
-                        payload={"text": texts[i], "metadata": metadatas[i]}
-                    )
-                    for i, embedding in enumerate(embeddings)
-                ]
-            )
+        uploaded = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._process_batch, start, batch, max_retries): start
+                for start, batch in batches
+            }
+            for future in as_completed(futures):
+                try:
+                    uploaded += future.result()
+                except Exception as e:
+                    print(f"Error upserting batch starting at {futures[future]}: {e}")
+        
+        print(f"Upserted {uploaded}/{len(documents)} documents into '{self.collection_name}'")
     
     def similarity_search(self, query: str, k: int = 4) -> List[Document]:
         """Search for similar documents."""
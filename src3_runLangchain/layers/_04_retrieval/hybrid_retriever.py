@@ -0,0 +1,223 @@
+"""
+This module helps run several retrievers at the same time and merge their results.
+Vector search and keyword search run in parallel, so a hybrid search takes
+as long as the slowest search instead of the sum of both.
+"""
+
+from typing import List, Optional, Sequence, Dict, Tuple, Any
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStoreRetriever
+from langchain_core.callbacks import (
+    CallbackManagerForRetrieverRun,
+    AsyncCallbackManagerForRetrieverRun
+)
+from layers._04_retrieval.fusion import fuse, rrf_scores, DEFAULT_RRF_C
+import numpy as np
+import asyncio
+import contextvars
+
+# Default configuration
+DEFAULT_MAX_WORKERS = 16     # Threads shared by all hybrid retrievers
+DEFAULT_FUSION = "rrf"       # Same ranking as LangChain's EnsembleRetriever
+
+# One pool for all hybrid searches, so threads are not created per question
+shared_executor = ThreadPoolExecutor(max_workers=DEFAULT_MAX_WORKERS, thread_name_prefix="hybrid-leg")
+
+def fuse_documents(
+    doc_lists: Sequence[List[Document]],
+    weights: Sequence[float],
+    score_lists: Optional[Sequence[Sequence[float]]] = None,
+    method: str = DEFAULT_FUSION,
+    c: int = DEFAULT_RRF_C,
+    id_key: Optional[str] = None,
+    k: Optional[int] = None
+) -> List[Document]:
+    """
+    Merge ranked document lists into one ranking (see fusion.fuse for the methods).
+
+    Args:
+        doc_lists: One ranked list of documents per retriever
+        weights: One weight per retriever
+        score_lists: One list of scores per retriever, higher is better (not needed for "rrf")
+        method: "rrf", "minmax" or "zscore"
+        c: RRF constant
+        id_key: Metadata key that identifies a document (default: page content;
+            documents missing the key also fall back to page content)
+        k: Number of documents to return (default: all)
+
+    Returns:
+        Documents sorted by fused score, without duplicates
+    """
+    # Give every distinct document a number, then fuse the number arrays
+    positions: Dict[str, int] = {}
+    candidates: List[Document] = []
+    id_lists = []
+    for docs in doc_lists:
+        ids = []
+        for doc in docs:
+            # Documents without the id key are told apart by their content
+            if id_key is not None and doc.metadata.get(id_key) is not None:
+                key = "id:" + str(doc.metadata[id_key])
+            else:
+                key = "content:" + doc.page_content
+            if key not in positions:
+                positions[key] = len(candidates)
+                candidates.append(doc)
+            ids.append(positions[key])
+        id_lists.append(np.asarray(ids, dtype=np.int64))
+
+    scores = None if score_lists is None else [np.asarray(s, dtype=np.float64) for s in score_lists]
+    ids, _ = fuse(id_lists, scores, weights, method=method, c=c, k=k)
+    return [candidates[i] for i in ids]
+
+def weighted_reciprocal_rank(
+    doc_lists: Sequence[List[Document]],
+    weights: Sequence[float],
+    c: int = DEFAULT_RRF_C,
+    id_key: Optional[str] = None
+) -> List[Document]:
+    """
+    Merge ranked document lists with weighted Reciprocal Rank Fusion.
+
+    Each document gets sum(weight / (rank + c)) over the lists it appears in.
+
+    Args:
+        doc_lists: One ranked list of documents per retriever
+        weights: One weight per retriever
+        c: Constant that lowers the impact of top ranks
+        id_key: Metadata key that identifies a document (default: page content)
+
+    Returns:
+        Documents sorted by fused score, without duplicates
+    """
+    return fuse_documents(doc_lists, weights, method="rrf", c=c, id_key=id_key)
+
+def search_with_scores(
+    retriever: BaseRetriever,
+    query: str,
+    config: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Document], List[float]]:
+    """
+    Run one retriever and get a score for each document (higher is better).
+
+    - Retrievers with a search_with_scores() method (e.g. BM25IndexRetriever) give their own scores
+    - Vector store retrievers give the store's relevance scores
+    - Other retrievers only give a ranking, so 1 / (c + rank) is used as the score
+
+    Args:
+        retriever: The retriever to run
+        query: The question to search for
+        config: Optional LangChain config (callbacks) for plain retrievers
+
+    Returns:
+        (documents, scores), best first
+    """
+    if hasattr(retriever, "search_with_scores"):
+        results = retriever.search_with_scores(query)
+    elif isinstance(retriever, VectorStoreRetriever):
+        results = retriever.vectorstore.similarity_search_with_relevance_scores(query, **retriever.search_kwargs)
+    else:
+        docs = retriever.invoke(query, config)
+        return docs, rrf_scores(len(docs)).tolist()
+    return [doc for doc, _ in results], [score for _, score in results]
+
+class ParallelHybridRetriever(BaseRetriever):
+    """
+    A retriever that runs several retrievers in parallel and fuses their results.
+
+    With fusion="rrf" it returns the same ranking as LangChain's EnsembleRetriever,
+    but the retrievers run at the same time instead of one after the other.
+    With fusion="minmax" or "zscore" the real search scores are normalized and mixed.
+    """
+
+    retrievers: List[BaseRetriever]
+    weights: List[float]
+    fusion: str = DEFAULT_FUSION
+    c: int = DEFAULT_RRF_C
+    id_key: Optional[str] = None
+    k: Optional[int] = None
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _search(self, retriever: BaseRetriever, query: str, config: Dict[str, Any]):
+        """Run one leg: documents only for RRF, documents and scores otherwise."""
+        if self.fusion == "rrf":
+            return retriever.invoke(query, config), None
+        return search_with_scores(retriever, query, config)
+
+    def _fuse(
+        self,
+        results: List[Tuple[List[Document], Optional[List[float]]]],
+        k: Optional[int] = None
+    ) -> List[Document]:
+        """Fuse the results of all retrievers and keep the best k (default: self.k)."""
+        doc_lists = [docs for docs, _ in results]
+        score_lists = None if self.fusion == "rrf" else [scores for _, scores in results]
+        return fuse_documents(doc_lists, self.weights, score_lists, self.fusion, self.c, self.id_key, k or self.k)
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        k: Optional[int] = None
+    ) -> List[Document]:
+        # Run the first retriever here and the others on the pool.
+        # Each task copies the current context, so callbacks and timers still work.
+        futures = [
+            shared_executor.submit(
+                contextvars.copy_context().run,
+                self._search,
+                retriever,
+                query,
+                {"callbacks": run_manager.get_child(tag=f"retriever_{i + 1}")}
+            )
+            for i, retriever in enumerate(self.retrievers[1:], 1)
+        ]
+        first = self._search(self.retrievers[0], query, {"callbacks": run_manager.get_child(tag="retriever_1")})
+        return self._fuse([first] + [future.result() for future in futures], k)
+
+    async def _aget_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: AsyncCallbackManagerForRetrieverRun,
+        k: Optional[int] = None
+    ) -> List[Document]:
+        if self.fusion == "rrf":
+            doc_lists = await asyncio.gather(*(
+                retriever.ainvoke(query, {"callbacks": run_manager.get_child(tag=f"retriever_{i + 1}")})
+                for i, retriever in enumerate(self.retrievers)
+            ))
+            return self._fuse([(docs, None) for docs in doc_lists], k)
+
+        # Score lookups are synchronous, so run each one in a worker thread
+        results = await asyncio.gather(*(
+            asyncio.to_thread(self._search, retriever, query, {"callbacks": run_manager.get_child(tag=f"retriever_{i + 1}")})
+            for i, retriever in enumerate(self.retrievers)
+        ))
+        return self._fuse(list(results), k)
+
+if __name__ == "__main__":
+    """
+    This part runs when you run this file directly.
+    It shows that two slow retrievers finish in the time of one.
+    """
+    import time
+
+    class SlowRetriever(BaseRetriever):
+        name: str
+
+        def _get_relevant_documents(self, query, *, run_manager):
+            time.sleep(0.5)
+            return [Document(page_content=f"{self.name} result {i}") for i in range(3)]
+
+    hybrid = ParallelHybridRetriever(
+        retrievers=[SlowRetriever(name="vector"), SlowRetriever(name="bm25")],
+        weights=[0.7, 0.3]
+    )
+    start = time.perf_counter()
+    docs = hybrid.invoke("What is RAG?")
+    print(f"Found {len(docs)} documents in {time.perf_counter() - start:.2f}s")
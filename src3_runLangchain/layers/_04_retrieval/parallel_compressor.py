@@ -0,0 +1,175 @@
+"""
+This module helps shorten retrieved documents with an LLM without waiting for
+one call after another. Each document is sent to the LLM at the same time
+(up to a limit), slow answers are cut off at a deadline, and results are
+remembered for questions that come back.
+"""
+
+from typing import List, Optional, Sequence, Dict, Any, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from langchain_core.documents import Document, BaseDocumentCompressor
+from langchain_core.callbacks import Callbacks
+from pydantic import PrivateAttr
+import hashlib
+import threading
+import contextvars
+import time
+
+# Default configuration
+DEFAULT_MAX_CONCURRENCY = 8     # LLM calls running at the same time
+DEFAULT_DEADLINE = 5.0          # Seconds to wait for all extractions of one question
+DEFAULT_CACHE_SIZE = 10000
+
+class ParallelLLMCompressor(BaseDocumentCompressor):
+    """
+    A compressor that runs a per-document LLM extractor on many documents at once.
+
+    This class can:
+    - Send one extraction call per document in parallel (with a concurrency limit)
+    - Stop waiting at a deadline, cancel calls that have not started
+      and keep the original text of slow documents
+    - Remember extractions by (question, document) so repeated questions are instant
+    - Work as a LangChain document compressor (e.g. around LLMChainExtractor)
+
+    Example:
+        >>> extractor = LLMChainExtractor.from_llm(llm)
+        >>> compressor = ParallelLLMCompressor(base_compressor=extractor, deadline=3.0)
+        >>> short_docs = compressor.compress_documents(docs, "What is RAG?")
+    """
+
+    base_compressor: BaseDocumentCompressor
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    deadline: Optional[float] = DEFAULT_DEADLINE   # None waits for every call
+    id_key: Optional[str] = None                   # Metadata key that identifies a document (default: content hash)
+    cache_size: int = DEFAULT_CACHE_SIZE
+
+    _executor: Any = PrivateAttr(default=None)
+    _cache: "OrderedDict[Tuple[str, str], Optional[str]]" = PrivateAttr(default_factory=OrderedDict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def model_post_init(self, __context: Any) -> None:
+        """Create the thread pool that limits how many LLM calls run at once."""
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="llm-compress"
+        )
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _cache_key(self, query_hash: str, document: Document) -> Tuple[str, str]:
+        """Key for one (question, document) pair."""
+        if self.id_key is not None and self.id_key in document.metadata:
+            doc_id = str(document.metadata[self.id_key])
+        else:
+            doc_id = self._hash(document.page_content)
+        return query_hash, doc_id
+
+    def _remember(self, key: Tuple[str, str], extracted: Optional[str]) -> None:
+        with self._lock:
+            self._cache[key] = extracted
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _extract(self, key: Tuple[str, str], document: Document, query: str, callbacks: Callbacks) -> Optional[str]:
+        """Compress one document; None means the LLM found nothing relevant."""
+        result = self.base_compressor.compress_documents([document], query, callbacks=callbacks)
+        extracted = result[0].page_content if result else None
+        # Also cached when the answer arrives after the deadline, so the next ask is instant
+        self._remember(key, extracted)
+        return extracted
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None
+    ) -> Sequence[Document]:
+        """
+        Compress all documents in parallel and keep their original order.
+
+        Args:
+            documents: Retrieved documents
+            query: The question
+            callbacks: Optional LangChain callbacks
+
+        Returns:
+            Compressed documents. Documents the LLM found irrelevant are dropped;
+            documents still running at the deadline keep their original text.
+
+        Example:
+            >>> docs = compressor.compress_documents(retrieved_docs, "What is RAG?")
+        """
+        start = time.monotonic()
+        query_hash = self._hash(query)
+        keys = [self._cache_key(query_hash, doc) for doc in documents]
+
+        extracted: Dict[int, Optional[str]] = {}
+        futures: Dict[int, Future] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    extracted[i] = self._cache[key]
+        for i, doc in enumerate(documents):
+            if i not in extracted:
+                futures[i] = self._executor.submit(
+                    contextvars.copy_context().run,
+                    self._extract, keys[i], doc, query, callbacks
+                )
+
+        if futures:
+            timeout = None if self.deadline is None else max(0.0, self.deadline - (time.monotonic() - start))
+            _, not_done = wait(futures.values(), timeout=timeout)
+            # Calls that have not started yet would only cost money and block the
+            # pool for the next question, so drop them
+            for future in not_done:
+                future.cancel()
+
+        compressed = []
+        for i, doc in enumerate(documents):
+            future = futures.get(i)
+            if future is not None:
+                if future.cancelled() or not future.done() or future.exception() is not None:
+                    # Too slow or failed: keep the original text
+                    compressed.append(doc)
+                    continue
+                extracted[i] = future.result()
+            if extracted[i] is not None:
+                compressed.append(Document(page_content=extracted[i], metadata=doc.metadata))
+        return compressed
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Get the number of cached extractions."""
+        return {"size": len(self._cache), "max_size": self.cache_size}
+
+    def close(self) -> None:
+        """Stop the thread pool (running calls are not interrupted)."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+if __name__ == "__main__":
+    """
+    This part runs when you run this file directly.
+    It uses a fake slow extractor to show parallel calls, the deadline and the cache.
+    """
+    import random
+
+    class SlowExtractor(BaseDocumentCompressor):
+        def compress_documents(self, documents, query, callbacks=None):
+            time.sleep(random.uniform(0.2, 1.5))
+            return [Document(page_content=documents[0].page_content[:20], metadata=documents[0].metadata)]
+
+    docs = [Document(page_content=f"Document {i} about RAG and vector search.", metadata={"id": i}) for i in range(24)]
+    compressor = ParallelLLMCompressor(base_compressor=SlowExtractor(), deadline=1.0, id_key="id")
+
+    for attempt in ("first call", "second call"):
+        start = time.perf_counter()
+        result = compressor.compress_documents(docs, "What is RAG?")
+        shortened = sum(1 for doc, original in zip(result, docs) if doc.page_content != original.page_content)
+        print(f"{attempt}: {time.perf_counter() - start:.2f}s, {shortened}/{len(docs)} compressed")
+        time.sleep(1.0)  # Let late calls finish and fill the cache
@@ -0,0 +1,179 @@
+"""
+This module helps put the best documents first with a small local model.
+A cross-encoder reads the question and each candidate document together
+and gives a relevance score, without calling any online API.
+"""
+
+from typing import List, Optional, Sequence, Dict, Any
+from collections import OrderedDict
+from langchain_core.documents import Document, BaseDocumentCompressor
+from langchain_core.callbacks import Callbacks
+from pydantic import PrivateAttr
+import numpy as np
+import hashlib
+import threading
+
+# Default configuration
+DEFAULT_RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # Multilingual, works for Vietnamese
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_MAX_CANDIDATES = 50
+DEFAULT_TOP_N = 4
+DEFAULT_CACHE_SIZE = 10000
+
+class CrossEncoderReranker(BaseDocumentCompressor):
+    """
+    A reranker that scores (question, document) pairs with a local cross-encoder.
+
+    This class can:
+    - Score many candidates in batches on the CPU
+    - Use an ONNX model (e.g. int8 quantized) for faster inference
+    - Limit how many candidates are scored (candidate budget)
+    - Remember scores of (question, document) pairs it has seen before
+    - Work as a LangChain document compressor
+
+    Example:
+        >>> reranker = CrossEncoderReranker(top_n=4)
+        >>> best_docs = reranker.rerank("What is RAG?", candidate_docs)
+    """
+
+    model_name: str = DEFAULT_RERANK_MODEL
+    top_n: int = DEFAULT_TOP_N
+    max_candidates: int = DEFAULT_MAX_CANDIDATES
+    batch_size: int = DEFAULT_BATCH_SIZE
+    max_length: int = 512
+    device: str = "cpu"
+    backend: str = "torch"                 # "torch" or "onnx" (needs sentence-transformers[onnx])
+    onnx_file_name: Optional[str] = None   # e.g. "onnx/model_qint8_avx512_vnni.onnx" for an int8 model
+    cache_size: int = DEFAULT_CACHE_SIZE
+
+    _model: Any = PrivateAttr(default=None)
+    _cache: "OrderedDict[str, float]" = PrivateAttr(default_factory=OrderedDict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def _get_model(self) -> Any:
+        """Load the cross-encoder model once, on first use (sentence-transformers / torch are imported here)."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+
+                    model_kwargs = {"file_name": self.onnx_file_name} if self.onnx_file_name else None
+                    self._model = CrossEncoder(
+                        self.model_name,
+                        max_length=self.max_length,
+                        device=self.device,
+                        backend=self.backend,
+                        model_kwargs=model_kwargs
+                    )
+        return self._model
+
+    @staticmethod
+    def _cache_key(query: str, document: Document) -> str:
+        """Key for one (question, document) pair."""
+        content = query + "\0" + document.page_content
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def score(self, query: str, documents: Sequence[Document]) -> np.ndarray:
+        """
+        Score how well each document answers the question.
+
+        Cached pairs are not scored again; the rest are scored in batches.
+
+        Args:
+            query: The question
+            documents: Candidate documents
+
+        Returns:
+            One score per document (higher is better)
+        """
+        keys = [self._cache_key(query, doc) for doc in documents]
+        scores = np.empty(len(documents), dtype=np.float32)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    scores[i] = cached
+
+        if missing:
+            pairs = [(query, documents[i].page_content) for i in missing]
+            new_scores = self._get_model().predict(
+                pairs,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+            scores[missing] = new_scores
+            with self._lock:
+                for i, value in zip(missing, new_scores):
+                    self._cache[keys[i]] = float(value)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return scores
+
+    def rerank(self, query: str, documents: Sequence[Document], top_n: Optional[int] = None) -> List[Document]:
+        """
+        Sort documents by cross-encoder score and keep the best ones.
+
+        Only the first `max_candidates` documents are scored.
+
+        Args:
+            query: The question
+            documents: Candidate documents, best first from the first-stage search
+            top_n: Number of documents to keep (default: self.top_n)
+
+        Returns:
+            The best documents, each with a "rerank_score" in its metadata
+        """
+        candidates = list(documents)[:self.max_candidates]
+        if not candidates:
+            return []
+        top_n = min(top_n or self.top_n, len(candidates))
+
+        scores = self.score(query, candidates)
+        best = np.argpartition(-scores, top_n - 1)[:top_n]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [
+            Document(
+                page_content=candidates[i].page_content,
+                metadata={**candidates[i].metadata, "rerank_score": float(scores[i])}
+            )
+            for i in best
+        ]
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None
+    ) -> Sequence[Document]:
+        """LangChain compressor interface: rerank and keep the best top_n documents."""
+        return self.rerank(query, documents)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Get the number of cached (question, document) scores."""
+        return {"size": len(self._cache), "max_size": self.cache_size}
+
+if __name__ == "__main__":
+    """
+    This part runs when you run this file directly.
+    It shows how to rerank documents and how long it takes.
+    """
+    import time
+
+    candidates = [
+        Document(page_content="RAG combines document retrieval with text generation.", metadata={"id": 1}),
+        Document(page_content="Vector databases store embeddings for similarity search.", metadata={"id": 2}),
+        Document(page_content="The weather today is sunny.", metadata={"id": 3}),
+    ] * 17  # About 50 candidates
+
+    reranker = CrossEncoderReranker(top_n=4)
+    for attempt in ("first call", "cached call"):
+        start = time.perf_counter()
+        docs = reranker.rerank("What is RAG?", candidates)
+        print(f"{attempt}: {(time.perf_counter() - start) * 1000:.1f} ms")
+    for doc in docs:
+        print(f"{doc.metadata['rerank_score']:.3f}  {doc.page_content}")
@@ -6,12 +6,14 @@ It uses different methods to search and rank documents.
 from typing import List, Dict, Any, Optional, Union
 from langchain_core.documents import Document
 from langchain_core.vectorstores import VectorStore
-from langchain_community.retrievers import BM25Retriever
-from langchain.retrievers import EnsembleRetriever
 from langchain.retrievers import ContextualCompressionRetriever
 from langchain.retrievers.document_compressors import LLMChainExtractor
 from langchain_openai import ChatOpenAI
 from langchain_community.embeddings import HuggingFaceEmbeddings
+from layers._04_retrieval.bm25_index import BM25IndexRetriever
+from layers._04_retrieval.hybrid_retriever import ParallelHybridRetriever, DEFAULT_FUSION
+from layers._04_retrieval.reranker import CrossEncoderReranker
+from layers._04_retrieval.parallel_compressor import ParallelLLMCompressor
 from dotenv import load_dotenv
 import os
 
@@ -36,6 +38,7 @@ class DocumentRetriever:
     - Find documents using keyword search (BM25)
     - Combine different search methods (hybrid search)
     - Filter and rank results
+    - Rerank candidates with a local cross-encoder
     """
     
     def __init__(
@@ -45,7 +48,10 @@ class DocumentRetriever:
         retriever_type: str = "vector",
         embeddings_model: Optional[HuggingFaceEmbeddings] = None,
         hybrid_weights: List[float] = DEFAULT_HYBRID_WEIGHTS,
-        k: int = DEFAULT_K
+        k: int = DEFAULT_K,
+        bm25_persist_directory: Optional[str] = None,
+        fusion_method: str = DEFAULT_FUSION,
+        reranker: Optional[CrossEncoderReranker] = None
     ):
         """
         Start the DocumentRetriever with optional vector store and documents.
@@ -57,17 +63,29 @@ class DocumentRetriever:
             embeddings_model: Optional HuggingFace embeddings model
             hybrid_weights: Weights for hybrid search [vector_weight, keyword_weight]
             k: Number of documents to return
+            bm25_persist_directory: Optional folder to save the BM25 index in and
+                load it from, so it is only rebuilt when the documents change
+            fusion_method: How hybrid search merges results: 'rrf' (rank only),
+                'minmax' or 'zscore' (normalized search scores)
+            reranker: Optional local reranker. The first search then returns
+                reranker.max_candidates documents and the reranker keeps the best k
             
         Example:
             >>> from langchain_community.vectorstores import FAISS
             >>> vector_store = FAISS.from_documents(documents, embeddings)
             >>> retriever = DocumentRetriever(vector_store=vector_store)
+            >>> reranked = DocumentRetriever(vector_store=vector_store, reranker=CrossEncoderReranker())
         """
         self.vector_store = vector_store
         self.documents = documents
         self.retriever_type = retriever_type
         self.hybrid_weights = hybrid_weights
         self.k = k
+        self.bm25_persist_directory = bm25_persist_directory
+        self.fusion_method = fusion_method
+        self.reranker = reranker
+        # With a reranker, the first search fetches more candidates than we return
+        self.candidate_k = max(k, reranker.max_candidates) if reranker else k
         self.embeddings_model = embeddings_model or DEFAULT_EMBEDDINGS
         self.retriever = None
         
@@ -78,34 +96,44 @@ class DocumentRetriever:
         """Create a vector retriever from the vector store."""
         return self.vector_store.as_retriever(
             search_type="similarity",
-            search_kwargs={"k": self.k}
+            search_kwargs={"k": self.candidate_k}
         )
     
-    def _create_bm25_retriever(self) -> BM25Retriever:
-        """Create a BM25 retriever from documents."""
-        retriever = BM25Retriever.from_documents(self.documents)
-        retriever.k = self.k
-        return retriever
+    def _create_bm25_retriever(self) -> BM25IndexRetriever:
+        """Create a BM25 retriever from documents (sparse matrix index)."""
+        return BM25IndexRetriever.from_documents(
+            self.documents,
+            k=self.candidate_k,
+            persist_directory=self.bm25_persist_directory
+        )
     
-    def _create_hybrid_retriever(self) -> EnsembleRetriever:
-        """Create a hybrid retriever combining vector and keyword search."""
+    def _create_hybrid_retriever(self) -> ParallelHybridRetriever:
+        """Create a hybrid retriever that runs vector and keyword search in parallel."""
         vector_retriever = self._create_vector_retriever()
         bm25_retriever = self._create_bm25_retriever()
         
-        return EnsembleRetriever(
+        return ParallelHybridRetriever(
             retrievers=[vector_retriever, bm25_retriever],
-            weights=self.hybrid_weights
+            weights=self.hybrid_weights,
+            fusion=self.fusion_method,
+            k=self.candidate_k
         )
     
     def _create_compression_retriever(self) -> ContextualCompressionRetriever:
-        """Create a compression retriever with LLM-based document compression."""
+        """Create a compression retriever that compresses documents with parallel LLM calls."""
         try:
+            deadline = float(os.getenv("COMPRESSION_DEADLINE", "5.0"))
             llm = ChatOpenAI(
                 model="gpt-3.5-turbo",
                 temperature=0.0,
-                api_key=os.getenv("OPENAI_API_KEY")
+                api_key=os.getenv("OPENAI_API_KEY"),
+                timeout=deadline,  # Calls that already started stop at the deadline too
+                max_retries=0
+            )
+            compressor = ParallelLLMCompressor(
+                base_compressor=LLMChainExtractor.from_llm(llm),
+                deadline=deadline
             )
-            compressor = LLMChainExtractor.from_llm(llm)
             vector_retriever = self._create_vector_retriever()
             
             return ContextualCompressionRetriever(
@@ -151,13 +179,14 @@ class DocumentRetriever:
             >>> docs = retriever.retrieve_documents("What is RAG?")
             >>> print(f"Found {len(docs)} relevant documents")
         """
-        if k is not None:
-            if self.retriever_type == "bm25":
-                self.retriever.k = k
-            elif hasattr(self.retriever, "search_kwargs"):
-                self.retriever.search_kwargs["k"] = k
-                
-        return self.retriever.get_relevant_documents(query)
+        if self.reranker:
+            # top_n is passed per call, so concurrent requests do not share it
+            candidates = self.retriever.get_relevant_documents(query)
+            return self.reranker.rerank(query, candidates, top_n=k or self.k)
+        
+        # k is passed per call instead of being set on the (shared) retriever
+        search_kwargs = {} if k is None else {"k": k}
+        return self.retriever.invoke(query, **search_kwargs)
     
     def get_relevant_documents(
         self,
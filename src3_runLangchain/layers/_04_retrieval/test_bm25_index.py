@@ -0,0 +1,102 @@
+"""
+Tests for the sparse-matrix BM25 index.
+
+Run from src3_runLangchain: python -m pytest layers/_04_retrieval
+"""
+
+import math
+from typing import List
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+pytest.importorskip("scipy")
+
+from layers._04_retrieval.bm25_index import BM25Index, corpus_version
+
+TEXTS = [
+    "vector search finds similar vectors",
+    "keyword search with bm25",
+    "bm25 bm25 ranks keyword matches",
+    "cooking recipes"
+]
+
+def split_words(text: str) -> List[str]:
+    """Plain whitespace tokenizer, so the expected values are easy to compute."""
+    return text.lower().split()
+
+def expected_score(query: str, doc_id: int, k1: float = 1.5, b: float = 0.75) -> float:
+    """BM25 computed term by term, the slow way."""
+    docs = [split_words(text) for text in TEXTS]
+    avg_length = sum(len(doc) for doc in docs) / len(docs)
+    score = 0.0
+    for term in split_words(query):
+        doc_freq = sum(term in doc for doc in docs)
+        if doc_freq == 0:
+            continue
+        idf = math.log(1 + (len(docs) - doc_freq + 0.5) / (doc_freq + 0.5))
+        tf = docs[doc_id].count(term)
+        score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(docs[doc_id]) / avg_length))
+    return score
+
+@pytest.fixture
+def index() -> BM25Index:
+    return BM25Index.from_texts(TEXTS, preprocess_func=split_words)
+
+def test_idf_values(index):
+    for term, doc_freq in (("bm25", 2), ("cooking", 1), ("search", 2)):
+        expected = math.log(1 + (len(TEXTS) - doc_freq + 0.5) / (doc_freq + 0.5))
+        assert index.idf[index.vocabulary[term]] == pytest.approx(expected, rel=1e-6)
+
+@pytest.mark.parametrize("query", ["bm25 keyword", "vector search", "search search", "unknown"])
+def test_scores_match_bm25_formula(index, query):
+    scores = index.get_scores(query)
+    expected = [expected_score(query, doc_id) for doc_id in range(len(TEXTS))]
+    np.testing.assert_allclose(scores, expected, rtol=1e-5)
+
+def test_search_returns_k_documents_best_first(index):
+    ids, scores = index.search("cooking", k=3)
+    # One match, then documents without the word in document order
+    assert ids.tolist() == [3, 0, 1]
+    assert scores[0] > 0
+    assert scores[1:].tolist() == [0.0, 0.0]
+
+    ids, scores = index.search("bm25 keyword", k=2)
+    assert ids.tolist() == [2, 1]
+    assert list(scores) == sorted(scores, reverse=True)
+
+    ids, _ = index.search("bm25", k=10)
+    assert len(ids) == len(TEXTS)
+
+def test_save_and_load_round_trip(index, tmp_path):
+    documents = [Document(page_content=text) for text in TEXTS]
+    version = corpus_version(documents)
+    index.save(str(tmp_path), version=version)
+
+    loaded = BM25Index.load(str(tmp_path), expected_version=version, preprocess_func=split_words)
+    assert loaded.vocabulary == index.vocabulary
+    assert loaded.version == version
+    for query in ("bm25 keyword", "vector search", "cooking"):
+        np.testing.assert_array_equal(loaded.get_scores(query), index.get_scores(query))
+        assert loaded.search(query, k=2)[0].tolist() == index.search(query, k=2)[0].tolist()
+
+def test_load_rejects_other_corpus_version(index, tmp_path):
+    documents = [Document(page_content=text) for text in TEXTS]
+    index.save(str(tmp_path), version=corpus_version(documents))
+
+    changed = documents[:-1] + [Document(page_content="baking bread")]
+    assert corpus_version(changed) != corpus_version(documents)
+    with pytest.raises(ValueError):
+        BM25Index.load(str(tmp_path), expected_version=corpus_version(changed), preprocess_func=split_words)
+
+    # load_or_build notices the change and rebuilds for the new documents
+    rebuilt = BM25Index.load_or_build(str(tmp_path), changed, preprocess_func=split_words)
+    assert rebuilt.version == corpus_version(changed)
+    assert "baking" in rebuilt.vocabulary
+    assert BM25Index.load(str(tmp_path), preprocess_func=split_words).version == corpus_version(changed)
+
+def test_load_rejects_other_preprocessing(index, tmp_path):
+    index.save(str(tmp_path))
+    with pytest.raises(ValueError):
+        BM25Index.load(str(tmp_path), preprocess_func=lambda text: text.split())
@@ -0,0 +1,47 @@
+"""
+Tests for the fusion engine.
+
+Run from src3_runLangchain: python -m pytest layers/_04_retrieval
+"""
+
+import numpy as np
+import pytest
+
+from layers._04_retrieval.fusion import FUSION_METHODS, fuse
+
+def scores_by_id(ids: np.ndarray, scores: np.ndarray) -> dict:
+    return dict(zip(ids.tolist(), scores.tolist()))
+
+@pytest.mark.parametrize("method", FUSION_METHODS)
+def test_extra_list_never_lowers_a_score(method):
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        first_ids = rng.choice(50, 10, replace=False)
+        second_ids = rng.choice(50, 10, replace=False)
+        first_scores = np.sort(rng.normal(size=10))[::-1]
+        second_scores = np.sort(rng.normal(size=10) * 5)[::-1]
+
+        alone = scores_by_id(*fuse([first_ids], [first_scores], method=method))
+        both = scores_by_id(*fuse(
+            [first_ids, second_ids],
+            [first_scores, second_scores],
+            method=method
+        ))
+        for doc_id, score in alone.items():
+            assert both[doc_id] >= score - 1e-12
+
+def test_zscore_result_below_the_mean_still_helps():
+    # Document 3 is returned by the second list below that list's mean
+    vector_ids, vector_scores = np.array([3, 1, 7, 5]), np.array([0.91, 0.88, 0.52, 0.50])
+    bm25_ids, bm25_scores = np.array([1, 9, 3]), np.array([12.0, 3.5, 1.0])
+
+    alone = scores_by_id(*fuse([vector_ids], [vector_scores], [0.7], method="zscore"))
+    both = scores_by_id(*fuse(
+        [vector_ids, bm25_ids],
+        [vector_scores, bm25_scores],
+        [0.7, 0.3],
+        method="zscore"
+    ))
+    assert both[3] >= alone[3]
+    # The lowest result of each list adds nothing, like a missing one
+    assert both[5] == pytest.approx(0.0)
@@ -0,0 +1,292 @@
+"""
+This module helps turn Vietnamese (and English) text into search terms.
+The same analyzer is used for keyword search (BM25) and for word-based
+metrics, so both see the words in the same way.
+"""
+
+from typing import List, Iterable, Optional, Tuple, Dict, Any
+from functools import lru_cache
+import hashlib
+import json
+import re
+import unicodedata
+
+# Default configuration
+DEFAULT_CACHE_SIZE = 10000
+COMPOUND_SEPARATOR = "_"
+
+# Common Vietnamese function words that carry little meaning for search
+VIETNAMESE_STOPWORDS = frozenset("""
+à ạ ơi nhé nhỉ nha vậy thế ừ
+và với hoặc hay nhưng mà thì là của cho để
+các những mọi mỗi một cái chiếc
+này kia đó ấy đây
+đã đang sẽ vẫn còn cũng đều rất quá lắm
+được bị bởi vì nên nếu khi lúc
+ở tại trong trên dưới ngoài từ đến tới
+ai gì nào sao đâu
+tôi bạn mình em anh chị
+""".split())
+
+# Common multi-syllable Vietnamese words (app support and legal questions),
+# one per line, kept together as a single term
+VIETNAMESE_COMPOUND_WORDS = frozenset(line.strip() for line in """
+tài khoản
+mật khẩu
+ứng dụng
+điện thoại
+số điện thoại
+đăng nhập
+đăng ký
+đăng xuất
+thanh toán
+chuyển khoản
+giao dịch
+ngân hàng
+ví điện tử
+thẻ tín dụng
+số dư
+hạn mức
+hoàn tiền
+khuyến mãi
+ưu đãi
+đơn hàng
+sản phẩm
+dịch vụ
+khách hàng
+người dùng
+thông tin
+cá nhân
+bảo mật
+quyền riêng tư
+xác thực
+xác nhận
+mã xác thực
+tin nhắn
+thông báo
+cài đặt
+cập nhật
+phiên bản
+tính năng
+hướng dẫn
+sử dụng
+hỗ trợ
+liên hệ
+tổng đài
+phản hồi
+khiếu nại
+tìm kiếm
+lịch sử
+dữ liệu
+hình ảnh
+nội dung
+tài liệu
+câu hỏi
+câu trả lời
+vấn đề
+thời gian
+địa chỉ
+trực tuyến
+mạng xã hội
+máy tính
+căn cước công dân
+chứng minh nhân dân
+giấy tờ
+hồ sơ
+thủ tục
+hợp đồng
+pháp luật
+pháp lý
+quy định
+nghị định
+thông tư
+điều khoản
+chính sách
+quyền lợi
+nghĩa vụ
+trách nhiệm
+vi phạm
+xử phạt
+hành chính
+doanh nghiệp
+công ty
+giấy phép
+cơ quan
+nhà nước
+lao động
+bảo hiểm
+xã hội
+thu nhập
+""".splitlines() if line.strip())
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def fold_diacritics(text: str) -> str:
+    """
+    Remove Vietnamese tone marks and accents.
+
+    Args:
+        text: The text to fold
+
+    Returns:
+        Text with only plain letters, e.g. "điện thoại" -> "dien thoai"
+    """
+    decomposed = unicodedata.normalize("NFD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.replace("đ", "d").replace("Đ", "D")
+
+class TextAnalyzer:
+    """
+    A configurable pipeline that turns text into terms.
+
+    This class can:
+    - Normalize unicode and letter case
+    - Optionally remove diacritics (so "tai khoan" matches "tài khoản")
+    - Join known compound words ("tài khoản" -> "tài_khoản")
+    - Remove stopwords
+    - Add syllable n-grams (e.g. bigrams) for phrase matching
+    - Cache results for repeated texts (e.g. the same question asked often)
+
+    An analyzer can be called like a function, so it can be passed anywhere
+    a `preprocess_func(text) -> List[str]` is expected.
+    """
+
+    def __init__(
+        self,
+        lowercase: bool = True,
+        fold_diacritics: bool = False,
+        stopwords: Optional[Iterable[str]] = VIETNAMESE_STOPWORDS,
+        compound_words: Optional[Iterable[str]] = VIETNAMESE_COMPOUND_WORDS,
+        ngram_range: Tuple[int, int] = (1, 1),
+        cache_size: int = DEFAULT_CACHE_SIZE
+    ):
+        """
+        Set up the analyzer.
+
+        Args:
+            lowercase: Convert text to lowercase
+            fold_diacritics: Remove tone marks and accents
+            stopwords: Words to drop (None or empty = keep all words)
+            compound_words: Multi-syllable words to keep together, e.g. ["tài khoản"]
+                (None or empty = split every syllable)
+            ngram_range: (min, max) syllable n-gram sizes; (1, 2) adds bigrams
+            cache_size: How many analyzed texts to remember (0 = no cache)
+
+        Example:
+            >>> analyzer = TextAnalyzer(compound_words=["tài khoản", "mật khẩu"])
+            >>> analyzer("Làm sao đổi mật khẩu tài khoản?")
+            ['làm', 'đổi', 'mật_khẩu', 'tài_khoản']
+        """
+        self.lowercase = lowercase
+        self.fold_diacritics = fold_diacritics
+        self.ngram_range = ngram_range
+
+        # Stopwords and compounds are matched before diacritics are folded,
+        # because folding merges different words ("tài" and "tại" both become "tai")
+        self.stopwords = frozenset(self._normalize(word) for word in (stopwords or ()))
+        self.compounds: Dict[str, int] = {}
+        self.max_compound_length = 1
+        for word in compound_words or ():
+            syllables = _TOKEN_PATTERN.findall(self._normalize(word))
+            if len(syllables) > 1:
+                self.compounds[COMPOUND_SEPARATOR.join(syllables)] = len(syllables)
+                self.max_compound_length = max(self.max_compound_length, len(syllables))
+
+        self._cached_analyze = lru_cache(maxsize=cache_size)(self._analyze) if cache_size else self._analyze
+
+    def config(self) -> Dict[str, Any]:
+        """Get the settings of this analyzer."""
+        return {
+            "lowercase": self.lowercase,
+            "fold_diacritics": self.fold_diacritics,
+            "stopwords": sorted(self.stopwords),
+            "compound_words": sorted(self.compounds),
+            "ngram_range": list(self.ngram_range)
+        }
+
+    @property
+    def signature(self) -> str:
+        """A short hash of the settings, used to check saved indexes."""
+        content = json.dumps(self.config(), sort_keys=True, ensure_ascii=False)
+        return "text_analyzer:" + hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+    def _normalize(self, text: str) -> str:
+        """Normalize unicode and letter case."""
+        text = unicodedata.normalize("NFC", text)
+        if self.lowercase:
+            text = text.casefold()
+        return text
+
+    def _join_compounds(self, syllables: List[str]) -> List[str]:
+        """Join known compound words, longest match first."""
+        if not self.compounds:
+            return syllables
+        tokens = []
+        i = 0
+        while i < len(syllables):
+            for length in range(min(self.max_compound_length, len(syllables) - i), 1, -1):
+                candidate = COMPOUND_SEPARATOR.join(syllables[i:i + length])
+                if candidate in self.compounds:
+                    tokens.append(candidate)
+                    i += length
+                    break
+            else:
+                tokens.append(syllables[i])
+                i += 1
+        return tokens
+
+    def _analyze(self, text: str) -> Tuple[str, ...]:
+        """Run the full pipeline (results are cached by the caller)."""
+        tokens = self._join_compounds(_TOKEN_PATTERN.findall(self._normalize(text)))
+        if self.stopwords:
+            tokens = [token for token in tokens if token not in self.stopwords]
+        if self.fold_diacritics:
+            tokens = [fold_diacritics(token) for token in tokens]
+
+        min_n, max_n = self.ngram_range
+        if (min_n, max_n) == (1, 1):
+            return tuple(tokens)
+        terms = []
+        for n in range(min_n, max_n + 1):
+            terms.extend(
+                COMPOUND_SEPARATOR.join(tokens[i:i + n])
+                for i in range(len(tokens) - n + 1)
+            )
+        return tuple(terms)
+
+    def analyze(self, text: str) -> List[str]:
+        """
+        Turn text into a list of terms.
+
+        Args:
+            text: The text to analyze
+
+        Returns:
+            List of terms
+
+        Example:
+            >>> TextAnalyzer().analyze("Tôi muốn đổi mật khẩu")
+            ['muốn', 'đổi', 'mật_khẩu']
+        """
+        return list(self._cached_analyze(text))
+
+    def __call__(self, text: str) -> List[str]:
+        return self.analyze(text)
+
+# Shared analyzers: both join the default compound words; keyword search
+# drops stopwords, metrics (BLEU/ROUGE/F1) keep every word
+DEFAULT_ANALYZER = TextAnalyzer(compound_words=VIETNAMESE_COMPOUND_WORDS)
+METRIC_ANALYZER = TextAnalyzer(stopwords=None, compound_words=VIETNAMESE_COMPOUND_WORDS)
+
+if __name__ == "__main__":
+    """
+    This part runs when you run this file directly.
+    It shows the terms produced by different analyzer settings.
+    """
+    text = "Làm sao để đổi mật khẩu tài khoản trên ứng dụng?"
+
+    print(f"Default:   {DEFAULT_ANALYZER(text)}")
+    print(f"Metrics:   {METRIC_ANALYZER(text)}")
+    print(f"Folded:    {TextAnalyzer(fold_diacritics=True)(text)}")
+    print(f"Syllables: {TextAnalyzer(compound_words=None)(text)}")
+    print(f"Bigrams:   {TextAnalyzer(compound_words=None, ngram_range=(1, 2))(text)}")
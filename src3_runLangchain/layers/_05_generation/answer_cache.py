@@ -0,0 +1,213 @@
+"""
+This module helps reuse answers for questions we have already answered.
+Questions are compared by meaning (cosine similarity of their vectors),
+so paraphrases of the same question can share one answer.
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from layers._03_embedding.index_sync import get_document_keys
+import numpy as np
+import threading
+import time
+
+# Default configuration
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_ENTRIES = 1000
+
+class SemanticAnswerCache:
+    """
+    A cache that finds earlier answers for questions with the same meaning.
+
+    This class can:
+    - Find a cached answer whose question is similar enough (cosine similarity)
+    - Only reuse answers built from the same retrieved documents
+    - Only reuse answers built with the same prompt settings (prompt key)
+    - Forget answers after a time limit (TTL)
+    - Remove the least recently used answers when full
+    - Count hits and misses
+    """
+
+    def __init__(
+        self,
+        embeddings_model: Embeddings,
+        similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        match_documents: bool = True
+    ):
+        """
+        Start the cache.
+
+        Args:
+            embeddings_model: Model used to convert questions into vectors
+            similarity_threshold: Minimum cosine similarity to reuse an answer
+            ttl_seconds: How long an answer stays valid (None = forever)
+            max_entries: Maximum number of answers to keep
+            match_documents: Only reuse answers built from the same document ids
+
+        Example:
+            >>> from langchain_community.embeddings import HuggingFaceEmbeddings
+            >>> cache = SemanticAnswerCache(HuggingFaceEmbeddings(), similarity_threshold=0.9)
+            >>> generator = AnswerGenerator(answer_cache=cache)
+        """
+        self.embeddings_model = embeddings_model
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.match_documents = match_documents
+
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None  # One normalized question vector per row
+        self._entries: List[Dict[str, Any]] = []    # Answer data, same order as the rows
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def embed(self, question: str) -> np.ndarray:
+        """
+        Convert a question into a normalized vector.
+
+        Args:
+            question: The question to convert
+
+        Returns:
+            A unit-length float32 vector
+        """
+        vector = np.asarray(self.embeddings_model.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _document_ids(self, documents: List[Document]) -> Tuple[str, ...]:
+        """Get the ids of the documents an answer was built from."""
+        return tuple(sorted(get_document_keys(documents)))
+
+    def _remove(self, row: int) -> None:
+        """Remove one entry by moving the last row into its place."""
+        last = len(self._entries) - 1
+        if row != last:
+            self._vectors[row] = self._vectors[last]
+            self._entries[row] = self._entries[last]
+        self._entries.pop()
+        self._vectors = self._vectors[:last]
+
+    def _remove_expired(self, now: float) -> None:
+        """Remove all answers older than the TTL."""
+        if self.ttl_seconds is None:
+            return
+        for row in range(len(self._entries) - 1, -1, -1):
+            if now - self._entries[row]["created_at"] > self.ttl_seconds:
+                self._remove(row)
+
+    def lookup(
+        self,
+        question: str,
+        documents: List[Document],
+        vector: Optional[np.ndarray] = None,
+        prompt_key: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Find a cached answer for a question.
+
+        Args:
+            question: The question to answer
+            documents: The documents retrieved for the question
+            vector: The question vector, if already computed with embed()
+            prompt_key: Hash of the prompt settings (e.g. format_context); only
+                answers stored with the same key are reused
+
+        Returns:
+            The cached answer, or None if there is no good match
+
+        Example:
+            >>> answer = cache.lookup("What is RAG?", documents)
+            >>> print(answer or "Not cached yet")
+        """
+        if vector is None:
+            vector = self.embed(question)
+        document_ids = self._document_ids(documents) if self.match_documents else None
+        now = time.time()
+
+        with self._lock:
+            self._remove_expired(now)
+            if self._entries:
+                similarities = self._vectors @ vector
+                candidates = np.flatnonzero(similarities >= self.similarity_threshold)
+                # Try the most similar questions first
+                for row in candidates[np.argsort(-similarities[candidates])]:
+                    entry = self._entries[row]
+                    if entry["prompt_key"] != prompt_key:
+                        continue
+                    if document_ids is None or entry["document_ids"] == document_ids:
+                        entry["last_used"] = now
+                        self.hits += 1
+                        return entry["answer"]
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        question: str,
+        documents: List[Document],
+        answer: str,
+        vector: Optional[np.ndarray] = None,
+        prompt_key: Optional[str] = None
+    ) -> None:
+        """
+        Save an answer in the cache.
+
+        Args:
+            question: The question that was answered
+            documents: The documents the answer was built from
+            answer: The generated answer
+            vector: The question vector, if already computed with embed()
+            prompt_key: Hash of the prompt settings the answer was built with
+        """
+        if vector is None:
+            vector = self.embed(question)
+        now = time.time()
+        entry = {
+            "question": question,
+            "answer": answer,
+            "document_ids": self._document_ids(documents),
+            "prompt_key": prompt_key,
+            "created_at": now,
+            "last_used": now
+        }
+
+        with self._lock:
+            self._remove_expired(now)
+            while self._entries and len(self._entries) >= self.max_entries:
+                oldest = min(range(len(self._entries)), key=lambda row: self._entries[row]["last_used"])
+                self._remove(oldest)
+                self.evictions += 1
+
+            if self._vectors is None or len(self._vectors) == 0:
+                self._vectors = vector[np.newaxis, :]
+            else:
+                self._vectors = np.vstack([self._vectors, vector])
+            self._entries.append(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit rate and size.
+
+        Returns:
+            Dictionary with hits, misses, hit rate, evictions and size
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "size": len(self._entries)
+        }
+
+    def clear(self) -> None:
+        """Remove all cached answers."""
+        with self._lock:
+            self._vectors = None
+            self._entries = []
@@ -3,12 +3,26 @@ This module helps generate answers using AI models.
 It combines retrieved documents with user questions to create good answers.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator
 from langchain_core.documents import Document
-from openai import OpenAI
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    RateLimitError,
+    APITimeoutError,
+    APIConnectionError,
+    InternalServerError
+)
 import httpx
 from dotenv import load_dotenv
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import random
+import time
 import os
+from layers._05_generation.answer_cache import SemanticAnswerCache
 
 # Load environment variables
 load_dotenv()
@@ -19,6 +33,12 @@ If you don't know the answer, say you don't know.
 Use only the information from the context to answer. 
 Keep your answers clear and simple."""
 
+# Retry configuration for async and batched generation
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_RETRY_BACKOFF = 1.0  # Base delay in seconds (doubled after each attempt)
+DEFAULT_MAX_CONCURRENCY = 8
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
 class AnswerGenerator:
     """
     A class that helps generate answers using OpenAI models.
@@ -34,7 +54,8 @@ class AnswerGenerator:
         model_name: str = "gpt-4o-mini",
         temperature: float = 0,
         max_tokens: int = 4096,
-        system_prompt: str = DEFAULT_SYSTEM_PROMPT
+        system_prompt: str = DEFAULT_SYSTEM_PROMPT,
+        answer_cache: Optional[SemanticAnswerCache] = None
     ):
         """
         Start the AnswerGenerator with optional model settings.
@@ -44,14 +65,15 @@ class AnswerGenerator:
             temperature: How creative the answers should be (0.0 to 1.0)
             max_tokens: Maximum number of tokens in the response
             system_prompt: System prompt to guide the model's behavior
+            answer_cache: Optional cache that reuses answers for similar questions
             
         Example:
             >>> generator = AnswerGenerator(model_name="gpt-4")
             >>> answer = generator.generate_answer("What is RAG?", documents)
         """
-        # Initialize OpenAI client with proxy support if needed
+        # Initialize OpenAI clients (sync and async) with proxy support if needed
         if os.getenv("OPENAI_PROXY"):
-            http_client = httpx.Client(proxies=os.getenv("OPENAI_PROXY"))
+            http_client = httpx.Client(proxy=os.getenv("OPENAI_PROXY"))
             self.client = OpenAI(
                 http_client=http_client,
                 api_key=os.getenv("OPENAI_API_KEY")
@@ -60,11 +82,24 @@ class AnswerGenerator:
             self.client = OpenAI(
                 api_key=os.getenv("OPENAI_API_KEY")
             )
+        self.async_client = self._create_async_client()
             
         self.model_name = model_name
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.system_prompt = system_prompt
+        self.answer_cache = answer_cache
+    
+    def _create_async_client(self) -> AsyncOpenAI:
+        """Create an AsyncOpenAI client with proxy support if needed."""
+        if os.getenv("OPENAI_PROXY"):
+            return AsyncOpenAI(
+                http_client=httpx.AsyncClient(proxy=os.getenv("OPENAI_PROXY")),
+                api_key=os.getenv("OPENAI_API_KEY")
+            )
+        return AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY")
+        )
     
     def format_context(self, documents: List[Document]) -> str:
         """
@@ -82,6 +117,51 @@ class AnswerGenerator:
         """
         return "\n\n".join(doc.page_content for doc in documents)
     
+    def _build_messages(
+        self,
+        question: str,
+        documents: List[Document],
+        format_context: bool = True
+    ) -> List[Dict[str, str]]:
+        """Create the chat messages (system prompt + context and question)."""
+        if format_context:
+            context = self.format_context(documents)
+        else:
+            context = documents[0].page_content if documents else ""
+            
+        # Create the prompt
+        prompt = f"""Context: {context}
+
+Question: {question}
+
+Answer:"""
+        
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _prompt_key(self, format_context: bool) -> str:
+        """Hash of everything besides the question and documents that shapes the answer."""
+        settings = [self.model_name, self.temperature, self.max_tokens, self.system_prompt, format_context]
+        return hashlib.sha1(json.dumps(settings).encode("utf-8")).hexdigest()
+    
+    def _make_stream_stats(
+        self,
+        start_time: float,
+        first_token_time: Optional[float],
+        tokens: int
+    ) -> Dict[str, Any]:
+        """Measure time-to-first-token and tokens/sec for a finished stream."""
+        end_time = time.perf_counter()
+        generation_time = end_time - (first_token_time or end_time)
+        return {
+            "time_to_first_token": (first_token_time or end_time) - start_time,
+            "total_time": end_time - start_time,
+            "tokens": tokens,
+            "tokens_per_second": tokens / generation_time if generation_time > 0 else 0.0
+        }
+    
     def generate_answer(
         self,
         question: str,
@@ -103,30 +183,370 @@ class AnswerGenerator:
             >>> answer = generator.generate_answer("What is RAG?", documents)
             >>> print(f"Generated answer: {answer}")
         """
-        if format_context:
-            context = self.format_context(documents)
-        else:
-            context = documents[0].page_content if documents else ""
-            
-        # Create the prompt
-        prompt = f"""Context: {context}
-
-Question: {question}
-
-Answer:"""
+        # Reuse an earlier answer for the same (or a paraphrased) question
+        if self.answer_cache is not None:
+            question_vector = self.answer_cache.embed(question)
+            cached_answer = self.answer_cache.lookup(
+                question, documents, vector=question_vector, prompt_key=self._prompt_key(format_context)
+            )
+            if cached_answer is not None:
+                return cached_answer
         
         # Call OpenAI API directly
         response = self.client.chat.completions.create(
             model=self.model_name,
-            messages=[
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": prompt}
-            ],
+            messages=self._build_messages(question, documents, format_context),
             temperature=self.temperature,
             max_tokens=self.max_tokens
         )
         
-        return response.choices[0].message.content
+        answer = response.choices[0].message.content
+        
+        if self.answer_cache is not None:
+            self.answer_cache.store(
+                question, documents, answer, vector=question_vector,
+                prompt_key=self._prompt_key(format_context)
+            )
+        
+        return answer
+    
+    def stream_answer(
+        self,
+        question: str,
+        documents: List[Document],
+        format_context: bool = True,
+        stats: Optional[Dict[str, Any]] = None
+    ) -> Iterator[str]:
+        """
+        Generate an answer and yield its tokens as they arrive.
+        
+        When the stream ends, `stats` (if given) holds the time-to-first-token,
+        total time, token count and tokens/sec of this answer. Each call gets
+        its own dict, so concurrent streams do not mix up their numbers.
+        
+        Args:
+            question: The question to answer
+            documents: List of relevant documents
+            format_context: Whether to format the context (default: True)
+            stats: Optional dict that is filled with the stream stats
+            
+        Yields:
+            Pieces of the answer text
+            
+        Example:
+            >>> stats = {}
+            >>> for token in generator.stream_answer("What is RAG?", documents, stats=stats):
+            >>>     print(token, end="", flush=True)
+            >>> print(stats)
+        """
+        start_time = time.perf_counter()
+        
+        if self.answer_cache is not None:
+            question_vector = self.answer_cache.embed(question)
+            cached_answer = self.answer_cache.lookup(
+                question, documents, vector=question_vector, prompt_key=self._prompt_key(format_context)
+            )
+            if cached_answer is not None:
+                first_token_time = time.perf_counter()
+                yield cached_answer
+                if stats is not None:
+                    stats.update(self._make_stream_stats(start_time, first_token_time, 1))
+                return
+        
+        stream = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=self._build_messages(question, documents, format_context),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        
+        first_token_time = None
+        parts = []
+        completion_tokens = None
+        for chunk in stream:
+            if chunk.usage is not None:
+                completion_tokens = chunk.usage.completion_tokens
+            if chunk.choices and chunk.choices[0].delta.content:
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+        
+        if stats is not None:
+            stats.update(self._make_stream_stats(
+                start_time, first_token_time, completion_tokens or len(parts)
+            ))
+        
+        if self.answer_cache is not None:
+            self.answer_cache.store(
+                question, documents, "".join(parts), vector=question_vector,
+                prompt_key=self._prompt_key(format_context)
+            )
+    
+    async def astream_answer(
+        self,
+        question: str,
+        documents: List[Document],
+        format_context: bool = True,
+        stats: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate an answer and yield its tokens as they arrive (async version).
+        
+        When the stream ends, `stats` (if given) holds the time-to-first-token,
+        total time, token count and tokens/sec of this answer. Each call gets
+        its own dict, so concurrent streams do not mix up their numbers.
+        
+        Args:
+            question: The question to answer
+            documents: List of relevant documents
+            format_context: Whether to format the context (default: True)
+            stats: Optional dict that is filled with the stream stats
+            
+        Yields:
+            Pieces of the answer text
+            
+        Example:
+            >>> stats = {}
+            >>> async for token in generator.astream_answer("What is RAG?", documents, stats=stats):
+            >>>     print(token, end="", flush=True)
+        """
+        start_time = time.perf_counter()
+        
+        if self.answer_cache is not None:
+            # Embedding may run a local model, so keep it off the event loop
+            question_vector = await asyncio.to_thread(self.answer_cache.embed, question)
+            cached_answer = self.answer_cache.lookup(
+                question, documents, vector=question_vector, prompt_key=self._prompt_key(format_context)
+            )
+            if cached_answer is not None:
+                first_token_time = time.perf_counter()
+                yield cached_answer
+                if stats is not None:
+                    stats.update(self._make_stream_stats(start_time, first_token_time, 1))
+                return
+        
+        stream = await self.async_client.chat.completions.create(
+            model=self.model_name,
+            messages=self._build_messages(question, documents, format_context),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        
+        first_token_time = None
+        parts = []
+        completion_tokens = None
+        async for chunk in stream:
+            if chunk.usage is not None:
+                completion_tokens = chunk.usage.completion_tokens
+            if chunk.choices and chunk.choices[0].delta.content:
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+        
+        if stats is not None:
+            stats.update(self._make_stream_stats(
+                start_time, first_token_time, completion_tokens or len(parts)
+            ))
+        
+        if self.answer_cache is not None:
+            self.answer_cache.store(
+                question, documents, "".join(parts), vector=question_vector,
+                prompt_key=self._prompt_key(format_context)
+            )
+    
+    async def _acreate_with_retry(
+        self,
+        client: AsyncOpenAI,
+        messages: List[Dict[str, str]],
+        max_retries: int
+    ):
+        """Call the chat API, retrying rate limits and transient errors with backoff."""
+        # We retry ourselves, so turn off the client's built-in retries
+        client = client.with_options(max_retries=0)
+        for attempt in range(max_retries + 1):
+            try:
+                return await client.chat.completions.create(
+                    model=self.model_name,
+                    messages=messages,
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens
+                )
+            except RETRYABLE_ERRORS as e:
+                if attempt == max_retries:
+                    raise
+                # Respect the server's Retry-After header on rate limits
+                retry_after = None
+                response = getattr(e, "response", None)
+                if response is not None:
+                    try:
+                        retry_after = float(response.headers.get("retry-after"))
+                    except (TypeError, ValueError):
+                        retry_after = None
+                delay = retry_after or DEFAULT_RETRY_BACKOFF * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+    
+    async def _agenerate(
+        self,
+        client: AsyncOpenAI,
+        question: str,
+        documents: List[Document],
+        format_context: bool,
+        max_retries: int
+    ) -> str:
+        """Generate one answer with the given async client."""
+        if self.answer_cache is not None:
+            # Embedding may run a local model, so keep it off the event loop
+            question_vector = await asyncio.to_thread(self.answer_cache.embed, question)
+            cached_answer = self.answer_cache.lookup(
+                question, documents, vector=question_vector, prompt_key=self._prompt_key(format_context)
+            )
+            if cached_answer is not None:
+                return cached_answer
+        
+        response = await self._acreate_with_retry(
+            client,
+            self._build_messages(question, documents, format_context),
+            max_retries
+        )
+        answer = response.choices[0].message.content
+        
+        if self.answer_cache is not None:
+            self.answer_cache.store(
+                question, documents, answer, vector=question_vector,
+                prompt_key=self._prompt_key(format_context)
+            )
+        
+        return answer
+    
+    async def agenerate_answer(
+        self,
+        question: str,
+        documents: List[Document],
+        format_context: bool = True,
+        max_retries: int = DEFAULT_MAX_RETRIES
+    ) -> str:
+        """
+        Generate an answer using the OpenAI model (async version).
+        
+        Rate limits and transient errors are retried with exponential backoff.
+        
+        Args:
+            question: The question to answer
+            documents: List of relevant documents
+            format_context: Whether to format the context (default: True)
+            max_retries: How many times to retry a failed call
+            
+        Returns:
+            The generated answer
+            
+        Example:
+            >>> answer = await generator.agenerate_answer("What is RAG?", documents)
+        """
+        return await self._agenerate(
+            self.async_client, question, documents, format_context, max_retries
+        )
+    
+    async def agenerate_batch(
+        self,
+        questions: List[str],
+        documents_list: List[List[Document]],
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        return_exceptions: bool = False,
+        client: Optional[AsyncOpenAI] = None,
+        format_context: bool = True
+    ) -> List[Any]:
+        """
+        Generate answers for many questions at the same time (async version).
+        
+        Args:
+            questions: The questions to answer
+            documents_list: Relevant documents for each question
+            max_concurrency: Maximum number of requests running at once
+            max_retries: How many times to retry a failed call
+            return_exceptions: Put errors in the results instead of raising
+            client: Async client to use (default: the generator's own client)
+            format_context: Whether to format the context (default: True)
+            
+        Returns:
+            One answer for each question, in the same order
+        """
+        if len(questions) != len(documents_list):
+            raise ValueError("questions and documents_list must have the same length")
+        
+        client = client or self.async_client
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def generate_one(question: str, documents: List[Document]) -> str:
+            async with semaphore:
+                return await self._agenerate(client, question, documents, format_context, max_retries)
+        
+        return await asyncio.gather(
+            *(generate_one(q, docs) for q, docs in zip(questions, documents_list)),
+            return_exceptions=return_exceptions
+        )
+    
+    def generate_batch(
+        self,
+        questions: List[str],
+        documents_list: List[List[Document]],
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        return_exceptions: bool = False,
+        format_context: bool = True
+    ) -> List[Any]:
+        """
+        Generate answers for many questions at the same time.
+        
+        Requests are sent concurrently (at most max_concurrency at once),
+        rate limits are retried with backoff, and results keep the input order.
+        Called from a running event loop (FastAPI, Jupyter), the batch runs in a
+        worker thread and blocks the loop until it is done; use agenerate_batch there.
+        
+        Args:
+            questions: The questions to answer
+            documents_list: Relevant documents for each question
+            max_concurrency: Maximum number of requests running at once
+            max_retries: How many times to retry a failed call
+            return_exceptions: Put errors in the results instead of raising
+            format_context: Whether to format the context (default: True)
+            
+        Returns:
+            One answer for each question, in the same order
+            
+        Example:
+            >>> answers = generator.generate_batch(questions, documents_list, max_concurrency=8)
+            >>> print(f"Generated {len(answers)} answers")
+        """
+        async def run() -> List[Any]:
+            # A fresh client is bound to this event loop and closed afterwards
+            client = self._create_async_client()
+            try:
+                return await self.agenerate_batch(
+                    questions,
+                    documents_list,
+                    max_concurrency=max_concurrency,
+                    max_retries=max_retries,
+                    return_exceptions=return_exceptions,
+                    client=client,
+                    format_context=format_context
+                )
+            finally:
+                await client.close()
+        
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(run())
+        # asyncio.run() cannot start inside a running loop, so use a thread with its own loop
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, run()).result()
     
     def generate_answer_with_sources(
         self,
@@ -198,6 +618,26 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"Source generation test failed: {e}")
     
+    # Test streaming answer generation
+    print("\nTesting streaming answer generation...")
+    try:
+        stream_stats = {}
+        for token in answer_gen.stream_answer("What is RAG?", sample_docs, stats=stream_stats):
+            print(token, end="", flush=True)
+        print(f"\nStream stats: {stream_stats}")
+    except Exception as e:
+        print(f"Streaming test failed: {e}")
+    
+    # Test batched answer generation
+    print("\nTesting batched answer generation...")
+    try:
+        questions = ["What is RAG?", "Why does RAG help language models?"]
+        answers = answer_gen.generate_batch(questions, [sample_docs] * len(questions), max_concurrency=2)
+        for question, answer in zip(questions, answers):
+            print(f"{question} -> {answer}")
+    except Exception as e:
+        print(f"Batch generation test failed: {e}")
+    
     # Test with different model
     print("\nTesting with different model...")
     try:
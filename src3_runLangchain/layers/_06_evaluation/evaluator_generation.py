@@ -16,6 +16,7 @@ import re
 import json
 from collections import Counter
 import numpy as np
+from layers._04_retrieval.text_analyzer import TextAnalyzer, METRIC_ANALYZER
 
 # Load environment variables
 load_dotenv()
@@ -69,7 +70,8 @@ class GenerationEvaluator:
         self,
         model_name: str = "gpt-4o-mini",
         temperature: float = 0.0,
-        evaluation_prompt: str = DEFAULT_GENERATION_PROMPT
+        evaluation_prompt: str = DEFAULT_GENERATION_PROMPT,
+        analyzer: Optional[TextAnalyzer] = None
     ):
         """
         Khởi tạo GenerationEvaluator.
@@ -78,7 +80,9 @@ class GenerationEvaluator:
             model_name: Tên model AI sử dụng
             temperature: Độ sáng tạo (0.0 - 1.0)
             evaluation_prompt: Prompt hướng dẫn đánh giá
+            analyzer: Bộ tách từ cho BLEU/Rouge-L/F1 (mặc định: giữ mọi từ, không bỏ stopword)
         """
+        self.analyzer = analyzer or METRIC_ANALYZER
         self.llm = ChatOpenAI(
             model_name=model_name,
             temperature=temperature
@@ -227,14 +231,8 @@ class GenerationEvaluator:
         return self._calculate_reference_metrics(generated_answer, context)
     
     def _tokenize(self, text: str) -> List[str]:
-        """Tokenize text thành các từ."""
-        # Xử lý tiếng Việt và tiếng Anh
-        text = text.lower()
-        # Loại bỏ dấu câu và ký tự đặc biệt
-        text = re.sub(r'[^\w\s]', ' ', text)
-        # Tách từ
-        tokens = text.split()
-        return [token for token in tokens if token.strip()]
+        """Tokenize text thành các từ (dùng chung bộ phân tích với BM25)."""
+        return self.analyzer(text)
     
     def _get_ngrams(self, tokens: List[str], n: int) -> List[tuple]:
         """Tạo n-grams từ danh sách tokens."""
@@ -122,6 +122,7 @@ def main():
     embedding_model = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
     top_k = int(os.getenv("TOP_K", "3"))
     vector_weight = float(os.getenv("VECTOR_WEIGHT", "0.6"))
+    retriever_type = os.getenv("RETRIEVER_TYPE", "hybrid")
     
     # Verify API key is set
     if not api_key:
@@ -148,7 +149,7 @@ def main():
     retriever = DocumentRetriever(
         vector_store=vectordb,
         documents=processed_documents,
-        retriever_type="hybrid",
+        retriever_type=retriever_type,
         hybrid_weights=[vector_weight, 1 - vector_weight],
         k=top_k
     )
@@ -4,15 +4,18 @@ from dotenv import load_dotenv
 from sklearn.metrics import accuracy_score, precision_recall_fscore_support
 import time
 from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import re
 from pydantic import Field, BaseModel
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from layers._01_data_ingestion.loader import load_faq_data, preprocess_faq_data
 from layers._03_embedding.embedder import DocumentEmbedder
 from layers._04_retrieval.retriever import DocumentRetriever
 from layers._05_generation.generator import AnswerGenerator
+from benchmark_sink import ResultSink, export_records, make_query_key, load_checkpoint
+from benchmark_stats import StageTimer, TimedEmbeddings, STAGES, summarize_latencies, build_histogram, write_summary
 from system.baselineRAG.MiniProj_RAG7_LangChain.src3_runLangchain.layers._06_evaluation.evaluator_ckp import RAGEvaluator
 
 # Cài đặt thư viện cần thiết
@@ -55,6 +58,15 @@ class BenchmarkResult:
     evaluation_feedback: str
     relevant_docs: List[Document]
     processing_time: float
+    error: bool = False
+    stage_times: Dict[str, float] = field(default_factory=dict)  # Thời gian từng bước (giây)
+
+# Các cột trong file kết quả Excel
+RESULT_COLUMNS = [
+    "query", "expected_answer", "actual_answer",
+    "response_time", "source_id", "timestamp",
+    "evaluation_score", "evaluation_feedback"
+] + [f"{stage}_time" for stage in STAGES]
 
 def load_benchmark_data(file_path: str) -> List[Dict[str, Any]]:
     """Đọc dữ liệu benchmark từ file JSON"""
@@ -67,108 +79,195 @@ def create_vectordb(documents: List[Document], persist_directory: str = "data/ch
     vectordb = FAISS.from_documents(documents=documents, embedding=embeddings)
     return vectordb
 
-def run_benchmark(
+def process_benchmark_item(
+    item: Dict[str, Any],
     retriever: DocumentRetriever,
     generator: AnswerGenerator,
-    evaluator: RAGEvaluator,
-    benchmark_data: List[Dict[str, Any]]
-) -> List[BenchmarkResult]:
-    """Chạy benchmark và trả về kết quả"""
-    results = []
-    timestamp = time.strftime("%Y%m%d_%H%M%S")
-    output_file = f"benchmark_results_{timestamp}.xlsx"
+    evaluator: RAGEvaluator
+) -> BenchmarkResult:
+    """Chạy retrieval, generation và evaluation cho một câu hỏi benchmark"""
+    query = item["query"]
+    expected_answer = item["expected_answer"]
     
-    # Tạo DataFrame rỗng
-    df = pd.DataFrame(columns=[
-        "query", "expected_answer", "actual_answer", 
-        "response_time", "source_id", "timestamp",
-        "evaluation_score", "evaluation_feedback"
-    ])
+    # Đo thời gian từng bước (embedding được đo bên trong retrieval qua TimedEmbeddings)
+    timer = StageTimer()
     
-    for i, item in enumerate(benchmark_data, 1):
-        query = item["query"]
-        expected_answer = item["expected_answer"]
+    try:
+        # Đo thời gian xử lý
+        start_time = time.perf_counter()
         
-        try:
-            # Đo thời gian xử lý
-            start_time = time.time()
-            
+        with timer.activate():
             # Tìm kiếm tài liệu liên quan
-            relevant_docs = retriever.retrieve_documents(query)
+            with timer.stage("retrieval"):
+                relevant_docs = retriever.retrieve_documents(query)
             
             # Tạo câu trả lời
-            actual_answer = generator.generate_answer(query, relevant_docs)
+            with timer.stage("generation"):
+                actual_answer = generator.generate_answer(query, relevant_docs)
             
             # Đánh giá câu trả lời
-            evaluation = evaluator.evaluate_answer(query, actual_answer, relevant_docs)
-            
-            # Tính thời gian xử lý
-            processing_time = time.time() - start_time
-            
-            # Lưu kết quả
-            result = BenchmarkResult(
-                query=query,
-                expected_answer=expected_answer,
-                actual_answer=actual_answer,
-                evaluation_score=evaluation["score"],
-                evaluation_feedback=evaluation["feedback"],
-                relevant_docs=relevant_docs,
-                processing_time=processing_time
-            )
-            results.append(result)
+            with timer.stage("evaluation"):
+                evaluation = evaluator.evaluate_answer(query, actual_answer, relevant_docs)
+        
+        # Tính thời gian xử lý
+        processing_time = time.perf_counter() - start_time
+        
+        return BenchmarkResult(
+            query=query,
+            expected_answer=expected_answer,
+            actual_answer=actual_answer,
+            evaluation_score=evaluation["score"],
+            evaluation_feedback=evaluation["feedback"],
+            relevant_docs=relevant_docs,
+            processing_time=processing_time,
+            stage_times=timer.timings
+        )
+        
+    except Exception as e:
+        print(f"\nLỗi khi xử lý câu hỏi: {query}")
+        print(f"Lỗi: {str(e)}")
+        # Lưu kết quả lỗi
+        return BenchmarkResult(
+            query=query,
+            expected_answer=expected_answer,
+            actual_answer="Lỗi khi xử lý câu hỏi",
+            evaluation_score=0,
+            evaluation_feedback=f"Lỗi: {str(e)}",
+            relevant_docs=[],
+            processing_time=0,
+            error=True
+        )
+
+def result_from_record(record: Dict[str, Any]) -> BenchmarkResult:
+    """Dựng lại BenchmarkResult từ bản ghi checkpoint (không có tài liệu liên quan)"""
+    return BenchmarkResult(
+        query=record["query"],
+        expected_answer=record["expected_answer"],
+        actual_answer=record["actual_answer"],
+        evaluation_score=record["evaluation_score"],
+        evaluation_feedback=record["evaluation_feedback"],
+        relevant_docs=[],
+        processing_time=record["response_time"],
+        stage_times={
+            stage: record[f"{stage}_time"]
+            for stage in STAGES
+            if record.get(f"{stage}_time") is not None
+        }
+    )
+
+def run_benchmark(
+    retriever: DocumentRetriever,
+    generator: AnswerGenerator,
+    evaluator: RAGEvaluator,
+    benchmark_data: List[Dict[str, Any]],
+    max_workers: int = 1,
+    checkpoint_file: Optional[str] = None,
+    run_config: Optional[Dict[str, Any]] = None
+) -> List[BenchmarkResult]:
+    """
+    Chạy benchmark và trả về kết quả
+    
+    Mỗi worker xử lý trọn một câu hỏi (retrieve -> generate -> evaluate), nên với
+    nhiều worker các câu hỏi khác nhau chạy song song ở các bước khác nhau.
+    Kết quả trả về giữ đúng thứ tự của benchmark_data.
+    
+    Nếu có checkpoint_file, các câu hỏi đã chạy thành công (cùng câu hỏi + run_config)
+    trong file đó sẽ được bỏ qua, nên có thể chạy tiếp sau khi bị dừng giữa chừng.
+    """
+    results: List[Optional[BenchmarkResult]] = [None] * len(benchmark_data)
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    output_file = f"benchmark_results_{timestamp}.xlsx"
+    records_file = checkpoint_file or f"benchmark_results_{timestamp}.jsonl"
+    
+    # Bỏ qua các câu hỏi đã hoàn thành ở lần chạy trước
+    query_keys = [make_query_key(item, run_config) for item in benchmark_data]
+    completed_records = load_checkpoint(records_file) if checkpoint_file else {}
+    pending = []
+    for index, key in enumerate(query_keys):
+        if key in completed_records:
+            results[index] = result_from_record(completed_records[key])
+        else:
+            pending.append(index)
+    if completed_records:
+        print(f"\nChạy tiếp từ checkpoint {records_file}: "
+              f"bỏ qua {len(benchmark_data) - len(pending)}/{len(benchmark_data)} câu hỏi đã hoàn thành")
+    
+    # Mỗi kết quả được ghi thêm vào file JSONL, Excel chỉ tạo một lần ở cuối
+    sink = ResultSink(records_file)
+    run_start = time.perf_counter()
+    
+    with sink, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(process_benchmark_item, benchmark_data[index], retriever, generator, evaluator): index
+            for index in pending
+        }
+        
+        for completed, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            result = future.result()
+            results[index] = result
             
             # In tiến trình
-            print(f"\nĐã xử lý câu hỏi {i}/{len(benchmark_data)}: {query}")
-            print(f"Thời gian xử lý: {processing_time:.2f} giây")
-            
-            # Thêm kết quả vào DataFrame
-            new_row = pd.DataFrame([{
-                "query": query,
-                "expected_answer": expected_answer,
-                "actual_answer": actual_answer,
-                "response_time": processing_time,
-                "source_id": "",
-                "timestamp": time.strftime('%Y-%m-%d %H:%M:%S'),
-                "evaluation_score": evaluation["score"],
-                "evaluation_feedback": evaluation["feedback"]
-            }])
-            df = pd.concat([df, new_row], ignore_index=True)
+            print(f"\nĐã xử lý câu hỏi {index + 1}/{len(benchmark_data)} "
+                  f"({completed}/{len(pending)} hoàn thành): {result.query}")
+            print(f"Thời gian xử lý: {result.processing_time:.2f} giây")
             
-            # Lưu kết quả vào file Excel sau mỗi 5 câu hỏi
-            if i % 5 == 0 or i == len(benchmark_data):
-                df.to_excel(output_file, index=False)
-                print(f"\nĐã lưu kết quả của {i} câu hỏi vào file {output_file}")
-            
-        except Exception as e:
-            print(f"\nLỗi khi xử lý câu hỏi {i}: {query}")
-            print(f"Lỗi: {str(e)}")
-            # Lưu kết quả lỗi
-            result = BenchmarkResult(
-                query=query,
-                expected_answer=expected_answer,
-                actual_answer="Lỗi khi xử lý câu hỏi",
-                evaluation_score=0,
-                evaluation_feedback=f"Lỗi: {str(e)}",
-                relevant_docs=[],
-                processing_time=0
-            )
-            results.append(result)
-            
-            # Thêm kết quả lỗi vào DataFrame
-            new_row = pd.DataFrame([{
-                "query": query,
-                "expected_answer": expected_answer,
-                "actual_answer": "Lỗi khi xử lý câu hỏi",
-                "response_time": 0,
+            # Ghi kết quả vào file JSONL
+            sink.write({
+                "index": index,
+                "query_key": query_keys[index],
+                "status": "error" if result.error else "ok",
+                "query": result.query,
+                "expected_answer": result.expected_answer,
+                "actual_answer": result.actual_answer,
+                "response_time": result.processing_time,
                 "source_id": "",
                 "timestamp": time.strftime('%Y-%m-%d %H:%M:%S'),
-                "evaluation_score": 0,
-                "evaluation_feedback": f"Lỗi: {str(e)}"
-            }])
-            df = pd.concat([df, new_row], ignore_index=True)
-            
-            # Lưu kết quả lỗi vào file Excel
-            df.to_excel(output_file, index=False)
+                "evaluation_score": result.evaluation_score,
+                "evaluation_feedback": result.evaluation_feedback,
+                **{f"{stage}_time": result.stage_times.get(stage) for stage in STAGES}
+            })
+    
+    # Thông lượng của lần chạy này (không tính các câu hỏi lấy từ checkpoint)
+    wall_time = time.perf_counter() - run_start
+    throughput = len(pending) / wall_time if pending and wall_time > 0 else None
+    if throughput is not None:
+        print(f"\nThông lượng: {throughput:.2f} câu hỏi/giây "
+              f"({len(pending)} câu hỏi trong {wall_time:.2f} giây, {max_workers} worker)")
+    
+    # Xuất histogram độ trễ (định dạng .hgrm) cạnh file kết quả
+    ok_results = [r for r in results if r is not None and not r.error]
+    latency_file = f"benchmark_results_{timestamp}_latency.hgrm"
+    latency_values = {"total": [r.processing_time for r in ok_results]}
+    histogram_files = {"total": latency_file}
+    build_histogram(latency_values["total"]).export(latency_file)
+    for stage in STAGES:
+        stage_values = [r.stage_times[stage] for r in ok_results if stage in r.stage_times]
+        if stage_values:
+            latency_values[stage] = stage_values
+            histogram_files[stage] = f"benchmark_results_{timestamp}_latency_{stage}.hgrm"
+            build_histogram(stage_values).export(histogram_files[stage])
+    print(f"Đã lưu histogram độ trễ vào file {latency_file}")
+    
+    # Báo cáo tổng hợp (thông lượng + percentile từng bước) dạng JSON cạnh các file .hgrm
+    summary_file = f"benchmark_results_{timestamp}_summary.json"
+    write_summary({
+        "results_file": output_file,
+        "records_file": records_file,
+        "histogram_files": histogram_files,
+        "max_workers": max_workers,
+        "total_queries": len(benchmark_data),
+        "processed_this_run": len(pending),
+        "errors": sum(1 for r in results if r is not None and r.error),
+        "wall_time_seconds": wall_time,
+        "throughput_qps": throughput,
+        "latency_seconds": {name: summarize_latencies(values) for name, values in latency_values.items()}
+    }, summary_file)
+    print(f"Đã lưu báo cáo thông lượng và độ trễ vào file {summary_file}")
+    
+    # Chuyển sang Excel một lần, theo đúng thứ tự câu hỏi
+    export_records(records_file, output_file, sort_by="index", columns=RESULT_COLUMNS, dedupe_by=["index", "query_key"])
+    print(f"\nĐã lưu kết quả của {len(benchmark_data)} câu hỏi vào file {output_file}")
             
     return results
 
@@ -183,9 +282,24 @@ def print_benchmark_results(results: List[BenchmarkResult]):
     avg_time = total_time / len(results)
     
     print(f"\nTổng số câu hỏi: {len(results)}")
+    print(f"Số câu hỏi lỗi: {sum(1 for r in results if r.error)}")
     print(f"Điểm trung bình: {avg_score:.2f}/100")
     print(f"Thời gian trung bình: {avg_time:.2f} giây")
     
+    # Phân phối độ trễ (bỏ qua câu hỏi lỗi), embedding nằm trong retrieval
+    ok_results = [r for r in results if not r.error]
+    rows = [("tổng", [r.processing_time for r in ok_results])]
+    rows += [(stage, [r.stage_times[stage] for r in ok_results if stage in r.stage_times]) for stage in STAGES]
+    
+    print("\n=== ĐỘ TRỄ (GIÂY) ===")
+    print(f"{'Bước':<12}{'n':>6}{'mean':>9}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for name, values in rows:
+        if not values:
+            continue
+        s = summarize_latencies(values)
+        print(f"{name:<12}{s['count']:>6}{s['mean']:>9.3f}{s['p50']:>9.3f}{s['p90']:>9.3f}"
+              f"{s['p95']:>9.3f}{s['p99']:>9.3f}{s['max']:>9.3f}")
+    
     # In chi tiết từng câu hỏi
     print("\n=== CHI TIẾT TỪNG CÂU HỎI ===")
     for i, result in enumerate(results, 1):
@@ -207,6 +321,8 @@ def main():
     embedding_model = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
     top_k = int(os.getenv("TOP_K", "3"))
     vector_weight = float(os.getenv("VECTOR_WEIGHT", "0.6"))
+    benchmark_workers = int(os.getenv("BENCHMARK_WORKERS", "4"))
+    checkpoint_file = os.getenv("BENCHMARK_CHECKPOINT")  # Ví dụ: benchmark_checkpoint.jsonl
     
     # Verify API key is set
     if not api_key:
@@ -227,6 +343,8 @@ def main():
     # Embedding Layer
     print("\n=== ĐANG TẠO VECTOR DATABASE ===")
     vectordb = create_vectordb(processed_documents)
+    # Đo riêng thời gian embedding câu hỏi trong lúc retrieval
+    vectordb.embedding_function = TimedEmbeddings(vectordb.embedding_function)
     
     # Retrieval Layer
     print("\n=== ĐANG CẤU HÌNH RETRIEVER ===")
@@ -256,7 +374,18 @@ def main():
     
     # Run benchmark
     print("\n=== ĐANG CHẠY BENCHMARK ===")
-    results = run_benchmark(retriever, generator, evaluator, benchmark_data)
+    results = run_benchmark(
+        retriever, generator, evaluator, benchmark_data,
+        max_workers=benchmark_workers,
+        checkpoint_file=checkpoint_file,
+        run_config={
+            "model_name": model_name,
+            "embedding_model": embedding_model,
+            "top_k": top_k,
+            "vector_weight": vector_weight,
+            "retriever_type": "hybrid"
+        }
+    )
     
     # Print results
     print_benchmark_results(results)
@@ -0,0 +1,107 @@
+"""
+Tests for resuming a benchmark from its JSONL checkpoint.
+
+Run from src3_runLangchain: python -m pytest test_benchmark_sink.py
+"""
+
+import json
+
+import pytest
+
+from benchmark_sink import ResultSink, load_checkpoint, make_query_key, read_records, truncate_partial_line
+
+RUN_CONFIG = {"llm_model": "gpt-4o-mini", "k": 3, "max_workers": 4}
+BENCHMARK_DATA = [
+    {"query": f"Câu hỏi {i}?", "expected_answer": f"Trả lời {i}"} for i in range(4)
+]
+
+def write_lines(path, records, tail: str = ""):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.write(tail)
+
+def record_for(item, status: str = "ok", answer: str = "ok"):
+    return {
+        "query": item["query"],
+        "actual_answer": answer,
+        "status": status,
+        "query_key": make_query_key(item, RUN_CONFIG)
+    }
+
+def test_truncate_partial_last_line(tmp_path):
+    path = tmp_path / "records.jsonl"
+    write_lines(path, [{"a": 1}, {"b": 2}], tail='{"c": "ghi dở')
+
+    truncate_partial_line(str(path))
+    assert path.read_text(encoding="utf-8") == '{"a": 1}\n{"b": 2}\n'
+
+def test_truncate_file_without_newline(tmp_path):
+    path = tmp_path / "records.jsonl"
+    # Longer than one 4096-byte block, so the backwards scan reaches the start
+    path.write_text('{"actual_answer": "' + "x" * 10000, encoding="utf-8")
+
+    truncate_partial_line(str(path))
+    assert path.read_bytes() == b""
+
+def test_truncate_keeps_complete_file(tmp_path):
+    path = tmp_path / "records.jsonl"
+    write_lines(path, [{"a": 1}])
+    before = path.read_bytes()
+
+    truncate_partial_line(str(path))
+    truncate_partial_line(str(tmp_path / "missing.jsonl"))
+    assert path.read_bytes() == before
+
+def test_sink_appends_after_partial_line(tmp_path):
+    path = tmp_path / "records.jsonl"
+    write_lines(path, [record_for(BENCHMARK_DATA[0])], tail='{"query": "Câu hỏi 1?", "sta')
+
+    with ResultSink(str(path), fsync_every=1) as sink:
+        sink.write(record_for(BENCHMARK_DATA[1]))
+
+    assert [r["query"] for r in read_records(str(path))] == ["Câu hỏi 0?", "Câu hỏi 1?"]
+    assert path.read_text(encoding="utf-8").count("\n") == 2
+
+def test_query_key_is_stable():
+    item = BENCHMARK_DATA[0]
+    key = make_query_key(item, RUN_CONFIG)
+    assert key == make_query_key(dict(item), dict(reversed(list(RUN_CONFIG.items()))))
+    assert key == make_query_key({**item, "expected_answer_id": 7}, RUN_CONFIG)
+    assert key != make_query_key({**item, "expected_answer": "Khác"}, RUN_CONFIG)
+    assert key != make_query_key(item, {**RUN_CONFIG, "k": 5})
+    assert make_query_key(item) == make_query_key(item, {})
+
+def test_load_checkpoint_reruns_errors_and_keeps_latest(tmp_path):
+    path = tmp_path / "records.jsonl"
+    first, second, third = BENCHMARK_DATA[:3]
+    write_lines(path, [
+        record_for(first, answer="cũ"),
+        record_for(second, status="error"),
+        record_for(first, answer="mới"),
+        {"query": "không có khóa", "status": "ok"}
+    ], tail=json.dumps(record_for(third))[:-5])
+
+    completed = load_checkpoint(str(path))
+    assert set(completed) == {make_query_key(first, RUN_CONFIG)}
+    assert completed[make_query_key(first, RUN_CONFIG)]["actual_answer"] == "mới"
+    assert load_checkpoint(str(tmp_path / "missing.jsonl")) == {}
+
+@pytest.mark.parametrize("other_config", [False, True])
+def test_resume_skips_completed_queries(tmp_path, other_config):
+    path = tmp_path / "records.jsonl"
+    # The previous run finished queries 0 and 2, failed 1 and crashed while writing 3
+    write_lines(path, [
+        record_for(BENCHMARK_DATA[0]),
+        record_for(BENCHMARK_DATA[1], status="error"),
+        record_for(BENCHMARK_DATA[2])
+    ], tail=json.dumps(record_for(BENCHMARK_DATA[3]))[:20])
+
+    # Same selection as run_benchmark in main_run_benchmark.py
+    run_config = {**RUN_CONFIG, "k": 5} if other_config else RUN_CONFIG
+    completed = load_checkpoint(str(path))
+    pending = [
+        index for index, item in enumerate(BENCHMARK_DATA)
+        if make_query_key(item, run_config) not in completed
+    ]
+    assert pending == ([0, 1, 2, 3] if other_config else [1, 3])
@@ -1,4 +1,8 @@
 import requests
+from requests.adapters import HTTPAdapter
+import httpx
+import asyncio
+import random
 import json
 from typing import Dict, Any, Optional
 import os
@@ -9,17 +13,46 @@ from dotenv import load_dotenv
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 1.0
+DEFAULT_MAX_CONCURRENCY = 10
+
+# Status codes worth retrying (rate limit and transient server errors)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Errors raised before the request reached the server, so a retry cannot run the flow twice
+SAFE_RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+class LangFlowAPIError(Exception):
+    """Raised when the API returns a non-200 status code"""
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"API request failed with status code {status_code}: {text}")
+        self.status_code = status_code
+
 class LangFlowClient:
-    def __init__(self, api_url: Optional[str] = None, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        pool_size: int = DEFAULT_POOL_SIZE
+    ):
         """
         Initialize LangFlow API client
         
         Args:
             api_url (str, optional): API endpoint URL. If not provided, will be read from .env
             api_key (str, optional): API key. If not provided, will be read from .env
+            timeout (float, optional): Request timeout in seconds. If not provided, read from
+                LANGFLOW_TIMEOUT in .env (default 60)
+            pool_size (int): Max keep-alive connections kept open; set it to at least the
+                number of threads sharing this client
         """
         self.api_url = api_url or os.getenv("LANGFLOW_API_URL")
         self.api_key = api_key or os.getenv("LANGFLOW_API_KEY")
+        self.timeout = timeout or float(os.getenv("LANGFLOW_TIMEOUT", DEFAULT_TIMEOUT))
         
         if not self.api_url or not self.api_key:
             raise ValueError("API URL and API key must be provided either through constructor or .env file")
@@ -28,6 +61,17 @@ class LangFlowClient:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
         }
+        
+        # Reuse TCP/TLS connections between calls instead of a new handshake per request
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
 
     def get_response_text(self, query: str) -> str:
         """
@@ -39,28 +83,131 @@ class LangFlowClient:
         Returns:
             str: Response text
         """
-        data = {
-            "input_value": query,
-            "output_type": "chat",
-            "input_type": "chat"
-        }
-        
-        response = requests.post(
+        response = self.session.post(
             self.api_url,
-            headers=self.headers,
-            json=data
+            json=build_payload(query),
+            timeout=self.timeout
         )
         
         if response.status_code != 200:
-            raise Exception(f"API request failed with status code {response.status_code}: {response.text}")
+            raise LangFlowAPIError(response.status_code, response.text)
             
-        response_data = response.json()
+        return extract_response_text(response.json())
+
+class AsyncLangFlowClient:
+    def __init__(
+        self,
+        api_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        max_backoff: Optional[float] = None,
+        retry_unsafe_errors: bool = False
+    ):
+        """
+        Initialize async LangFlow API client
+        
+        Args:
+            api_url (str, optional): API endpoint URL. If not provided, will be read from .env
+            api_key (str, optional): API key. If not provided, will be read from .env
+            timeout (float, optional): Per-request timeout in seconds. If not provided, read from
+                LANGFLOW_TIMEOUT in .env (default 60)
+            max_concurrency (int): Max requests in flight at once (also the connection pool size)
+            max_retries (int): Retries for connection errors, 429 and 5xx responses
+            retry_backoff (float): Base delay in seconds, doubled on every retry (with jitter)
+            max_backoff (float, optional): Longest wait before a retry, also for Retry-After
+                (default retry_backoff * 2 ** max_retries)
+            retry_unsafe_errors (bool): Also retry read timeouts and other errors after the
+                request was sent. The flow may then run more than once (at-least-once)
+        """
+        self.api_url = api_url or os.getenv("LANGFLOW_API_URL")
+        self.api_key = api_key or os.getenv("LANGFLOW_API_KEY")
+        self.timeout = timeout or float(os.getenv("LANGFLOW_TIMEOUT", DEFAULT_TIMEOUT))
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = retry_backoff * (2 ** max_retries) if max_backoff is None else max_backoff
+        self.retry_errors = (httpx.TimeoutException, httpx.TransportError) if retry_unsafe_errors else SAFE_RETRY_ERRORS
+        
+        if not self.api_url or not self.api_key:
+            raise ValueError("API URL and API key must be provided either through constructor or .env file")
+        
+        self.client = httpx.AsyncClient(
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {self.api_key}"
+            },
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def close(self):
+        """Close pooled connections"""
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Exponential backoff with full jitter, honouring Retry-After when the server sends it (capped at max_backoff)"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            try:
+                if retry_after is not None:
+                    return min(max(float(retry_after), 0.0), self.max_backoff)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.retry_backoff * (2 ** attempt), self.max_backoff))
+
+    async def get_response_text(self, query: str) -> str:
+        """
+        Get response text from LangFlow API
         
-        # Extract response text from the nested structure
-        try:
-            return response_data["outputs"][0]["outputs"][0]["outputs"]["message"]["message"]
-        except (KeyError, IndexError) as e:
-            raise Exception(f"Failed to extract response text from API response: {str(e)}")
+        Args:
+            query (str): Query text
+            
+        Returns:
+            str: Response text
+        """
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            # Hold a concurrency slot only while the request runs, not while waiting to retry
+            async with self.semaphore:
+                try:
+                    response = await self.client.post(self.api_url, json=build_payload(query))
+                except self.retry_errors:
+                    if last_attempt:
+                        raise
+                    response = None
+            
+            if response is None:
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+            if response.status_code == 200:
+                return extract_response_text(response.json())
+            if response.status_code not in RETRYABLE_STATUS_CODES or last_attempt:
+                raise LangFlowAPIError(response.status_code, response.text)
+            await asyncio.sleep(self._retry_delay(attempt, response))
+
+def build_payload(query: str) -> Dict[str, Any]:
+    """Request body for a chat query"""
+    return {
+        "input_value": query,
+        "output_type": "chat",
+        "input_type": "chat"
+    }
+
+def extract_response_text(response_data: Dict[str, Any]) -> str:
+    """Extract response text from the nested structure"""
+    try:
+        return response_data["outputs"][0]["outputs"][0]["outputs"]["message"]["message"]
+    except (KeyError, IndexError) as e:
+        raise Exception(f"Failed to extract response text from API response: {str(e)}")
 
 # Create default client instance
 default_client = LangFlowClient()
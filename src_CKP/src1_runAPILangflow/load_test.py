@@ -0,0 +1,209 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Any, Optional
+from pathlib import Path
+
+import requests
+
+# Add src directory to Python path
+src_path = str(Path(__file__).parent.parent)
+if src_path not in sys.path:
+    sys.path.append(src_path)
+
+from api_client import LangFlowClient, LangFlowAPIError
+from utils.latency import summarize_latencies, export_histogram
+
+def classify_error(error: Exception) -> str:
+    """Short error label used in the report"""
+    if isinstance(error, LangFlowAPIError):
+        return f"http_{error.status_code}"
+    if isinstance(error, requests.Timeout):
+        return "timeout"
+    if isinstance(error, requests.ConnectionError):
+        return "connection"
+    return type(error).__name__
+
+class LoadTest:
+    """
+    Load test for the LangFlow API
+
+    Open-loop mode (target_qps set): requests are sent on a fixed arrival schedule,
+    whether or not earlier requests have finished, like real users. Latency is
+    measured from the scheduled send time, so time spent waiting for a free worker
+    counts too and an overloaded server cannot hide its queueing delay.
+
+    Closed-loop mode (no target_qps): each worker sends the next request as soon
+    as the previous one returns.
+    """
+    def __init__(
+        self,
+        client: LangFlowClient,
+        queries: List[str],
+        concurrency: int = 10,
+        target_qps: Optional[float] = None,
+        poisson: bool = False
+    ):
+        self.client = client
+        self.queries = queries
+        self.concurrency = concurrency
+        self.target_qps = target_qps
+        self.poisson = poisson
+        self.samples: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def _send(self, request_id: int, scheduled_at: float):
+        """Send one request and record its timings"""
+        query = self.queries[request_id % len(self.queries)]
+        started_at = time.perf_counter()
+        error = None
+        try:
+            self.client.get_response_text(query)
+        except Exception as e:
+            error = classify_error(e)
+        finished_at = time.perf_counter()
+
+        with self._lock:
+            self.samples.append({
+                "request_id": request_id,
+                "latency": finished_at - scheduled_at,        # Includes waiting for a worker
+                "service_time": finished_at - started_at,     # Time spent on the HTTP call
+                "finished_at": finished_at,
+                "error": error
+            })
+
+    def _run_open_loop(self, executor: ThreadPoolExecutor, duration: float, max_requests: Optional[int]):
+        """Submit requests on the arrival schedule until time or request budget runs out"""
+        futures = []
+        interval = 1.0 / self.target_qps
+        next_at = self.start_time
+        request_id = 0
+        while next_at - self.start_time < duration and (max_requests is None or request_id < max_requests):
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(self._send, request_id, next_at))
+            request_id += 1
+            next_at += random.expovariate(self.target_qps) if self.poisson else interval
+        wait(futures)
+
+    def _run_closed_loop(self, executor: ThreadPoolExecutor, duration: float, max_requests: Optional[int]):
+        """Every worker sends requests back to back"""
+        counter = itertools.count()
+        counter_lock = threading.Lock()
+
+        def worker():
+            while time.perf_counter() - self.start_time < duration:
+                with counter_lock:
+                    request_id = next(counter)
+                if max_requests is not None and request_id >= max_requests:
+                    return
+                self._send(request_id, time.perf_counter())
+
+        wait([executor.submit(worker) for _ in range(self.concurrency)])
+
+    def run(self, duration: float = 60.0, max_requests: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Run the load test
+
+        Args:
+            duration (float): Stop sending new requests after this many seconds
+            max_requests (int, optional): Stop after this many requests
+
+        Returns:
+            Dict[str, Any]: Report with throughput, error rate and latency percentiles
+        """
+        self.samples = []
+        self.start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            if self.target_qps:
+                self._run_open_loop(executor, duration, max_requests)
+            else:
+                self._run_closed_loop(executor, duration, max_requests)
+        self.elapsed = time.perf_counter() - self.start_time
+        return self.report()
+
+    def report(self) -> Dict[str, Any]:
+        """Summarize the collected samples"""
+        total = len(self.samples)
+        ok = [s for s in self.samples if s["error"] is None]
+        errors = Counter(s["error"] for s in self.samples if s["error"] is not None)
+        return {
+            "mode": "open-loop" if self.target_qps else "closed-loop",
+            "concurrency": self.concurrency,
+            "target_qps": self.target_qps,
+            "duration": self.elapsed,
+            "requests": total,
+            "succeeded": len(ok),
+            "error_rate": (total - len(ok)) / total if total else 0.0,
+            "errors": dict(errors),
+            "throughput": len(ok) / self.elapsed if self.elapsed > 0 else 0.0,
+            "latency": summarize_latencies([s["latency"] for s in ok]),
+            "service_time": summarize_latencies([s["service_time"] for s in ok])
+        }
+
+def print_report(report: Dict[str, Any]):
+    """Print a load test report"""
+    print(f"\nLoad Test Summary ({report['mode']}, concurrency={report['concurrency']}, "
+          f"target_qps={report['target_qps']}):")
+    print(f"Requests: {report['requests']} in {report['duration']:.1f}s")
+    print(f"Succeeded: {report['succeeded']}  Error rate: {report['error_rate']:.1%}")
+    for label, count in sorted(report["errors"].items()):
+        print(f"  {label}: {count}")
+    print(f"Throughput: {report['throughput']:.2f} successful requests/sec")
+    for name in ("latency", "service_time"):
+        stats = report[name]
+        if stats["count"]:
+            print(f"{name:<13} mean {stats['mean']:.2f}s  p50 {stats['p50']:.2f}s  p90 {stats['p90']:.2f}s  "
+                  f"p95 {stats['p95']:.2f}s  p99 {stats['p99']:.2f}s  max {stats['max']:.2f}s")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Load test the LangFlow API')
+    parser.add_argument('--concurrency', type=int, default=10,
+                      help='Number of worker threads / pooled connections (default: 10)')
+    parser.add_argument('--qps', type=float, default=None,
+                      help='Target requests per second (open-loop). Omit for closed-loop (default: None)')
+    parser.add_argument('--poisson', action='store_true',
+                      help='Use random (Poisson) arrivals instead of a fixed interval')
+    parser.add_argument('--duration', type=float, default=60.0,
+                      help='Seconds to keep sending requests (default: 60)')
+    parser.add_argument('--max-requests', type=int, default=None,
+                      help='Stop after this many requests (default: no limit)')
+    parser.add_argument('--timeout', type=float, default=None,
+                      help='Request timeout in seconds (default: LANGFLOW_TIMEOUT or 60)')
+    parser.add_argument('--queries', type=str, default='src/benchmark_query.json',
+                      help='JSON file with queries (default: src/benchmark_query.json)')
+    parser.add_argument('--output', type=str, default='load_test_results.json',
+                      help='Report file; a .hgrm latency histogram is written next to it')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    with open(args.queries, "r", encoding="utf-8") as f:
+        queries = [item["query"] for item in json.load(f)]
+
+    client = LangFlowClient(timeout=args.timeout, pool_size=args.concurrency)
+    load_test = LoadTest(client, queries, args.concurrency, args.qps, args.poisson)
+    try:
+        report = load_test.run(duration=args.duration, max_requests=args.max_requests)
+    finally:
+        client.close()
+
+    print_report(report)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    histogram_file = os.path.splitext(args.output)[0] + "_latency.hgrm"
+    export_histogram([s["latency"] for s in load_test.samples if s["error"] is None], histogram_file)
+    print(f"\nReport saved to {args.output}, latency histogram to {histogram_file}")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
+import os
 import json
 import time
+import asyncio
 import logging
 import sys
 from typing import Dict, List, Any
@@ -10,35 +12,51 @@ src_path = str(Path(__file__).parent.parent)
 if src_path not in sys.path:
     sys.path.append(src_path)
 
-from api_client import default_client
+from api_client import default_client, AsyncLangFlowClient
 from utils.logger import setup_logging
 from utils.excel_writer import setup_excel_writer
+from utils.checkpoint import make_query_key, load_completed
+from utils.latency import summarize_latencies, export_histogram, write_summary
 
 # Global variables for queues
 log_queue = None
 excel_queue = None
 
-def run_benchmark(queries: List[Dict[str, str]], output_file: str = "benchmark_results.xlsx") -> List[Dict[str, Any]]:
+def run_benchmark(queries: List[Dict[str, str]], output_file: str = "benchmark_results.xlsx", completed: Dict[str, Dict[str, Any]] = None) -> List[Dict[str, Any]]:
     """
     Run benchmark tests on a list of queries
     
     Args:
         queries (List[Dict[str, str]]): List of query dictionaries with 'query' and 'expected_answer'
         output_file (str): Path to save benchmark results
+        completed (Dict[str, Dict[str, Any]], optional): Results of a previous run keyed by query key;
+            these queries are skipped instead of calling the API again
         
     Returns:
         List[Dict[str, Any]]: List of benchmark results
     """
     global excel_queue
     results = []
+    completed = completed or {}
     total_queries = len(queries)
-    start_time = time.time()
+    processed = 0
+    start_time = time.perf_counter()
+    run_config = {"api_url": default_client.api_url}
     
     logging.info(f"Starting benchmark with {total_queries} queries")
+    if completed:
+        logging.info(f"Resuming: {len(completed)} queries already completed")
     
     for idx, query_data in enumerate(queries, 1):
         query = query_data["query"]
         expected = query_data["expected_answer"]
+        query_key = make_query_key(query, run_config)
+        
+        # Skip queries finished in a previous run
+        if query_key in completed:
+            results.append(completed[query_key])
+            logging.info(f"Skipping query {idx}/{total_queries} (already completed)")
+            continue
         
         # Log query information
         logging.info(f"Processing query {idx}/{total_queries}")
@@ -47,9 +65,9 @@ def run_benchmark(queries: List[Dict[str, str]], output_file: str = "benchmark_r
         
         try:
             # Call API and measure time
-            query_start_time = time.time()
+            query_start_time = time.perf_counter()
             response = default_client.get_response_text(query)
-            query_end_time = time.time()
+            query_end_time = time.perf_counter()
             
             # Create result entry
             result = {
@@ -58,31 +76,129 @@ def run_benchmark(queries: List[Dict[str, str]], output_file: str = "benchmark_r
                 "actual_answer": response,
                 "response_time": query_end_time - query_start_time,
                 "source_id": query_data.get("source_id", ""),
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "query_key": query_key
             }
             
             results.append(result)
+            processed += 1
             logging.info(f"Query {idx} completed in {result['response_time']:.2f}s")
             logging.info(f"Response: {response}")
             
-            # Save intermediate results every 5 queries
-            if idx % 5 == 0:
-                excel_queue.put(results.copy())  # Send copy to Excel writer
-                logging.info(f"Saved intermediate results after {idx} queries")
+            # Stream the result to the writer (appended to JSONL, Excel built at the end)
+            excel_queue.put(result)
                 
         except Exception as e:
             logging.error(f"Error processing query {idx}: {str(e)}")
             continue
     
-    # Save final results
-    excel_queue.put(results)
+    log_run_stats(results, processed, time.perf_counter() - start_time, output_file)
+    return results
+
+async def run_benchmark_async(
+    queries: List[Dict[str, str]],
+    output_file: str = "benchmark_results.xlsx",
+    completed: Dict[str, Dict[str, Any]] = None,
+    concurrency: int = 10
+) -> List[Dict[str, Any]]:
+    """
+    Run benchmark tests concurrently with AsyncLangFlowClient
     
-    total_time = time.time() - start_time
-    logging.info(f"Benchmark completed in {total_time:.2f}s")
-    logging.info("=" * 50)
+    Same as run_benchmark, but up to `concurrency` queries are in flight at once,
+    and connection errors, 429 and 5xx responses are retried with backoff.
+    
+    Args:
+        queries (List[Dict[str, str]]): List of query dictionaries with 'query' and 'expected_answer'
+        output_file (str): Path to save benchmark results
+        completed (Dict[str, Dict[str, Any]], optional): Results of a previous run keyed by query key
+        concurrency (int): Max number of queries in flight
+        
+    Returns:
+        List[Dict[str, Any]]: List of benchmark results, in query order
+    """
+    global excel_queue
+    completed = completed or {}
+    total_queries = len(queries)
+    results: List[Any] = [None] * total_queries
+    start_time = time.perf_counter()
+    
+    logging.info(f"Starting async benchmark with {total_queries} queries (concurrency {concurrency})")
+    if completed:
+        logging.info(f"Resuming: {len(completed)} queries already completed")
+    
+    async with AsyncLangFlowClient(max_concurrency=concurrency) as client:
+        run_config = {"api_url": client.api_url}
+        
+        async def process(idx: int, query_data: Dict[str, str]):
+            query = query_data["query"]
+            query_key = make_query_key(query, run_config)
+            
+            # Skip queries finished in a previous run
+            if query_key in completed:
+                results[idx] = completed[query_key]
+                return False
+            
+            try:
+                query_start_time = time.perf_counter()
+                response = await client.get_response_text(query)
+                query_end_time = time.perf_counter()
+            except Exception as e:
+                logging.error(f"Error processing query {idx + 1}: {str(e)}")
+                return False
+            
+            result = {
+                "query": query,
+                "expected_answer": query_data["expected_answer"],
+                "actual_answer": response,
+                "response_time": query_end_time - query_start_time,
+                "source_id": query_data.get("source_id", ""),
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "query_key": query_key
+            }
+            results[idx] = result
+            logging.info(f"Query {idx + 1}/{total_queries} completed in {result['response_time']:.2f}s")
+            excel_queue.put(result)
+            return True
+        
+        outcomes = await asyncio.gather(*(process(idx, q) for idx, q in enumerate(queries)))
     
+    # Failed queries are left out, like in run_benchmark
+    results = [r for r in results if r is not None]
+    log_run_stats(results, sum(outcomes), time.perf_counter() - start_time, output_file, concurrency)
     return results
 
+def log_run_stats(
+    results: List[Dict[str, Any]],
+    processed: int,
+    total_time: float,
+    output_file: str,
+    concurrency: int = 1
+):
+    """Log run time and throughput, and write the latency histogram and a JSON summary next to the results"""
+    throughput = processed / total_time if processed and total_time > 0 else None
+    logging.info(f"Benchmark completed in {total_time:.2f}s")
+    if throughput is not None:
+        logging.info(f"Throughput: {throughput:.2f} queries/sec ({processed} queries this run)")
+    
+    base_name = os.path.splitext(output_file)[0]
+    histogram_file = base_name + "_latency.hgrm"
+    export_histogram([r["response_time"] for r in results], histogram_file)
+    logging.info(f"Latency histogram saved to {histogram_file}")
+    
+    summary_file = base_name + "_summary.json"
+    write_summary({
+        "output_file": output_file,
+        "histogram_file": histogram_file,
+        "concurrency": concurrency,
+        "total_results": len(results),
+        "processed_this_run": processed,
+        "wall_time_seconds": total_time,
+        "throughput_qps": throughput,
+        "latency_seconds": summarize_latencies([r["response_time"] for r in results])
+    }, summary_file)
+    logging.info(f"Run summary saved to {summary_file}")
+    logging.info("=" * 50)
+
 def print_summary(results: List[Dict[str, Any]]):
     """Print benchmark summary statistics"""
     if not results:
@@ -90,25 +206,30 @@ def print_summary(results: List[Dict[str, Any]]):
         return
         
     total_queries = len(results)
-    avg_time = sum(r["response_time"] for r in results) / total_queries
-    min_time = min(r["response_time"] for r in results)
-    max_time = max(r["response_time"] for r in results)
+    stats = summarize_latencies([r["response_time"] for r in results])
     
     summary = f"""
 Benchmark Summary:
 Total queries: {total_queries}
-Average response time: {avg_time:.2f}s
-Min response time: {min_time:.2f}s
-Max response time: {max_time:.2f}s
+Average response time: {stats['mean']:.2f}s
+Min response time: {stats['min']:.2f}s
+Max response time: {stats['max']:.2f}s
+p50 / p90 / p95 / p99: {stats['p50']:.2f}s / {stats['p90']:.2f}s / {stats['p95']:.2f}s / {stats['p99']:.2f}s
 """
     logging.info(summary)
     print(summary)
 
 def main():
     global log_queue, excel_queue
+    output_file = "benchmark_results.xlsx"
+    
+    # Resume from the previous run's records (set BENCHMARK_RESUME=true)
+    resume = os.getenv("BENCHMARK_RESUME", "false").lower() == "true"
+    completed = load_completed(os.path.splitext(output_file)[0] + ".jsonl") if resume else {}
+    
     # Setup logging and Excel writer
     log_writer, log_queue = setup_logging()
-    excel_writer, excel_queue = setup_excel_writer()
+    excel_writer, excel_queue = setup_excel_writer(output_file, resume=resume)
     
     logging.info("Starting benchmark process")
     
@@ -118,8 +239,12 @@ def main():
             queries = json.load(f)
         logging.info(f"Loaded {len(queries)} queries from benchmark_query.json")
         
-        # Run benchmark
-        results = run_benchmark(queries)
+        # Run benchmark (BENCHMARK_CONCURRENCY > 1 sends queries concurrently)
+        concurrency = int(os.getenv("BENCHMARK_CONCURRENCY", "1"))
+        if concurrency > 1:
+            results = asyncio.run(run_benchmark_async(queries, output_file, completed, concurrency))
+        else:
+            results = run_benchmark(queries, output_file, completed=completed)
         
         # Print summary
         print_summary(results)
@@ -0,0 +1,45 @@
+import os
+import json
+import hashlib
+from typing import Dict, Any, Optional
+
+def make_query_key(query: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """Checkpoint key for a query: hash of the query text + run config"""
+    content = json.dumps({"query": query, "config": config or {}}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def truncate_partial_line(records_file: str) -> None:
+    """Cut off a last line without '\n' (crash mid-write) so appended records start on a new line"""
+    if not os.path.exists(records_file):
+        return
+    with open(records_file, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        # Scan backwards in chunks for the last newline
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            chunk = f.read(position - start)
+            newline = chunk.rfind(b'\n')
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position != end:
+            f.truncate(position)
+
+def load_completed(records_file: str) -> Dict[str, Dict[str, Any]]:
+    """Load completed results (query_key -> record) from a previous run's JSONL file"""
+    completed = {}
+    if not os.path.exists(records_file):
+        return completed
+    with open(records_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line may be cut off if the previous run crashed
+                continue
+            if record.get("query_key"):
+                completed[record["query_key"]] = record
+    return completed
@@ -1,43 +1,84 @@
+import os
+import json
 import pandas as pd
 import queue
 import threading
 from typing import List, Dict, Any
 from datetime import datetime
+from .checkpoint import truncate_partial_line
 
 class ExcelWriter(threading.Thread):
-    """Thread that writes results to Excel file"""
-    def __init__(self, excel_queue, output_file):
+    """Thread that appends results to a JSONL file and converts it to Excel once at the end"""
+    def __init__(self, excel_queue, output_file, fsync_every: int = 10, resume: bool = False):
         super().__init__()
         self.excel_queue = excel_queue
         self.output_file = output_file
+        self.records_file = os.path.splitext(output_file)[0] + ".jsonl"
+        self.fsync_every = fsync_every
+        self.resume = resume
         self.daemon = True
         self.running = True
 
     def run(self):
-        while self.running:
-            try:
-                results = self.excel_queue.get(timeout=1)
-                if results is None:
-                    break
-                
-                # Convert results to DataFrame
-                df = pd.DataFrame(results)
-                
-                # Write to Excel
-                df.to_excel(self.output_file, index=False, engine='openpyxl')
-                
-            except queue.Empty:
-                continue
-            except Exception as e:
-                print(f"Error writing to Excel: {str(e)}")
-                continue
+        pending = 0
+        if self.resume:
+            truncate_partial_line(self.records_file)
+        # Keep earlier records when resuming, start fresh otherwise
+        with open(self.records_file, 'a' if self.resume else 'w', encoding='utf-8') as f:
+            while self.running:
+                try:
+                    record = self.excel_queue.get(timeout=1)
+                    if record is None:
+                        break
+
+                    # Append one result per line
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                    f.flush()
+                    pending += 1
+
+                    # fsync in batches instead of after every record
+                    if pending >= self.fsync_every:
+                        os.fsync(f.fileno())
+                        pending = 0
+
+                except queue.Empty:
+                    continue
+                except Exception as e:
+                    print(f"Error writing result: {str(e)}")
+                    continue
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.convert_to_excel()
+
+    def convert_to_excel(self):
+        """Convert the JSONL records to the Excel file (called once, at the end)"""
+        try:
+            records = []
+            with open(self.records_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Line cut off by a crash: skip it like load_completed does
+                        continue
+
+            df = pd.DataFrame(records)
+            df.to_excel(self.output_file, index=False, engine='openpyxl')
+
+        except Exception as e:
+            print(f"Error writing to Excel: {str(e)}")
 
     def stop(self):
-        self.running = False
+        # Sentinel goes behind any queued records, so they are all written first
+        self.excel_queue.put(None)
 
-def setup_excel_writer(output_file: str = "benchmark_results.xlsx"):
-    """Setup asynchronous Excel writer"""
+def setup_excel_writer(output_file: str = "benchmark_results.xlsx", resume: bool = False):
+    """Setup asynchronous result writer (JSONL during the run, Excel at the end)"""
     excel_queue = queue.Queue()
-    excel_writer = ExcelWriter(excel_queue, output_file)
+    excel_writer = ExcelWriter(excel_queue, output_file, resume=resume)
     excel_writer.start()
-    return excel_writer, excel_queue 
\ No newline at end of file
+    return excel_writer, excel_queue
@@ -0,0 +1,58 @@
+import json
+import math
+from typing import List, Dict, Any
+
+import numpy as np
+
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+
+def summarize_latencies(values: List[float], percentiles=DEFAULT_PERCENTILES) -> Dict[str, float]:
+    """Latency summary in seconds: count, mean, min, max and p50/p90/p95/p99"""
+    if not values:
+        return {"count": 0}
+    data = np.asarray(values, dtype=np.float64)
+    summary = {
+        "count": int(data.size),
+        "mean": float(data.mean()),
+        "min": float(data.min()),
+        "max": float(data.max())
+    }
+    for p, value in zip(percentiles, np.percentile(data, percentiles)):
+        summary[f"p{p}"] = float(value)
+    return summary
+
+def write_summary(summary: Dict[str, Any], path: str):
+    """Write the run report (throughput, latency percentiles, file names) as JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+def export_histogram(values: List[float], path: str, significant_figures: int = 3):
+    """
+    Write an HdrHistogram-style percentile distribution (.hgrm, values in ms)
+
+    Values are bucketed to a fixed number of significant figures, so the
+    relative error is the same for 10ms and 10s latencies.
+    """
+    counts = {}
+    for seconds in values:
+        value_ms = seconds * 1000.0
+        if value_ms > 0:
+            unit = 10.0 ** (math.floor(math.log10(value_ms)) - significant_figures + 1)
+            value_ms = round(math.ceil(value_ms / unit) * unit, 12)
+        counts[value_ms] = counts.get(value_ms, 0) + 1
+
+    total = len(values)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}\n\n")
+        seen = 0
+        for value in sorted(counts):
+            seen += counts[value]
+            fraction = seen / total
+            inverse = "inf" if fraction >= 1.0 else f"{1.0 / (1.0 - fraction):.2f}"
+            f.write(f"{value:12.3f} {fraction:14.12f} {seen:10d} {inverse:>14}\n")
+
+        if total:
+            data = np.asarray(values, dtype=np.float64) * 1000.0
+            f.write(f"#[Mean    = {data.mean():12.3f}, StdDeviation   = {data.std():12.3f}]\n")
+            f.write(f"#[Max     = {data.max():12.3f}, Total count    = {total:12d}]\n")
+        f.write(f"#[Buckets = {len(counts):12d}, SignificantFigures = {significant_figures:6d}]\n")
@@ -0,0 +1,108 @@
+"""
+Tests for resuming a benchmark from its JSONL records.
+
+Run from src_CKP/src1_runAPILangflow: python -m pytest utils
+"""
+
+import importlib
+import json
+import queue
+
+import pytest
+
+from utils.checkpoint import load_completed, make_query_key, truncate_partial_line
+
+CONFIG = {"api_url": "http://localhost:7860/api/v1/run/flow"}
+
+def write_lines(path, records, tail: str = ""):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f.write(tail)
+
+def test_truncate_partial_last_line(tmp_path):
+    path = tmp_path / "results.jsonl"
+    write_lines(path, [{"query_key": "a"}, {"query_key": "b"}], tail='{"query_key": "c", "actu')
+
+    truncate_partial_line(str(path))
+    assert path.read_text(encoding='utf-8').splitlines() == ['{"query_key": "a"}', '{"query_key": "b"}']
+
+    # Appending now starts a clean line
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({"query_key": "c"}) + '\n')
+    assert list(load_completed(str(path))) == ["a", "b", "c"]
+
+def test_truncate_file_without_newline(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text('{"query_key": "a", "actual_answer": "' + "x" * 10000, encoding='utf-8')
+
+    truncate_partial_line(str(path))
+    assert path.read_bytes() == b""
+
+def test_truncate_keeps_complete_file(tmp_path):
+    path = tmp_path / "results.jsonl"
+    write_lines(path, [{"query_key": "a"}])
+    before = path.read_bytes()
+
+    truncate_partial_line(str(path))
+    truncate_partial_line(str(tmp_path / "missing.jsonl"))
+    assert path.read_bytes() == before
+
+def test_load_completed_skips_partial_line(tmp_path):
+    path = tmp_path / "results.jsonl"
+    write_lines(path, [{"query_key": "a", "actual_answer": "1"}, {"actual_answer": "no key"}], tail='{"query_key": "b"')
+
+    assert load_completed(str(path)) == {"a": {"query_key": "a", "actual_answer": "1"}}
+    assert load_completed(str(tmp_path / "missing.jsonl")) == {}
+
+def test_query_key_is_stable():
+    key = make_query_key("Robot Pika giá bao nhiêu?", CONFIG)
+    assert key == make_query_key("Robot Pika giá bao nhiêu?", dict(reversed(list(CONFIG.items()))))
+    assert key == make_query_key("Robot Pika giá bao nhiêu?", json.loads(json.dumps(CONFIG)))
+    assert key != make_query_key("Robot Pika giá bao nhiêu? ", CONFIG)
+    assert key != make_query_key("Robot Pika giá bao nhiêu?", {"api_url": "http://other"})
+    assert make_query_key("q") == make_query_key("q", {})
+
+class FakeClient:
+    api_url = CONFIG["api_url"]
+
+    def __init__(self):
+        self.calls = []
+
+    def get_response_text(self, query: str) -> str:
+        self.calls.append(query)
+        return "answer to " + query
+
+@pytest.fixture
+def benchmark(monkeypatch):
+    monkeypatch.setenv("LANGFLOW_API_URL", CONFIG["api_url"])
+    monkeypatch.setenv("LANGFLOW_API_KEY", "test-key")
+    module = importlib.import_module("run_benchmark")
+    client = FakeClient()
+    monkeypatch.setattr(module, "default_client", client)
+    monkeypatch.setattr(module, "excel_queue", queue.Queue())
+    return module, client
+
+def test_run_benchmark_skips_completed_queries(benchmark, tmp_path):
+    module, client = benchmark
+    queries = [{"query": f"question {i}", "expected_answer": f"answer {i}"} for i in range(3)]
+    records_file = tmp_path / "results.jsonl"
+    done = {
+        "query": "question 1",
+        "actual_answer": "from the previous run",
+        "response_time": 0.5,
+        "query_key": make_query_key("question 1", CONFIG)
+    }
+    # Previous run crashed while writing the third record
+    write_lines(records_file, [done], tail='{"query": "question 2", "query_key": "')
+
+    results = module.run_benchmark(
+        queries,
+        output_file=str(tmp_path / "results.xlsx"),
+        completed=load_completed(str(records_file))
+    )
+
+    assert client.calls == ["question 0", "question 2"]
+    assert [r["query"] for r in results] == ["question 0", "question 1", "question 2"]
+    assert results[1]["actual_answer"] == "from the previous run"
+    assert module.excel_queue.qsize() == 2